@@ -0,0 +1,52 @@
+"""Per-request locale overhead: parsing i18n/<lang>.json on every request vs. the in-memory catalogs.
+
+    python benchmarks/bench_locale.py --requests 20000
+"""
+import argparse, json, os, sys, time, timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from flask import Flask, g, request
+from serc_portal.locales import LocaleCatalogs
+
+I18N = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'serc_portal', 'i18n')
+
+def legacy_load(lang_code='en'):
+    # The pre-catalog implementation: one open + json.load per request, a second on a miss
+    try:
+        with open(os.path.join(I18N, f'{lang_code}.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        with open(os.path.join(I18N, 'en.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+def make_app(loader):
+    app = Flask('bench')
+    app.before_request(lambda: setattr(g, 't', loader(request.args.get('lang'))))
+    app.add_url_rule('/', 'index', lambda: g.t['login'])
+    return app
+
+def per_request_us(app, n, lang):
+    c = app.test_client(); c.get(f'/?lang={lang}')
+    t0 = time.perf_counter()
+    for _ in range(n): c.get(f'/?lang={lang}')
+    return (time.perf_counter() - t0) / n * 1e6
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--calls', type=int, default=200000, help='direct loader calls per variant')
+    ap.add_argument('--requests', type=int, default=5000, help='test-client requests per variant')
+    args = ap.parse_args()
+    catalogs = LocaleCatalogs(I18N, ['en', 'hi'])
+    reloading = LocaleCatalogs(I18N, ['en', 'hi'], auto_reload=True)
+    variants = [('legacy json.load', lambda lang: legacy_load(lang or 'en')),
+                ('catalogs', catalogs.get), ('catalogs+auto_reload', reloading.get)]
+    for lang in ('hi', 'xx'):
+        print(f'lang={lang}')
+        for name, loader in variants:
+            n = args.calls // 20 if name.startswith('legacy') else args.calls
+            fn = timeit.Timer(lambda: loader(lang)).timeit(n) / n * 1e6
+            rq = per_request_us(make_app(loader), args.requests, lang)
+            print(f'  {name:<22} {fn:8.2f} us/call   {rq:8.1f} us/request (test client)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Re-screening a whole cycle: the vectorized rules.screen() vs. RuleBook.check() once per row.
+
+    python benchmarks/datagen.py --users 200000 --workdir /tmp/serc-bench
+    python benchmarks/bench_rescreen.py --workdir /tmp/serc-bench
+
+Both paths read the same frames from the benchmark database; the per-row results are
+compared, so a mismatch between the two implementations fails the run.
+"""
+import argparse, os, sys, tempfile, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def per_row(book, apps, edus, closing):
+    from serc_portal.rules import _date
+    degrees = {}
+    for app_id, level, discipline in edus.itertuples(index=False):
+        degrees.setdefault(app_id, []).append({'level': level, 'discipline': discipline})
+    out = {}
+    for r in apps.itertuples(index=False):
+        dob = _date(r.dob) if r.dob else None
+        reasons = book.check(r.post_code, r.category, dob, degrees.get(r.application_id, []), closing, r.pwbd, r.exsm)
+        out[r.application_id] = '; '.join(reasons)
+    return out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'serc-bench'))
+    ap.add_argument('--rules', default=None, help='rules file (default serc_portal/eligibility.json)')
+    ap.add_argument('--closing-date', default='2025-12-31')
+    args = ap.parse_args()
+    import datagen
+    from serc_portal.extensions import db
+    from serc_portal.rules import RuleBook, load_frames, screen, _date
+    book = RuleBook.load(args.rules); closing = _date(args.closing_date)
+    with datagen.make_app(args.workdir).app_context():
+        t0 = time.perf_counter(); apps, edus = load_frames(db.session.connection()); t_load = time.perf_counter() - t0
+    t0 = time.perf_counter(); result = screen(book, apps, edus, closing); t_vec = time.perf_counter() - t0
+    t0 = time.perf_counter(); expected = per_row(book, apps, edus, closing); t_row = time.perf_counter() - t0
+    mismatches = sum(1 for app_id, reasons in zip(result.application_id, result.reasons) if expected[app_id] != reasons)
+    print(f'{len(apps)} applications, {len(edus)} education rows (loaded in {t_load:.2f}s)')
+    print(f'  vectorized screen()  {t_vec:7.2f}s')
+    print(f'  per-row check()      {t_row:7.2f}s  ({t_row / t_vec:.1f}x)')
+    print(f'  eligible {int(result.eligible.sum())}, not {int((~result.eligible).sum())}; mismatches {mismatches}')
+    return 1 if mismatches else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
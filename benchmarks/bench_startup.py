@@ -0,0 +1,60 @@
+"""Worker start-up cost: wall time and resident memory of a fresh process running create_app().
+
+    python benchmarks/bench_startup.py --runs 7
+
+Every run is a new interpreter, as a gunicorn worker would be without --preload. Each one
+reports the time to import serc_portal and build the app, its RSS afterwards, which heavy
+libraries that pulled in, and the RSS once the report/PDF libraries are loaded as well (what
+a worker pays after its first export). Medians are printed; the app never touches the
+database, so any SQLALCHEMY_DATABASE_URI will do.
+"""
+import argparse, json, os, statistics, subprocess, sys, tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ('pandas', 'numpy', 'openpyxl', 'PIL', 'reportlab')
+
+PROBE = r'''
+import json, os, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, ROOT)
+from serc_portal import create_app
+t_import = time.perf_counter() - t0
+create_app()
+t_total = time.perf_counter() - t0
+def rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            return next(int(l.split()[1]) for l in f if l.startswith('VmRSS:')) / 1024
+    except OSError:
+        import resource; return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+rss = rss_mb(); loaded = [m for m in HEAVY if m in sys.modules]
+t1 = time.perf_counter()
+for m in HEAVY: __import__(m)
+import openpyxl.drawing.image, reportlab.pdfgen.canvas, PIL.Image
+print(json.dumps({'import_s': t_import, 'create_app_s': t_total, 'rss_mb': rss, 'heavy_loaded': loaded,
+                  'heavy_import_s': time.perf_counter() - t1, 'rss_with_heavy_mb': rss_mb()}))
+'''
+
+def run_once():
+    env = dict(os.environ)
+    env.setdefault('SQLALCHEMY_DATABASE_URI', 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'serc-startup.db'))
+    code = f'ROOT = {ROOT!r}; HEAVY = {HEAVY!r}\n' + PROBE
+    out = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--runs', type=int, default=7)
+    args = ap.parse_args()
+    runs = [run_once() for _ in range(args.runs)]
+    med = lambda k: statistics.median(r[k] for r in runs)
+    print(f'{args.runs} fresh processes (medians)')
+    print(f"  import serc_portal       {med('import_s') * 1000:8.0f} ms")
+    print(f"  create_app() total       {med('create_app_s') * 1000:8.0f} ms")
+    print(f"  RSS after create_app()   {med('rss_mb'):8.1f} MB")
+    print(f"  heavy libraries loaded   {', '.join(runs[-1]['heavy_loaded']) or 'none'}")
+    print(f"  + report/PDF libraries   {med('heavy_import_s') * 1000:8.0f} ms, RSS {med('rss_with_heavy_mb'):.1f} MB")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
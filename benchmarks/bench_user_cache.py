@@ -0,0 +1,66 @@
+"""Admin request throughput with the session user loaded from the database on every request
+vs. served from the per-process UserCache.
+
+    python benchmarks/bench_user_cache.py --requests 3000 --applications 2000
+
+Runs the real app against a throwaway SQLite database, logs in as the seeded admin and
+drives the dashboard and the analytics polling endpoint through the test client.
+"""
+import argparse, os, sys, tempfile, time
+from datetime import datetime, timedelta
+
+TMP = tempfile.mkdtemp(prefix='serc-usercache-')
+os.environ.setdefault('SQLALCHEMY_DATABASE_URI', 'sqlite:///' + os.path.join(TMP, 'bench.db'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import event
+from serc_portal import create_app
+from serc_portal.extensions import db
+from serc_portal.models import User, ApplicantProfile, Application, rebuild_status_counts, seed_admin_if_needed
+from serc_portal.usercache import UserCache
+
+ROUTES = ['/admin/', '/admin/analytics/data']
+
+def seed(n):
+    t0 = datetime(2025, 11, 21, 11)
+    conn = db.session.connection()
+    conn.execute(User.__table__.insert(), [{'email': f'u{i}@example.org', 'password_hash': 'x', 'role': 'applicant'} for i in range(n)])
+    ids = [i for (i,) in db.session.query(User.id).filter(User.role == 'applicant')]
+    conn.execute(ApplicantProfile.__table__.insert(), [{'user_id': u, 'name': f'Applicant {u}', 'category': 'UR'} for u in ids])
+    conn.execute(Application.__table__.insert(), [{'user_id': u, 'post_code': f'SCT-{u % 8 + 1}', 'status': 'Submitted',
+                                                   'submitted_at': t0 + timedelta(seconds=u), 'content_version': 1} for u in ids])
+    db.session.commit()
+    rebuild_status_counts()
+
+def run(app, n):
+    c = app.test_client()
+    c.post('/auth/login', data={'email': os.getenv('ADMIN_EMAIL', 'admin@serc.res.in'), 'password': os.getenv('ADMIN_PASSWORD', 'Admin@123')})
+    user_queries = []
+    def count(conn, cursor, statement, *a):
+        if 'FROM user' in statement: user_queries.append(1)
+    with app.app_context(): engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    for path in ROUTES: assert c.get(path).status_code == 200, path
+    user_queries.clear()
+    t0 = time.perf_counter()
+    for i in range(n): c.get(ROUTES[i % len(ROUTES)])
+    elapsed = time.perf_counter() - t0
+    event.remove(engine, 'before_cursor_execute', count)
+    return n / elapsed, len(user_queries)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--requests', type=int, default=3000)
+    ap.add_argument('--applications', type=int, default=2000)
+    args = ap.parse_args()
+    app = create_app()
+    app.config.update(WTF_CSRF_ENABLED=False, SESSION_COOKIE_SECURE=False)
+    with app.app_context(): db.create_all(); seed_admin_if_needed(); seed(args.applications)
+    ttl = app.config['USER_CACHE_TTL'] or 30
+    print(f'{args.requests} requests over {", ".join(ROUTES)}')
+    for label, cache in (('uncached', UserCache(0)), (f'cached (ttl={ttl:g}s)', UserCache(ttl))):
+        app.extensions['user_cache'] = cache
+        rps, queries = run(app, args.requests)
+        print(f'  {label:<20} {rps:8.0f} req/s   {queries} user SELECT(s)')
+
+if __name__ == '__main__':
+    main()
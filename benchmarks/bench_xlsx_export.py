@@ -0,0 +1,73 @@
+"""XLSX export benchmark: N applications with photos, sequential vs. process-pool thumbnailing.
+
+    python benchmarks/bench_xlsx_export.py --rows 10000 --workers 1 4 8
+
+Each configuration runs in a fresh subprocess so peak RSS is reported per run.
+"""
+import argparse, os, resource, subprocess, sys, tempfile, time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def seed(workdir, rows):
+    from PIL import Image
+    from serc_portal.extensions import db
+    from serc_portal.models import User, ApplicantProfile, Application, Payment
+    photos = os.path.join(workdir, 'photos'); os.makedirs(photos, exist_ok=True)
+    src = os.path.join(workdir, 'src.jpg')
+    # Comparable to a real upload: 480x640 JPEG under the default MAX_PHOTO_SIZE (100 KiB)
+    g = Image.radial_gradient('L').resize((480, 640)); n = Image.effect_noise((480, 640), 24)
+    Image.merge('RGB', (g, n, g.transpose(Image.Transpose.FLIP_LEFT_RIGHT))).save(src, quality=85)
+    raw = open(src, 'rb').read()
+    for i in range(1, rows + 1):
+        path = os.path.join(photos, f'{i}.jpg')
+        with open(path, 'wb') as f: f.write(raw)
+        db.session.add(User(id=i, email=f'bench{i}@example.org', password_hash='x'))
+        db.session.add(ApplicantProfile(user_id=i, name=f'Applicant {i}', category='UR', pwbd='No', photo_path=path))
+        db.session.add(Application(id=i, user_id=i, post_code=f'SCT-{i % 8 + 1}', submitted_at=datetime(2025, 12, 1)))
+        db.session.add(Payment(application_id=i, utr=f'UTR{i:08d}', amount=500))
+        if i % 2000 == 0: db.session.commit()
+    db.session.commit()
+
+def make_app(workdir):
+    from flask import Flask
+    from serc_portal.extensions import db
+    from serc_portal import models  # noqa: F401  (register tables)
+    app = Flask('bench')
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    db.init_app(app)
+    return app
+
+def run_one(workdir, workers):
+    from serc_portal.reports.routes import export_rows, EXPORT_COLUMNS
+    from serc_portal.reports.xlsx import write_xlsx
+    app = make_app(workdir)
+    with app.app_context():
+        t0 = time.perf_counter()
+        with tempfile.TemporaryFile() as out:
+            write_xlsx(export_rows(), EXPORT_COLUMNS, out, photo_index=EXPORT_COLUMNS.index('PhotoFile'), workers=workers)
+            size = out.tell()
+        elapsed = time.perf_counter() - t0
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f'workers={workers:<3} time={elapsed:7.2f}s  file={size / 2**20:6.1f} MiB  peak_rss={rss_mb:6.1f} MiB')
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--rows', type=int, default=10000)
+    ap.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    ap.add_argument('--workdir')
+    ap.add_argument('--run-one', type=int, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.run_one is not None:
+        return run_one(args.workdir, args.run_one)
+    workdir = args.workdir or tempfile.mkdtemp(prefix='serc-bench-')
+    from serc_portal.extensions import db
+    app = make_app(workdir)
+    with app.app_context():
+        db.create_all(); seed(workdir, args.rows)
+    print(f'{args.rows} rows with photos in {workdir}')
+    for w in args.workers:
+        subprocess.run([sys.executable, __file__, '--workdir', workdir, '--run-one', str(w)], check=True)
+
+if __name__ == '__main__':
+    main()
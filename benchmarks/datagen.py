@@ -0,0 +1,132 @@
+"""Synthetic recruitment-cycle dataset for benchmarks.
+
+    python benchmarks/datagen.py --users 200000 --workdir /tmp/serc-bench
+
+Fills a SQLite database (or SQLALCHEMY_DATABASE_URI) with applicants, applications,
+educations, employments, documents, payments and dummy photo/signature/PDF blobs in
+<workdir>/uploads/blobs, then rebuilds the status counters, analytics rollups and search index.
+Submissions bunch up towards the closing date the way a real cycle does. Every
+applicant's password is "bench" (see BENCH_PASSWORD). The same --seed always
+produces the same data.
+"""
+import argparse, hashlib, io, os, random, sys, tempfile, time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BENCH_PASSWORD = 'bench'
+POST_CODES = [f'SCT-{i}' for i in range(1, 9)]
+CATEGORIES = (['UR', 'OBC', 'SC', 'ST', 'EWS'], [40, 27, 15, 8, 10])
+STATUSES = (['Submitted', 'Under Review', 'Shortlisted', 'Rejected'], [55, 20, 10, 15])
+DISCIPLINES = ['Civil', 'Structural', 'Mechanical', 'Materials', 'Earthquake', 'Computational Mechanics']
+INSTITUTES = ['IIT Madras', 'IISc', 'NIT Trichy', 'Anna University', 'IIT Bombay', 'IIT Roorkee', 'Jadavpur University']
+DOC_TYPES = ['cat_cert', 'exp_cert', 'equivalence', 'noc', 'fee_receipt', 'other_docs', 'phd_proof']
+CYCLE_DAYS = 30
+CHUNK = 5000
+
+def make_app(workdir):
+    from flask import Flask
+    from serc_portal.extensions import db
+    from serc_portal import models  # noqa: F401  (register tables)
+    app = Flask('datagen')
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('SQLALCHEMY_DATABASE_URI') or 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    db.init_app(app)
+    return app
+
+def _photo(rnd, w, h):
+    from PIL import Image
+    g = Image.radial_gradient('L').resize((w, h)); n = Image.effect_noise((w, h), rnd.randint(8, 32))
+    buf = io.BytesIO(); Image.merge('RGB', (g, n, g.transpose(Image.Transpose.FLIP_LEFT_RIGHT))).save(buf, 'JPEG', quality=80)
+    return buf.getvalue()
+
+def _pdf(rnd):
+    # Minimal PDF header plus filler; size spread like scanned certificates (20 KiB - 2 MiB)
+    return b'%PDF-1.4\n%' + rnd.randbytes(rnd.choice([20, 80, 250, 600, 2048]) * 1024) + b'\n%%EOF\n'
+
+def make_blobs(storage, rnd, distinct):
+    """Store `distinct` dummy files of each kind; returns {'photo': [...], 'sign': [...], 'pdf': [...]} keys."""
+    from serc_portal.storage import blob_key
+    keys = {'photo': [], 'sign': [], 'pdf': []}
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(distinct):
+            for kind, data, ext in (('photo', _photo(rnd, 300, 400), 'jpg'), ('sign', _photo(rnd, 300, 100), 'jpg'), ('pdf', _pdf(rnd), 'pdf')):
+                path = os.path.join(tmp, f'{kind}{i}.{ext}')
+                with open(path, 'wb') as f: f.write(data)
+                key = blob_key(hashlib.sha256(data).hexdigest(), ext)
+                storage.put(key, path, move=True); keys[kind].append(key)
+    return keys
+
+def submitted_at(rnd, closing):
+    # Triangular towards the closing date: a quarter of all submissions land in the last two days
+    return closing - timedelta(days=CYCLE_DAYS * (1 - rnd.triangular(0, 1, 1)) ** 1.5, seconds=rnd.randint(0, 86399))
+
+def generate(users, workdir, seed=42, distinct_files=100, log=print):
+    from werkzeug.security import generate_password_hash
+    from serc_portal.extensions import db
+    from serc_portal.models import (User, ApplicantProfile, Application, Education, Employment, Document, Payment,
+                                    StoredBlob, adjust_blob_refs, rebuild_status_counts, seed_admin_if_needed)
+    from serc_portal.storage import LocalStorage
+    from serc_portal.analytics.rollups import rebuild as rebuild_rollups
+    from serc_portal.search import create_index, reindex
+    rnd = random.Random(seed); t0 = time.perf_counter()
+    db.create_all(); create_index(db.session.connection()); db.session.commit()
+    blobs = make_blobs(LocalStorage(os.path.join(workdir, 'uploads', 'blobs')), rnd, distinct_files)
+    pw = generate_password_hash(BENCH_PASSWORD)
+    closing = datetime(2025, 12, 31, 17, 30)
+    refs = {}
+    def ref(kind):
+        key = rnd.choice(blobs[kind]); refs[key] = refs.get(key, 0) + 1; return key
+    base = (db.session.query(db.func.max(User.id)).scalar() or 0) + 1
+    for start in range(base, base + users, CHUNK):
+        ids = range(start, min(start + CHUNK, base + users))
+        rows = {m: [] for m in (User, ApplicantProfile, Application, Education, Employment, Document, Payment)}
+        for i in ids:
+            cat = rnd.choices(*CATEGORIES)[0]; pwbd = 'Yes' if rnd.random() < 0.04 else 'No'
+            gender = rnd.choice('MMMF')
+            rows[User].append({'id': i, 'email': f'applicant{i}@example.org', 'mobile': f'9{i:09d}'[:10], 'password_hash': pw, 'role': 'applicant'})
+            rows[ApplicantProfile].append({'user_id': i, 'name': f'Applicant {i}', 'gender': gender, 'category': cat, 'pwbd': pwbd,
+                                           'nationality': 'Indian', 'city': 'Chennai', 'state': 'Tamil Nadu',
+                                           'dob': (datetime(1985, 1, 1) + timedelta(days=rnd.randint(0, 5000))).date(),
+                                           'photo_path': ref('photo'), 'sign_path': ref('sign')})
+            rows[Application].append({'id': i, 'user_id': i, 'post_code': rnd.choice(POST_CODES), 'status': rnd.choices(*STATUSES)[0],
+                                      'submitted_at': submitted_at(rnd, closing), 'content_version': 1})
+            for level, year in (('Bachelor', rnd.randint(2005, 2016)), ('Master', rnd.randint(2008, 2019))):
+                rows[Education].append({'application_id': i, 'degree_level': level, 'discipline': rnd.choice(DISCIPLINES),
+                                        'institute': rnd.choice(INSTITUTES), 'year': year, 'marks': str(rnd.randint(60, 95))})
+            if rnd.random() < 0.3:
+                rows[Education].append({'application_id': i, 'degree_level': 'PhD', 'discipline': rnd.choice(DISCIPLINES),
+                                        'institute': '', 'year': rnd.randint(2014, 2025), 'marks': rnd.choice(['Awarded', 'Submitted'])})
+            for _ in range(rnd.choices([0, 1, 2, 3], [40, 35, 18, 7])[0]):
+                rows[Employment].append({'application_id': i, 'org': rnd.choice(INSTITUTES), 'designation': 'Project Associate'})
+            for doc_type in rnd.sample(DOC_TYPES, rnd.randint(1, 4)):
+                key = ref('pdf')
+                rows[Document].append({'application_id': i, 'doc_type': doc_type, 'storage_path': key, 'sha256': key.split('.')[0]})
+            exempt = cat in ('SC', 'ST') or pwbd == 'Yes' or gender == 'F'
+            rows[Payment].append({'application_id': i, 'applicable': not exempt, 'utr': None if exempt else f'UTR{i:012d}',
+                                  'amount': 0 if exempt else 500, 'verified': rnd.random() < 0.6})
+        conn = db.session.connection()
+        for model, values in rows.items():
+            if values: conn.execute(model.__table__.insert(), values)
+        db.session.commit()
+        log(f'{ids[-1] - base + 1}/{users} applicants ({time.perf_counter() - t0:.0f}s)')
+    adjust_blob_refs(db.session.connection(), refs); db.session.commit()  # bulk inserts bypass count_blob_refs
+    rebuild_status_counts(); rebuild_rollups()
+    reindex(db.session.connection()); db.session.commit()
+    seed_admin_if_needed()  # after the applicants, whose ids are assigned explicitly from 1
+    log(f'done in {time.perf_counter() - t0:.0f}s: {users} applications, {db.session.query(StoredBlob).count()} blobs')
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--users', type=int, default=200000)
+    ap.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'serc-bench'))
+    ap.add_argument('--seed', type=int, default=42)
+    ap.add_argument('--distinct-files', type=int, default=100, help='distinct dummy files of each kind, shared across applicants')
+    args = ap.parse_args()
+    os.makedirs(args.workdir, exist_ok=True)
+    app = make_app(args.workdir)
+    with app.app_context():
+        generate(args.users, args.workdir, args.seed, args.distinct_files)
+    print(f'workdir: {args.workdir}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""Route-level load benchmark: latency percentiles and throughput for the hot paths.
+
+    python benchmarks/datagen.py --users 200000 --workdir /tmp/serc-bench
+    python benchmarks/harness.py --workdir /tmp/serc-bench --requests 200
+    python benchmarks/harness.py --workdir /tmp/serc-bench --compare benchmarks/baseline.json
+    python benchmarks/harness.py --workdir /tmp/serc-bench --write-baseline benchmarks/baseline.json
+
+Drives the real app through the Flask test client against a dataset from datagen.py
+(generated on the spot if the workdir has none). Scenarios:
+
+    submit     register a fresh applicant (untimed), then POST a full application with files
+    dashboard  admin dashboard: newest page, status/post filters and deep keyset pages
+    export     streamed CSV export for one post code
+    analytics  the /admin/analytics/data polling endpoint
+    search     ranked full-text search: names, emails, institutes, disciplines, type-ahead prefixes
+
+--compare exits 1 if any scenario's p50 or p90 is more than --tolerance times its
+baseline; the baseline records the dataset size and machine it came from, so only
+compare like with like.
+"""
+import argparse, io, json, os, platform, random, statistics, sys, tempfile, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SCENARIOS = ('submit', 'dashboard', 'export', 'analytics', 'search')
+
+def percentile(sorted_values, p):
+    if not sorted_values: return 0.0
+    k = (len(sorted_values) - 1) * p / 100
+    lo = int(k); hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+def configure(workdir):
+    # Config reads the environment when serc_portal is first imported, so this runs before any import of it
+    os.environ['SQLALCHEMY_DATABASE_URI'] = os.getenv('SQLALCHEMY_DATABASE_URI') or 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    os.environ['UPLOAD_FOLDER'] = os.path.join(workdir, 'uploads')
+    os.environ['PDF_CACHE_FOLDER'] = os.path.join(workdir, 'pdf_cache')
+
+def make_app():
+    from serc_portal import create_app
+    app = create_app()
+    app.config.update(WTF_CSRF_ENABLED=False, SESSION_COOKIE_SECURE=False, REMEMBER_COOKIE_SECURE=False)
+    return app
+
+def admin_client(app):
+    c = app.test_client()
+    c.post('/auth/login', data={'email': os.getenv('ADMIN_EMAIL', 'admin@serc.res.in'), 'password': os.getenv('ADMIN_PASSWORD', 'Admin@123')})
+    return c
+
+def _jpeg(w, h, color):
+    from PIL import Image
+    buf = io.BytesIO(); Image.new('RGB', (w, h), color).save(buf, 'JPEG', quality=85); return buf.getvalue()
+
+def submit_requests(app, rnd):
+    photo, sign = _jpeg(300, 400, 'navy'), _jpeg(300, 100, 'white')
+    cert = b'%PDF-1.4\n%' + rnd.randbytes(200 * 1024) + b'\n%%EOF\n'
+    n = 0
+    while True:
+        n += 1; c = app.test_client()
+        c.post('/auth/register', data={'email': f'bench-{os.getpid()}-{time.time_ns()}-{n}@example.org', 'mobile': '9000000000', 'password': 'bench'})
+        form = {'name': 'Bench Applicant', 'father': 'F', 'mother': 'M', 'dob': '1996-03-04', 'gender': 'F', 'nationality': 'Indian',
+                'category': rnd.choice(['UR', 'OBC', 'SC']), 'pwbd': 'No', 'exsm': 'No', 'addr1': 'a', 'addr2': 'b', 'city': 'Chennai',
+                'state': 'TN', 'pin': '600113', 'postcode': f'SCT-{rnd.randint(1, 8)}', 'bdisc': 'Civil', 'buni': 'IIT Madras',
+                'byear': '2014', 'bmarks': '80', 'mdisc': 'Structures', 'muni': 'IISc', 'myear': '2016', 'mmarks': '85',
+                'fee_applicable': 'Yes', 'utr': f'BENCH{os.getpid()}-{n}', 'utr_date': '2025-12-01',
+                'photo': (io.BytesIO(photo), 'photo.jpg'), 'sign': (io.BytesIO(sign), 'sign.jpg'),
+                'cat_cert': (io.BytesIO(cert), 'cat.pdf')}
+        yield lambda c=c, form=form: c.post('/submit', data=form, content_type='multipart/form-data')
+
+def dashboard_requests(app, rnd):
+    c = admin_client(app)
+    from serc_portal.extensions import db
+    from serc_portal.models import Application
+    with app.app_context():
+        newest, oldest = db.session.query(db.func.max(Application.submitted_at), db.func.min(Application.submitted_at)).one()
+    while True:
+        r = rnd.random(); q = {}
+        if r < 0.3: q['status'] = rnd.choice(['Submitted', 'Under Review', 'Shortlisted', 'Rejected'])
+        elif r < 0.6: q['post_code'] = f'SCT-{rnd.randint(1, 8)}'
+        if newest and rnd.random() < 0.3:  # deep page somewhere in the cycle
+            at = oldest + (newest - oldest) * rnd.random()
+            q['before'] = f'{at.isoformat()}~{10**9}'
+        yield lambda c=c, q=q: c.get('/admin/', query_string=q)
+
+def export_requests(app, rnd):
+    c = admin_client(app)
+    while True:
+        yield lambda c=c, pc=f'SCT-{rnd.randint(1, 8)}': c.get('/admin/reports/export', query_string={'format': 'csv', 'post_code': pc})
+
+def analytics_requests(app, rnd):
+    c = admin_client(app)
+    while True:
+        yield lambda c=c: c.get('/admin/analytics/data')
+
+def search_requests(app, rnd):
+    c = admin_client(app)
+    from datagen import DISCIPLINES, INSTITUTES
+    with app.app_context():
+        from serc_portal.extensions import db
+        from serc_portal.models import Application
+        high = db.session.query(db.func.max(Application.id)).scalar() or 1
+    while True:
+        r = rnd.random(); n = rnd.randint(1, high)
+        if r < 0.3: q = f'applicant {n}'
+        elif r < 0.45: q = f'applicant{n}@example.org'
+        elif r < 0.7: q = rnd.choice(INSTITUTES)
+        elif r < 0.85: q = f'{rnd.choice(DISCIPLINES)} {rnd.choice(INSTITUTES).split()[0]}'
+        else: q = rnd.choice(INSTITUTES)[:rnd.randint(2, 4)]  # type-ahead
+        yield lambda c=c, qs={'q': q, 'page': rnd.choice([1, 1, 1, 2, 5])}: c.get('/admin/search', query_string=qs)
+
+def run_scenario(app, name, n, warmup, seed):
+    rnd = random.Random(seed)
+    requests = globals()[f'{name}_requests'](app, rnd)
+    for _ in range(warmup):
+        r = next(requests)(); r.get_data(); r.close()
+    times = []; statuses = {}
+    for _ in range(n):
+        req = next(requests)
+        t0 = time.perf_counter()
+        r = req(); r.get_data(); r.close()  # consume streamed bodies inside the timing
+        times.append((time.perf_counter() - t0) * 1000)
+        statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+    times.sort()
+    # Throughput over timed work only: setup such as registering the submit scenario's users is excluded
+    return {'requests': n, 'throughput_rps': round(n / (sum(times) / 1000), 1), 'mean_ms': round(statistics.fmean(times), 2),
+            **{f'p{p}_ms': round(percentile(times, p), 2) for p in (50, 90, 99)}, 'max_ms': round(times[-1], 2),
+            'statuses': {str(k): v for k, v in sorted(statuses.items())}}
+
+def compare(results, baseline, tolerance):
+    failures = []
+    for name, res in results.items():
+        base = baseline.get('scenarios', {}).get(name)
+        if not base: continue
+        for metric in ('p50_ms', 'p90_ms'):
+            ratio = res[metric] / base[metric] if base[metric] else 1.0
+            flag = ratio > tolerance
+            if flag: failures.append(name)
+            print(f"  {'REGRESSED' if flag else 'ok       '} {name:<10} {metric:<7} {res[metric]:9.2f} vs {base[metric]:9.2f} ({ratio:4.2f}x)")
+    return failures
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'serc-bench'))
+    ap.add_argument('--users', type=int, default=200000, help='dataset size when the workdir has to be generated')
+    ap.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    ap.add_argument('--requests', type=int, default=200, help='timed requests per scenario')
+    ap.add_argument('--warmup', type=int, default=10)
+    ap.add_argument('--seed', type=int, default=7)
+    ap.add_argument('--compare', metavar='BASELINE')
+    ap.add_argument('--tolerance', type=float, default=1.5)
+    ap.add_argument('--write-baseline', metavar='PATH')
+    args = ap.parse_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+    generate = not os.path.exists(os.path.join(args.workdir, 'bench.db')) and not os.getenv('SQLALCHEMY_DATABASE_URI')
+    configure(args.workdir)
+    if generate:
+        import datagen
+        with datagen.make_app(args.workdir).app_context():
+            datagen.generate(args.users, args.workdir)
+    app = make_app()
+    from serc_portal.extensions import db
+    from serc_portal.models import Application
+    with app.app_context(): applications = db.session.query(db.func.count(Application.id)).scalar()
+
+    results = {}
+    print(f'{applications} applications; {args.requests} requests per scenario')
+    print(f"  {'scenario':<10} {'req/s':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}  statuses")
+    for name in args.scenarios:
+        res = results[name] = run_scenario(app, name, args.requests, args.warmup, args.seed)
+        print(f"  {name:<10} {res['throughput_rps']:8.1f} {res['p50_ms']:9.2f} {res['p90_ms']:9.2f} {res['p99_ms']:9.2f} {res['max_ms']:9.2f}  {res['statuses']}")
+
+    report = {'dataset': {'applications': applications, 'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0]},
+              'machine': {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()},
+              'requests': args.requests, 'scenarios': results}
+    if args.write_baseline:
+        with open(args.write_baseline, 'w') as f: json.dump(report, f, indent=2); f.write('\n')
+        print(f'baseline written to {args.write_baseline}')
+    if args.compare:
+        with open(args.compare) as f: baseline = json.load(f)
+        print(f"against {args.compare} ({baseline['dataset']['applications']} applications, tolerance {args.tolerance}x)")
+        if compare(results, baseline, args.tolerance): return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Query-plan regression check: seed a large SQLite database and assert that the queries
+behind each hot route are served from an index rather than a full table scan.
+
+    python benchmarks/query_plans.py --rows 50000
+
+Every statement a scenario executes is captured and run through EXPLAIN QUERY PLAN on
+the same connection. A plan step "SCAN <table>" without an index on a seeded table fails
+the check unless the scenario explicitly expects to read that whole table. Scenarios
+listed in QUERY_BUDGET also fail if they issue more statements than budgeted, which
+catches lazy loads creeping back into the application graph. Exits 1 on any regression;
+tests/test_query_plans.py runs the same check on a smaller database.
+"""
+import argparse, os, random, re, sys, tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from flask import Flask
+from sqlalchemy import event, tuple_
+from serc_portal.extensions import db
+from serc_portal.models import (User, ApplicantProfile, Application, Education, Employment, Document, Payment,
+                                EmailOutbox, BulkEmailLog, BulkEmailRecipient, status_totals)
+
+STATUSES = ['Submitted', 'Under Review', 'Shortlisted', 'Rejected']
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+# Application graph: joined application/user/profile + one SELECT ... IN per child collection
+QUERY_BUDGET = {'review/view application graph': 6, 'application PDF snapshot': 6, 'PDF snapshots: 100 applications': 6}
+
+def make_app(path):
+    app = Flask('query_plans')
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + path
+    db.init_app(app)
+    return app
+
+def seed(n):
+    rnd = random.Random(42); t0 = datetime(2025, 11, 21, 11)
+    conn = db.session.connection()
+    conn.execute(User.__table__.insert(), [{'id': i, 'email': f'u{i}@example.org', 'password_hash': 'x', 'role': 'applicant'} for i in range(1, n + 1)])
+    conn.execute(ApplicantProfile.__table__.insert(), [{'user_id': i, 'name': f'Applicant {i}', 'category': rnd.choice(['UR', 'OBC', 'SC', 'ST', 'EWS'])} for i in range(1, n + 1)])
+    conn.execute(Application.__table__.insert(), [{'id': i, 'user_id': i, 'post_code': f'SCT-{rnd.randint(1, 8)}', 'status': rnd.choice(STATUSES),
+                                                   'submitted_at': t0 + timedelta(seconds=i * 7), 'content_version': 1} for i in range(1, n + 1)])
+    conn.execute(Education.__table__.insert(), [{'application_id': i, 'degree_level': lvl, 'discipline': 'Civil', 'institute': 'IIT'} for i in range(1, n + 1) for lvl in ('Bachelor', 'Master')])
+    conn.execute(Employment.__table__.insert(), [{'application_id': i, 'org': 'Org'} for i in range(1, n + 1, 3)])
+    conn.execute(Document.__table__.insert(), [{'application_id': i, 'doc_type': 'cat_cert', 'storage_path': f'/u/{i}.pdf'} for i in range(1, n + 1)])
+    conn.execute(Payment.__table__.insert(), [{'application_id': i, 'utr': f'UTR{i:010d}', 'amount': 500, 'applicable': True, 'verified': False} for i in range(1, n + 1)])
+    conn.execute(EmailOutbox.__table__.insert(), [{'application_id': i, 'to_email': f'u{i}@example.org', 'status': 'sent', 'attempts': 1, 'next_attempt_at': t0} for i in range(1, n + 1)])
+    conn.execute(BulkEmailLog.__table__.insert(), [{'id': 1, 'subject': 's', 'status': 'running', 'total': n}])
+    conn.execute(BulkEmailRecipient.__table__.insert(), [{'log_id': 1, 'application_id': i, 'to_email': f'u{i}@example.org', 'status': 'sent' if i < n // 2 else 'pending'} for i in range(1, n + 1)])
+    db.session.commit()
+    conn = db.session.connection(); conn.exec_driver_sql('ANALYZE'); db.session.commit()
+
+def scenarios():
+    from serc_portal.reports.routes import export_rows
+    from serc_portal.pdfs import load_snapshots
+    from serc_portal.loaders import load_application
+    from serc_portal.outbox import delivery_status, due_message_ids
+    A = Application
+    page = lambda q: q.order_by(A.submitted_at.desc(), A.id.desc()).limit(51).all()
+    yield 'dashboard: newest page', set(), lambda: page(A.query)
+    yield 'dashboard: status filter', set(), lambda: page(A.query.filter_by(status='Shortlisted'))
+    yield 'dashboard: post_code filter', set(), lambda: page(A.query.filter_by(post_code='SCT-3'))
+    yield 'dashboard: deep keyset page', set(), lambda: page(A.query.filter(tuple_(A.submitted_at, A.id) < tuple_(datetime(2025, 11, 22), 10**9)))
+    yield 'dashboard: status counters', {'status_counter'}, status_totals
+    def review():
+        a = load_application(777)
+        a.profile, a.user.email, a.educations, a.employments, a.documents, a.payment
+        delivery_status(a.id)
+    yield 'review/view application graph', set(), review
+    yield 'application PDF snapshot', set(), lambda: load_snapshots([db.session.get(A, 778)])
+    yield 'PDF snapshots: 100 applications', set(), lambda: load_snapshots(A.query.filter(A.id.between(1001, 1100)).all())
+    yield 'export: status filter', set(), lambda: list(export_rows(status='Shortlisted'))
+    yield 'export: everything', {'application'}, lambda: list(export_rows())
+    yield 'duplicate check: user + post_code', set(), lambda: A.query.filter_by(user_id=5, post_code='SCT-1').first()
+    yield 'payment lookup by UTR', set(), lambda: Payment.query.filter_by(utr='UTR0000000042').all()
+    yield 'outbox: claim due messages', set(), lambda: due_message_ids(datetime.utcnow(), 50)
+    R = BulkEmailRecipient
+    yield 'campaign: next pending batch', set(), lambda: db.session.query(R.id).filter(R.log_id == 1, R.status == 'pending', R.id > 0).order_by(R.id).limit(200).all()
+
+def check(path, rows, out=print):
+    """Seed (if new) the SQLite file at path and run every scenario; returns the failure messages."""
+    app = make_app(path)
+    failures = []
+    with app.app_context():
+        fresh = not os.path.exists(path) or os.path.getsize(path) == 0
+        db.create_all(bind_key=None)
+        if fresh: seed(rows)
+        seeded = {t for t in db.metadata.tables if t not in ('status_counter', 'submission_rollup', 'bulk_email_log')}
+
+        captured = []
+        def explain(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith('SELECT') and not executemany:
+                raw = conn.connection.driver_connection.cursor()
+                raw.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+                captured.append((statement, [row[3] for row in raw.fetchall()]))
+        event.listen(db.engine, 'before_cursor_execute', explain)
+        try:
+            for name, allowed, run in scenarios():
+                captured.clear(); run(); db.session.rollback()
+                bad = [(sql, step) for sql, plan in captured for step in plan
+                       if (m := FULL_SCAN.match(step)) and m.group(1) in seeded and m.group(1) not in allowed]
+                over = name in QUERY_BUDGET and len(captured) > QUERY_BUDGET[name]
+                out(f"{'FAIL' if bad or over else 'ok  '}  {name}  ({len(captured)} queries)")
+                for sql, step in bad:
+                    failures.append(f'{name}: {step} in {" ".join(sql.split())[:300]}')
+                    out(f'      {step}\n      in: {" ".join(sql.split())[:300]}')
+                if over:
+                    failures.append(f'{name}: {len(captured)} queries, budget {QUERY_BUDGET[name]}')
+                    out(f'      {len(captured)} queries, budget {QUERY_BUDGET[name]}')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', explain)
+    return failures
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--rows', type=int, default=50000)
+    ap.add_argument('--db', help='reuse/create the SQLite file here (default: temp file)')
+    args = ap.parse_args()
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix='serc-plans-'), 'plans.db')
+    failures = check(path, args.rows)
+    print(f'{len(failures)} failure(s); database: {path}')
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""pre-migration features
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-18 07:01:36.000000
+
+Everything added to the models before migrations existed: the mail outbox, campaign
+columns and recipients, derived image paths, content_version, status counters and the
+submission rollup. Those releases relied on db.create_all(), which creates missing tables
+but never adds columns, so a stamped database can have any subset of the tables and none
+of the columns; each is only created when it is missing. status_counter is filled from the
+existing applications, and campaigns logged before the engine existed are marked done.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001a'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+COLUMNS = {
+    'bulk_email_log': [
+        sa.Column('body', sa.Text(), nullable=True),
+        sa.Column('interview_dt', sa.String(length=200), nullable=True),
+        sa.Column('venue', sa.String(length=300), nullable=True),
+        sa.Column('status', sa.String(length=16), nullable=True),
+        sa.Column('total', sa.Integer(), nullable=True),
+        sa.Column('count_failed', sa.Integer(), nullable=True),
+        sa.Column('created_by', sa.String(length=255), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+    ],
+    'applicant_profile': [
+        sa.Column('photo_thumb_path', sa.String(length=300), nullable=True),
+        sa.Column('photo_print_path', sa.String(length=300), nullable=True),
+        sa.Column('sign_print_path', sa.String(length=300), nullable=True),
+    ],
+    'application': [
+        sa.Column('content_version', sa.Integer(), nullable=False, server_default='1'),
+    ],
+}
+
+
+def _tables():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade():
+    insp = sa.inspect(op.get_bind())
+    tables = _tables()
+    for table, columns in COLUMNS.items():
+        have = {c['name'] for c in insp.get_columns(table)}
+        missing = [c for c in columns if c.name not in have]
+        if not missing: continue
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column in missing: batch_op.add_column(column)
+    if 'ix_application_submitted_at_id' not in {i['name'] for i in insp.get_indexes('application')}:
+        with op.batch_alter_table('application', schema=None) as batch_op:
+            batch_op.create_index('ix_application_submitted_at_id', ['submitted_at', 'id'], unique=False)
+
+    if 'rollup_state' not in tables:
+        op.create_table('rollup_state',
+        sa.Column('name', sa.String(length=32), nullable=False),
+        sa.Column('last_id', sa.Integer(), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+        )
+    if 'status_counter' not in tables:
+        op.create_table('status_counter',
+        sa.Column('post_code', sa.String(length=16), nullable=False),
+        sa.Column('status', sa.String(length=32), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('post_code', 'status')
+        )
+    if 'submission_rollup' not in tables:
+        op.create_table('submission_rollup',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('post_code', sa.String(length=16), nullable=False),
+        sa.Column('category', sa.String(length=20), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'post_code', 'category')
+        )
+    if 'bulk_email_recipient' not in tables:
+        op.create_table('bulk_email_recipient',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('log_id', sa.Integer(), nullable=False),
+        sa.Column('application_id', sa.Integer(), nullable=True),
+        sa.Column('to_email', sa.String(length=255), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=True),
+        sa.Column('post_code', sa.String(length=16), nullable=True),
+        sa.Column('status', sa.String(length=16), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['application_id'], ['application.id'], ),
+        sa.ForeignKeyConstraint(['log_id'], ['bulk_email_log.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if 'email_outbox' not in tables:
+        op.create_table('email_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('application_id', sa.Integer(), nullable=True),
+        sa.Column('to_email', sa.String(length=255), nullable=False),
+        sa.Column('subject', sa.String(length=300), nullable=True),
+        sa.Column('body', sa.Text(), nullable=True),
+        sa.Column('status', sa.String(length=16), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=True),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['application_id'], ['application.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+    # Counters are rebuilt rather than trusted: a create_all()-era table may predate some applications
+    op.execute('DELETE FROM status_counter')
+    op.execute("INSERT INTO status_counter (post_code, status, count) "
+               "SELECT post_code, COALESCE(status, 'Submitted'), COUNT(*) FROM application GROUP BY post_code, COALESCE(status, 'Submitted')")
+    op.execute("UPDATE bulk_email_log SET status = 'done', total = COALESCE(count_sent, 0), count_failed = 0 WHERE status IS NULL")
+
+
+def downgrade():
+    op.drop_table('email_outbox')
+    op.drop_table('bulk_email_recipient')
+    op.drop_table('submission_rollup')
+    op.drop_table('status_counter')
+    op.drop_table('rollup_state')
+    with op.batch_alter_table('application', schema=None) as batch_op:
+        batch_op.drop_index('ix_application_submitted_at_id')
+    for table, columns in COLUMNS.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column in reversed(columns): batch_op.drop_column(column.name)
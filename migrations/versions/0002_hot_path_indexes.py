@@ -0,0 +1,50 @@
+"""hot path indexes
+
+Revision ID: 0002
+Revises: 0001a
+Create Date: 2026-10-18 07:01:42.123292
+
+Indexes for every foreign-key lookup and dashboard/export filter. On PostgreSQL they
+are built CONCURRENTLY so a live database keeps accepting submissions meanwhile.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001a'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_applicant_profile_user_id', 'applicant_profile', ['user_id']),
+    ('ix_application_status', 'application', ['status']),
+    ('ix_application_post_code', 'application', ['post_code']),
+    ('ix_application_status_submitted_at', 'application', ['status', 'submitted_at', 'id']),
+    ('ix_application_post_code_submitted_at', 'application', ['post_code', 'submitted_at', 'id']),
+    ('ix_application_user_id_post_code', 'application', ['user_id', 'post_code']),
+    ('ix_education_application_id', 'education', ['application_id']),
+    ('ix_employment_application_id', 'employment', ['application_id']),
+    ('ix_document_application_id', 'document', ['application_id']),
+    ('ix_payment_application_id', 'payment', ['application_id']),
+    ('ix_payment_utr', 'payment', ['utr']),
+    ('ix_bulk_email_recipient_log_status', 'bulk_email_recipient', ['log_id', 'status', 'id']),
+    ('ix_email_outbox_application_id', 'email_outbox', ['application_id']),
+    ('ix_email_outbox_status_next_attempt', 'email_outbox', ['status', 'next_attempt_at']),
+]
+
+
+def upgrade():
+    if op.get_context().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, table, cols in INDEXES:
+                op.create_index(name, table, cols, unique=False, postgresql_concurrently=True, if_not_exists=True)
+    else:
+        for name, table, cols in INDEXES:
+            op.create_index(name, table, cols, unique=False, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, cols in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
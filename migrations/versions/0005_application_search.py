@@ -0,0 +1,46 @@
+"""application full-text search
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 07:29:51.481230
+
+application_search: an FTS5 virtual table on SQLite, a weighted tsvector with a GIN index
+on PostgreSQL (see serc_portal/search.py), backfilled from the existing applications.
+IF NOT EXISTS because `flask init-db` also creates it on a fresh database.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_context().dialect.name == 'postgresql':
+        op.execute('CREATE TABLE IF NOT EXISTS application_search (application_id INTEGER PRIMARY KEY, document TSVECTOR NOT NULL)')
+        op.execute('DELETE FROM application_search')
+        op.execute("""
+            INSERT INTO application_search (application_id, document)
+            SELECT a.id, setweight(to_tsvector('simple', coalesce(p.name, '')), 'A') ||
+                   setweight(to_tsvector('simple', regexp_replace(u.email, '[@._+-]', ' ', 'g')), 'B') ||
+                   setweight(to_tsvector('simple', coalesce((SELECT string_agg(concat_ws(' ', e.discipline, e.institute), ' ')
+                                                             FROM education e WHERE e.application_id = a.id), '')), 'C')
+            FROM application a JOIN "user" u ON u.id = a.user_id LEFT JOIN applicant_profile p ON p.user_id = a.user_id""")
+        op.execute('CREATE INDEX IF NOT EXISTS ix_application_search_document ON application_search USING GIN (document)')
+    else:
+        op.execute("CREATE VIRTUAL TABLE IF NOT EXISTS application_search USING fts5(name, email, education, prefix='2 3', tokenize='unicode61 remove_diacritics 2')")
+        op.execute('DELETE FROM application_search')
+        op.execute("""
+            INSERT INTO application_search (rowid, name, email, education)
+            SELECT a.id, coalesce(p.name, ''), u.email,
+                   coalesce((SELECT group_concat(coalesce(e.discipline, '') || ' ' || coalesce(e.institute, ''), ' ')
+                             FROM education e WHERE e.application_id = a.id), '')
+            FROM application a JOIN "user" u ON u.id = a.user_id LEFT JOIN applicant_profile p ON p.user_id = a.user_id""")
+
+
+def downgrade():
+    op.execute('DROP TABLE IF EXISTS application_search')
@@ -1,36 +1,49 @@
-import json, os
+import os
 from flask import Flask, request, g
-from .extensions import db, login_manager
+from .extensions import db, login_manager, migrate
 from .config import Config
+from .locales import LocaleCatalogs
+from .storage import storage_from_config
+from .usercache import UserCache, SessionUser
+from .metrics import init_metrics
+from . import search
+from .rules import init_rules
 from flask_wtf.csrf import CSRFProtect
 
 csrf = CSRFProtect()
 
-def load_locale(app, lang_code='en'):
-    path = os.path.join(app.root_path, 'i18n', f'{lang_code}.json')
-    try:
-        with open(path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception:
-        with open(os.path.join(app.root_path,'i18n','en.json'),'r',encoding='utf-8') as f:
-            return json.load(f)
-
-def create_app():
+def create_app(config=None):
     app = Flask(__name__, static_folder='static', template_folder='templates')
     app.config.from_object(Config)
+    if config: app.config.update(config)  # e.g. tests pointing the primary and replica at their own files
     csrf.init_app(app)
     db.init_app(app)
+    migrate.init_app(app, db, directory=os.path.join(os.path.dirname(app.root_path), 'migrations'), include_name=search.include_name)
     login_manager.init_app(app)
+    init_metrics(app)
+
+    app.extensions['user_cache'] = UserCache(app.config['USER_CACHE_TTL'], app.config['USER_CACHE_SIZE'])
+
+    def fetch_user(user_id):
+        from .models import User
+        row = db.session.query(User.id, User.email, User.role).filter(User.id == user_id).first()
+        return SessionUser(*row) if row else None
 
     @login_manager.user_loader
     def load_user(user_id):
-        from .models import User
-        return User.query.get(int(user_id))
+        return app.extensions['user_cache'].get(int(user_id), fetch_user)
+
+    locales = app.extensions['locales'] = LocaleCatalogs(
+        os.path.join(app.root_path, 'i18n'), app.config['LANGUAGES'],
+        auto_reload=app.config['LOCALE_AUTO_RELOAD'])
+
+    app.extensions['storage'] = storage_from_config(app.config)
+    init_rules(app)
 
     @app.before_request
     def inject_locale():
-        lang = request.cookies.get('lang') or request.args.get('lang') or 'en'
-        g.t = load_locale(app, lang)
+        if request.endpoint == 'static': return
+        g.t = locales.get(request.cookies.get('lang') or request.args.get('lang'))
 
     @app.after_request
     def add_security_headers(resp):
@@ -56,8 +69,8 @@ def create_app():
     app.register_blueprint(analytics_bp)
     app.register_blueprint(reports_bp)
 
-    with app.app_context():
-        from .models import seed_admin_if_needed
-        db.create_all()
-        seed_admin_if_needed()
+    from .cli import register_commands
+    register_commands(app)
+    # The schema and the admin account come from `flask init-db` (or `flask db upgrade` +
+    # `flask seed-admin`), run once per deployment rather than in every worker
     return app
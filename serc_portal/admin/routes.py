@@ -1,10 +1,18 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, g
+from flask import Blueprint, render_template, request, redirect, url_for, flash, g, current_app, Response, stream_with_context, abort
 from flask_login import login_required, current_user
 from ..extensions import db
-from ..models import Application, ApplicantProfile, Education, Employment, Document, Payment, BulkEmailLog, User
-from ..mailer import Mailer
-from ..config import Config
+from ..models import Application, ApplicantProfile, Payment, BulkEmailLog, User, StatusChange, ReportJob, status_totals
+from ..outbox import enqueue, delivery_status
+from ..loaders import load_application
+from ..search import search as search_index
+from ..campaigns import compile_template, iter_recipients, create_campaign, requeue
+from ..transitions import STATUSES, NOTIFY_SUBJECT, notification_body, bulk_transition
+from ..dedupe import CLUSTER_COLUMNS, latest_run, stored_clusters
+from .. import jobs
+from ..replica import read_replica
+import csv, io, json, re
 from datetime import datetime
+from sqlalchemy import tuple_
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -18,25 +26,59 @@ def restrict_to_admin():
 
 @admin_bp.route('/')
 @login_required
+@read_replica
 def dashboard():
     q = Application.query
     status = request.args.get('status'); post_code = request.args.get('post_code')
     if status: q = q.filter_by(status=status)
     if post_code: q = q.filter_by(post_code=post_code)
-    apps = q.order_by(Application.submitted_at.desc()).limit(500).all()
-    counts = {s: Application.query.filter_by(status=s).count() for s in ['Submitted','Under Review','Shortlisted','Rejected']}
-    return render_template('admin/dashboard.html', apps=apps, counts=counts, t=g.t)
+    # Keyset pagination on (submitted_at, id): every page is an index range scan, however deep
+    cursor = decode_cursor(request.args.get('before'))
+    if cursor: q = q.filter(tuple_(Application.submitted_at, Application.id) < tuple_(*cursor))
+    size = current_app.config['DASHBOARD_PAGE_SIZE']
+    apps = q.order_by(Application.submitted_at.desc(), Application.id.desc()).limit(size + 1).all()
+    next_cursor = encode_cursor(apps[size - 1]) if len(apps) > size else None
+    apps = apps[:size]
+    totals = status_totals()
+    counts = {s: totals.get(s, 0) for s in STATUSES}
+    return render_template('admin/dashboard.html', apps=apps, counts=counts, statuses=STATUSES, next_cursor=next_cursor, paged=bool(cursor), t=g.t)
+
+@admin_bp.route('/search')
+@login_required
+def search():
+    q = (request.args.get('q') or '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    size = current_app.config['DASHBOARD_PAGE_SIZE']
+    hits = search_index(db.session.connection(), q, size + 1, (page - 1) * size, current_app.config['SEARCH_RANK_WINDOW']) if q else []
+    has_next = len(hits) > size; hits = hits[:size]
+    rows = {}
+    if hits:
+        ids = [app_id for app_id, _ in hits]
+        rows = {a.id: (a, name, email) for a, name, email in
+                db.session.query(Application, ApplicantProfile.name, User.email)
+                .join(User, User.id == Application.user_id)
+                .outerjoin(ApplicantProfile, ApplicantProfile.user_id == Application.user_id)
+                .filter(Application.id.in_(ids))}
+    results = [rows[app_id] for app_id, _ in hits if app_id in rows]
+    return render_template('admin/search.html', q=q, results=results, page=page, has_next=has_next, t=g.t)
+
+def encode_cursor(app):
+    return f'{app.submitted_at.isoformat()}~{app.id}'
+
+def decode_cursor(value):
+    try:
+        ts, app_id = (value or '').rsplit('~', 1)
+        return datetime.fromisoformat(ts), int(app_id)
+    except ValueError:
+        return None
 
 @admin_bp.route('/application/<int:app_id>')
 @login_required
 def review_application(app_id):
-    app = Application.query.get_or_404(app_id)
-    profile = ApplicantProfile.query.filter_by(user_id=app.user_id).first()
-    edus = Education.query.filter_by(application_id=app.id).all()
-    emps = Employment.query.filter_by(application_id=app.id).all()
-    docs = Document.query.filter_by(application_id=app.id).all()
-    pay = Payment.query.filter_by(application_id=app.id).first()
-    return render_template('admin/review.html', app=app, profile=profile, edus=edus, emps=emps, docs=docs, pay=pay, t=g.t)
+    app = load_application(app_id)
+    mails = delivery_status(app.id)
+    return render_template('admin/review.html', app=app, profile=app.profile, edus=app.educations, emps=app.employments,
+                           docs=app.documents, pay=app.payment, mails=mails, t=g.t)
 
 @admin_bp.route('/application/<int:app_id>/status', methods=['POST'])
 @login_required
@@ -45,22 +87,67 @@ def update_status(app_id):
     new_status = request.form.get('status')
     tag = request.form.get('shortlist_tag')
     notes = request.form.get('reviewer_notes')
-    if new_status not in ['Submitted','Under Review','Shortlisted','Rejected']:
+    if new_status not in STATUSES:
         flash('Invalid status', 'danger'); return redirect(url_for('admin.review_application', app_id=app.id))
+    db.session.add(StatusChange(application_id=app.id, from_status=app.status, to_status=new_status, shortlist_tag=tag or None,
+                                reviewer_notes=notes or None, changed_by=current_user.email))
     app.status = new_status; app.shortlist_tag = tag; app.reviewer_notes = notes
+    u = db.session.get(User, app.user_id)
+    if u:
+        enqueue(u.email, NOTIFY_SUBJECT, notification_body(app.id, new_status), application_id=app.id)
     db.session.commit()
 
-    mailer = Mailer(Config.SMTP_HOST, Config.SMTP_PORT, Config.SMTP_USER, Config.SMTP_PASS, Config.FROM_EMAIL)
-    try:
-        u = User.query.get(app.user_id)
-        if u:
-            mailer.send(u.email, 'CSIR-SERC — Application Status Updated', f'Your application #{app.id} status is now: {new_status}.')
-    except Exception:
-        pass
-
     flash('Status updated', 'success')
     return redirect(url_for('admin.review_application', app_id=app.id))
 
+@admin_bp.route('/bulk-status', methods=['POST'])
+@login_required
+def bulk_status():
+    f = request.form
+    back = url_for('admin.dashboard', status=f.get('filter_status') or None, post_code=f.get('filter_post_code') or None)
+    try:
+        if f.get('scope') == 'filter':
+            criteria = {'filter_status': f.get('filter_status'), 'filter_post_code': f.get('filter_post_code')}
+        else:
+            ids = {int(x) for x in f.getlist('app_id') + re.split(r'[\s,]+', f.get('app_ids') or '') if x}
+            criteria = {'app_ids': sorted(ids) or None}
+        n = bulk_transition(f.get('status'), shortlist_tag=f.get('shortlist_tag'), reviewer_notes=f.get('reviewer_notes'),
+                            changed_by=current_user.email, **criteria)
+    except ValueError as e:
+        flash(f'Bulk update not applied: {e}', 'danger'); return redirect(back)
+    flash(f'{n} application(s) moved to {f.get("status")}; notifications queued.', 'success')
+    return redirect(back)
+
+@admin_bp.route('/duplicates')
+@login_required
+def duplicates():
+    # detect() takes seconds on a full cycle, so pages and the download read the last stored scan;
+    # a new scan runs as a report job (or `flask find-duplicates`)
+    run = latest_run()
+    scanning = ReportJob.query.filter(ReportJob.kind == 'duplicates', ReportJob.status.in_(jobs.IN_FLIGHT)).first()
+    if request.args.get('download'):
+        if not run: abort(404)
+        def iter_clusters():
+            buf = io.StringIO(); w = csv.writer(buf, lineterminator='\n')
+            w.writerow(CLUSTER_COLUMNS)
+            for i, row in enumerate(stored_clusters(run.id).yield_per(1000), start=1):
+                w.writerow(row)
+                if i % 500 == 0: yield buf.getvalue(); buf.seek(0); buf.truncate()
+            yield buf.getvalue()
+        return Response(stream_with_context(iter_clusters()), mimetype='text/csv',
+                        headers={'Content-Disposition': 'attachment; filename=duplicates.csv'})
+    page = max(request.args.get('page', 1, type=int), 1)
+    size = current_app.config['DASHBOARD_PAGE_SIZE']
+    total = run.clusters if run else 0
+    groups = {}
+    if run:
+        for r in stored_clusters(run.id, (page - 1) * size + 1, page * size):
+            groups.setdefault(r.cluster, []).append(r._asdict())
+    summary = json.loads(run.summary) if run else {'by_key': {}, 'skipped': {}}
+    return render_template('admin/duplicates.html', run=run, scanning=scanning, groups=list(groups.items()), total=total,
+                           by_key=summary['by_key'] if total else {}, skipped=summary['skipped'],
+                           page=page, has_next=page * size < total, t=g.t)
+
 @admin_bp.route('/payment/verify', methods=['POST'])
 @login_required
 def payment_verify():
@@ -79,44 +166,40 @@ def bulk_email():
         filter_status = request.form.get('filter_status')
         filter_post_code = request.form.get('filter_post_code')
         subject = request.form.get('subject')
-        body = request.form.get('body')
+        body = request.form.get('body') or ''
         interview_dt = request.form.get('interview_dt') or ''
         venue = request.form.get('venue') or ''
         dry_run = request.form.get('dry_run') == 'on'
+        try:
+            fill = compile_template(body, interview_dt=interview_dt, venue=venue)
+        except (KeyError, ValueError, IndexError) as e:
+            flash(f'Invalid placeholder in body: {e}', 'danger'); return redirect(url_for('admin.bulk_email'))
 
-        q = Application.query
-        if filter_status: q = q.filter_by(status=filter_status)
-        if filter_post_code: q = q.filter_by(post_code=filter_post_code)
-        apps = q.all()
-
-        sent = 0
-        mailer = Mailer(Config.SMTP_HOST, Config.SMTP_PORT, Config.SMTP_USER, Config.SMTP_PASS, Config.FROM_EMAIL)
-        previews = []
-        for a in apps:
-            u = User.query.get(a.user_id)
-            prof = ApplicantProfile.query.filter_by(user_id=a.user_id).first()
-            if not u or not u.email: continue
-            placeholders = {
-                'name': (prof.name if prof else ''),
-                'post_code': a.post_code,
-                'app_id': a.id,
-                'interview_dt': interview_dt,
-                'venue': venue
-            }
-            body_filled = body.format(**placeholders)
-            if dry_run:
-                previews.append({'to': u.email, 'subject': subject, 'body': body_filled})
-            else:
-                try:
-                    mailer.send(u.email, subject, body_filled)
-                    sent += 1
-                except Exception:
-                    continue
         if dry_run:
-            flash(f'Dry run generated {len(previews)} previews. No emails sent.', 'info')
-            return render_template('admin/bulk_email.html', previews=previews, t=g.t)
-        log = BulkEmailLog(subject=subject, body_preview=(body[:500]+'...' if len(body)>500 else body), filter_status=filter_status, filter_post_code=filter_post_code, count_sent=sent)
-        db.session.add(log); db.session.commit()
-        flash(f'Bulk email sent to {sent} applicants.', 'success')
+            limit = current_app.config['BULK_EMAIL_PREVIEW_LIMIT']
+            previews = []; total = 0
+            for r in iter_recipients(filter_status, filter_post_code):
+                total += 1
+                if len(previews) < limit:
+                    previews.append({'to': r['to'], 'subject': subject, 'body': fill(r)})
+            flash(f'Dry run matched {total} applicants (showing {len(previews)} previews). No emails sent.', 'info')
+            return render_template('admin/bulk_email.html', previews=previews, campaigns=recent_campaigns(), t=g.t)
+        log = create_campaign(subject, body, filter_status, filter_post_code, interview_dt, venue, created_by=current_user.email)
+        flash(f'Campaign #{log.id} queued for {log.total} applicants.', 'success')
         return redirect(url_for('admin.bulk_email'))
-    return render_template('admin/bulk_email.html', previews=None, t=g.t)
+    return render_template('admin/bulk_email.html', previews=None, campaigns=recent_campaigns(), t=g.t)
+
+def recent_campaigns(limit=20):
+    return BulkEmailLog.query.order_by(BulkEmailLog.id.desc()).limit(limit).all()
+
+@admin_bp.route('/bulk-email/<int:log_id>/resume', methods=['POST'])
+@login_required
+def bulk_email_resume(log_id):
+    log = BulkEmailLog.query.get_or_404(log_id)
+    if log.status == 'queued':
+        flash(f'Campaign #{log.id} is already queued.', 'info')
+    elif not requeue(log, current_app.config['BULK_EMAIL_LEASE_SECONDS']):
+        flash(f'Campaign #{log.id} is still being sent; it can be resumed once its worker stops.', 'warning')
+    else:
+        flash(f'Campaign #{log.id} re-queued; failed recipients will be retried.', 'success')
+    return redirect(url_for('admin.bulk_email'))
@@ -0,0 +1,60 @@
+"""Submission analytics from SubmissionRollup, which models.count_submissions keeps current on
+every flush exactly as StatusCounter is, so the rollups and the status totals never disagree.
+Set-based writes that move applications between posts must adjust both themselves;
+`flask rebuild-analytics` recomputes the rollups from scratch.
+"""
+import hashlib, json, threading, time
+from datetime import date
+from sqlalchemy import func
+from ..extensions import db
+from ..models import Application, ApplicantProfile, SubmissionRollup, upsert_increment, status_totals
+
+UNSPECIFIED = 'Unspecified'
+
+def _day(value):
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+def rebuild():
+    """Recompute every rollup row from the applications; returns applications counted."""
+    SubmissionRollup.query.delete()
+    groups = (db.session.query(func.date(Application.submitted_at), Application.post_code, ApplicantProfile.category, func.count())
+              .outerjoin(ApplicantProfile, ApplicantProfile.user_id == Application.user_id)
+              .filter(Application.submitted_at.isnot(None))
+              .group_by(func.date(Application.submitted_at), Application.post_code, ApplicantProfile.category).all())
+    rows = {}
+    for day, pc, cat, cnt in groups:
+        key = (_day(day), pc, cat or '')
+        rows[key] = rows.get(key, 0) + cnt
+    upsert_increment(db.session.connection(), SubmissionRollup.__table__, ('day', 'post_code', 'category'),
+                     [{'day': d, 'post_code': pc, 'category': cat, 'count': c} for (d, pc, cat), c in rows.items()])
+    db.session.commit()
+    return sum(rows.values())
+
+def summary():
+    by_post = {}; by_category = {}; daily = {}
+    for day, pc, cat, cnt in db.session.query(SubmissionRollup.day, SubmissionRollup.post_code, SubmissionRollup.category, SubmissionRollup.count).filter(SubmissionRollup.count != 0):
+        by_post[pc] = by_post.get(pc, 0) + cnt
+        cat = cat or UNSPECIFIED
+        by_category[cat] = by_category.get(cat, 0) + cnt
+        series = daily.setdefault(pc, {}); d = day.isoformat()
+        series[d] = series.get(d, 0) + cnt
+    return {'by_post': by_post, 'by_status': status_totals(), 'by_category': by_category,
+            'daily_by_post': {pc: dict(sorted(s.items())) for pc, s in daily.items()}}
+
+class TTLCache:
+    """Process-local cache of (payload, etag) pairs; entries expire after ttl seconds."""
+    def __init__(self, ttl):
+        self.ttl = ttl; self._lock = threading.Lock(); self._entries = {}
+    def get(self, key, compute):
+        now = time.monotonic()
+        hit = self._entries.get(key)
+        if hit and hit[0] > now: return hit[1], hit[2]
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit and hit[0] > now: return hit[1], hit[2]
+            payload = compute()
+            etag = hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+            self._entries[key] = (now + self.ttl, payload, etag)
+            return payload, etag
+    def clear(self):
+        self._entries.clear()
@@ -1,7 +1,7 @@
-from flask import Blueprint, render_template, jsonify, g
+from flask import Blueprint, render_template, jsonify, g, request, current_app
 from flask_login import login_required, current_user
-from ..models import Application, ApplicantProfile
-from sqlalchemy import func
+from .rollups import summary, TTLCache
+from ..replica import read_replica
 
 analytics_bp = Blueprint('analytics', __name__, url_prefix='/admin/analytics')
 
@@ -22,8 +22,14 @@ def analytics_home():
 
 @analytics_bp.route('/data')
 @login_required
+@read_replica
 def analytics_data():
-    by_post = dict((pc, cnt) for pc, cnt in Application.query.with_entities(Application.post_code, func.count('*')).group_by(Application.post_code).all())
-    by_status = dict((st, cnt) for st, cnt in Application.query.with_entities(Application.status, func.count('*')).group_by(Application.status).all())
-    by_category = dict((cat, cnt) for cat, cnt in ApplicantProfile.query.with_entities(ApplicantProfile.category, func.count('*')).group_by(ApplicantProfile.category).all())
-    return jsonify({'by_post': by_post,'by_status': by_status,'by_category': by_category})
+    cfg = current_app.config
+    cache = current_app.extensions.get('analytics_cache')
+    if cache is None:
+        cache = current_app.extensions['analytics_cache'] = TTLCache(cfg['ANALYTICS_CACHE_TTL'])
+    # Rollups and status counters are both maintained per flush, so one replica read sees them agree
+    payload, etag = cache.get('summary', summary)
+    resp = jsonify(payload)
+    resp.set_etag(etag); resp.headers['Cache-Control'] = 'private, no-cache'
+    return resp.make_conditional(request)
@@ -1,12 +1,19 @@
 import os
 from datetime import datetime
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, send_file, g
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, send_file, g, abort
 from flask_login import login_required, current_user
-from werkzeug.utils import secure_filename
+from sqlalchemy.exc import IntegrityError
 from ..extensions import db
 from ..models import ApplicantProfile, Application, Education, Employment, Document, Payment, User
 from ..rules import validate_eligibility
-from ..mailer import Mailer
+from ..outbox import enqueue
+from ..imaging import apply_derived_images
+from ..uploads import UploadBatch, UploadError
+from ..storage import get_storage, send_blob
+from ..pdfs import open_cached
+from ..loaders import load_application
+from ..search import reindex
+from ..dedupe import prior_submission, claim_submission
 
 ALLOWED_IMG = {'jpg','jpeg','png'}
 ALLOWED_PDF = {'pdf'}
@@ -18,15 +25,11 @@ applicant_bp = Blueprint('applicant', __name__)
 def apply():
     return render_template('applicant/portal.html', t=g.t)
 
-def check_size(stream, max_bytes):
-    stream.seek(0, os.SEEK_END)
-    size = stream.tell()
-    stream.seek(0)
-    return size <= max_bytes
-
 @applicant_bp.route('/submit', methods=['POST'])
 @login_required
 def submit():
+    # One unit of work: rows are flushed, never committed piecemeal, and uploads are promoted just
+    # before the single commit, so no committed row can point at a blob that was never stored.
     profile = ApplicantProfile.query.filter_by(user_id=current_user.id).first() or ApplicantProfile(user_id=current_user.id)
     for field in ['name','father','mother','gender','nationality','category','pwbd','exsm','addr1','addr2','city','state','pin']:
         setattr(profile, field, request.form.get(field))
@@ -36,83 +39,78 @@ def submit():
     except Exception:
         flash('Invalid Date of Birth', 'danger'); return redirect(url_for('applicant.apply'))
 
-    upload_dir = current_app.config['UPLOAD_FOLDER']; os.makedirs(upload_dir, exist_ok=True)
-    def save_file(field, allowed, max_bytes=None):
-        f = request.files.get(field)
-        if f and f.filename:
-            ext = f.filename.rsplit('.',1)[-1].lower()
-            if ext not in allowed:
-                flash(f'Invalid file type for {field}', 'danger'); return None
-            if max_bytes and not check_size(f.stream, max_bytes):
-                flash(f'{field} exceeds allowed size', 'danger'); return None
-            fname = secure_filename(f"{current_user.id}_{field}_{int(datetime.utcnow().timestamp())}.{ext}")
-            path = os.path.join(upload_dir, fname)
-            f.stream.seek(0); f.save(path)
-            return path
-        return None
-    photo_path = save_file('photo', ALLOWED_IMG, current_app.config['MAX_PHOTO_SIZE'])
-    sign_path = save_file('sign', ALLOWED_IMG, current_app.config['MAX_SIGN_SIZE'])
-    if not photo_path or not sign_path:
-        flash('Photo/Signature missing or invalid.', 'danger'); return redirect(url_for('applicant.apply'))
-    profile.photo_path = photo_path; profile.sign_path = sign_path
-    db.session.add(profile); db.session.commit()
-
     post_code = request.form.get('postcode')
+    prior = prior_submission(current_user.id, post_code, request.form.get('utr'))
+    if prior:
+        field, prior_id = prior
+        flash(f'You have already applied for {post_code} (application #{prior_id}).' if field == 'post_code'
+              else f'This UTR was already submitted with application #{prior_id}.', 'danger')
+        return redirect(url_for('applicant.apply'))
     degrees = [{'level':'Bachelor','discipline':request.form.get('bdisc') or ''},{'level':'Master','discipline':request.form.get('mdisc') or ''}]
-    ok, msg = validate_eligibility(post_code, profile.category, dob_str, degrees, current_app.config['CLOSING_DATE'])
+    ok, msg = validate_eligibility(post_code, profile.category, dob_str, degrees, current_app.config['CLOSING_DATE'],
+                                   pwbd=profile.pwbd, exsm=profile.exsm)
     if not ok:
         flash(msg, 'danger'); return redirect(url_for('applicant.apply'))
 
-    app = Application(user_id=current_user.id, post_code=post_code, status='Submitted')
-    db.session.add(app); db.session.commit()
+    cfg = current_app.config
+    with UploadBatch(get_storage(), cfg['UPLOAD_FOLDER']) as batch:
+        def stage(f, field, allowed, max_bytes):
+            try:
+                return batch.stage(f, allowed, max_bytes)
+            except UploadError as e:
+                flash(f'{field}: {e}', 'danger'); return None
+        photo = sign = None
+        if request.files.get('photo') and request.files['photo'].filename:
+            photo = stage(request.files['photo'], 'photo', ALLOWED_IMG, cfg['MAX_PHOTO_SIZE'])
+        if request.files.get('sign') and request.files['sign'].filename:
+            sign = stage(request.files['sign'], 'sign', ALLOWED_IMG, cfg['MAX_SIGN_SIZE'])
+        if not photo or not sign:
+            flash('Photo/Signature missing or invalid.', 'danger'); return redirect(url_for('applicant.apply'))
+        profile.photo_path = photo.key; profile.sign_path = sign.key
+        apply_derived_images(profile, cfg, batch)
+        db.session.add(profile)
 
-    edu_entries = [
-        ('Bachelor', request.form.get('bdisc'), request.form.get('buni'), request.form.get('byear'), request.form.get('bmarks')),
-        ('Master', request.form.get('mdisc'), request.form.get('muni'), request.form.get('myear'), request.form.get('mmarks')),
-    ]
-    for level, disc, inst, year, marks in edu_entries:
-        if disc and inst:
-            e = Education(application_id=app.id, degree_level=level, discipline=disc, institute=inst,
-                          year=int(year) if year else None, marks=marks)
-            db.session.add(e)
-    phd_area = request.form.get('phd_area'); phd_status = request.form.get('phd_status'); phd_date = request.form.get('phd_date')
-    if phd_area or phd_status:
-        e = Education(application_id=app.id, degree_level='PhD', discipline=phd_area or '', institute='',
-                      year=int(phd_date.split('-')[0]) if (phd_date and '-' in phd_date) else None, marks=phd_status or '')
-        db.session.add(e)
-    db.session.commit()
+        app = Application(user_id=current_user.id, post_code=post_code, status='Submitted')
+        db.session.add(app); db.session.flush()
+        claim_submission(app.id, current_user.id, post_code, request.form.get('utr'))
+        try:
+            db.session.flush()
+        except IntegrityError:  # a concurrent submission claimed the same post or UTR after prior_submission() ran
+            db.session.rollback()
+            flash(f'You have already applied for {post_code}, or this UTR was already submitted.', 'danger')
+            return redirect(url_for('applicant.apply'))
 
-    pdf_fields = ['phd_synopsis','phd_proof','cat_cert','pwbd_cert','equivalence','exp_cert','other_docs','noc','fee_receipt','exempt_proof']
-    for field in pdf_fields:
-        files = request.files.getlist(field)
-        for f in files:
-            if f and f.filename:
-                ext = f.filename.rsplit('.',1)[-1].lower()
-                if ext != 'pdf':
-                    flash(f'Invalid file type for {field}', 'danger'); continue
-                if not check_size(f.stream, current_app.config['MAX_PDF_SIZE']):
-                    flash(f'{field} PDF too large', 'danger'); continue
-                fname = secure_filename(f"{current_user.id}_{field}_{int(datetime.utcnow().timestamp())}.pdf")
-                path = os.path.join(upload_dir, fname)
-                f.stream.seek(0); f.save(path)
-                doc = Document(application_id=app.id, doc_type=field, storage_path=path)
-                db.session.add(doc)
-    db.session.commit()
+        edu_entries = [
+            ('Bachelor', request.form.get('bdisc'), request.form.get('buni'), request.form.get('byear'), request.form.get('bmarks')),
+            ('Master', request.form.get('mdisc'), request.form.get('muni'), request.form.get('myear'), request.form.get('mmarks')),
+        ]
+        for level, disc, inst, year, marks in edu_entries:
+            if disc and inst:
+                db.session.add(Education(application_id=app.id, degree_level=level, discipline=disc, institute=inst,
+                                         year=int(year) if year else None, marks=marks))
+        phd_area = request.form.get('phd_area'); phd_status = request.form.get('phd_status'); phd_date = request.form.get('phd_date')
+        if phd_area or phd_status:
+            db.session.add(Education(application_id=app.id, degree_level='PhD', discipline=phd_area or '', institute='',
+                                     year=int(phd_date.split('-')[0]) if (phd_date and '-' in phd_date) else None, marks=phd_status or ''))
 
-    fee_applicable = request.form.get('fee_applicable') == 'Yes'
-    pay = Payment(application_id=app.id, applicable=fee_applicable, utr=request.form.get('utr'),
-                  utr_date=datetime.strptime(request.form.get('utr_date'), '%Y-%m-%d').date() if request.form.get('utr_date') else None,
-                  amount=500 if fee_applicable else 0)
-    db.session.add(pay); db.session.commit()
+        pdf_fields = ['phd_synopsis','phd_proof','cat_cert','pwbd_cert','equivalence','exp_cert','other_docs','noc','fee_receipt','exempt_proof']
+        for field in pdf_fields:
+            for f in request.files.getlist(field):
+                if f and f.filename:
+                    doc = stage(f, field, ALLOWED_PDF, cfg['MAX_PDF_SIZE'])
+                    if doc:
+                        db.session.add(Document(application_id=app.id, doc_type=field, storage_path=doc.key, sha256=doc.sha256, size_bytes=doc.size))
 
-    mailer = Mailer(current_app.config['SMTP_HOST'], current_app.config['SMTP_PORT'], current_app.config['SMTP_USER'], current_app.config['SMTP_PASS'], current_app.config['FROM_EMAIL'])
-    try:
-        mailer.send(current_user.email, 'CSIR-SERC — Application Submitted', f'Thank you. Your application #{app.id} for {post_code} has been submitted.')
-    except Exception: pass
-    try:
-        admin_email = os.getenv('ADMIN_EMAIL','admin@serc.res.in')
-        mailer.send(admin_email, 'New Application Submitted', f'Application #{app.id} submitted by {current_user.email} for {post_code}.')
-    except Exception: pass
+        fee_applicable = request.form.get('fee_applicable') == 'Yes'
+        pay = Payment(application_id=app.id, applicable=fee_applicable, utr=request.form.get('utr'),
+                      utr_date=datetime.strptime(request.form.get('utr_date'), '%Y-%m-%d').date() if request.form.get('utr_date') else None,
+                      amount=500 if fee_applicable else 0)
+        db.session.add(pay)
+        db.session.flush(); reindex(db.session.connection(), current_user.id)
+        enqueue(current_user.email, 'CSIR-SERC — Application Submitted', f'Thank you. Your application #{app.id} for {post_code} has been submitted.', application_id=app.id)
+        enqueue(os.getenv('ADMIN_EMAIL','admin@serc.res.in'), 'New Application Submitted', f'Application #{app.id} submitted by {current_user.email} for {post_code}.', application_id=app.id)
+        batch.promote()  # a failed commit leaves only unreferenced content-addressed blobs behind
+        db.session.commit()
 
     flash('Application submitted successfully.', 'success')
     return redirect(url_for('applicant.view_application', app_id=app.id))
@@ -120,44 +118,37 @@ def submit():
 @applicant_bp.route('/application/<int:app_id>')
 @login_required
 def view_application(app_id):
-    app = Application.query.get_or_404(app_id)
+    app = load_application(app_id)
     if app.user_id != current_user.id and current_user.role not in ['admin','reviewer']:
         flash('Unauthorized', 'danger'); return redirect(url_for('applicant.apply'))
-    profile = ApplicantProfile.query.filter_by(user_id=app.user_id).first()
-    edus = Education.query.filter_by(application_id=app.id).all()
-    emps = Employment.query.filter_by(application_id=app.id).all()
-    docs = Document.query.filter_by(application_id=app.id).all()
-    pay = Payment.query.filter_by(application_id=app.id).first()
-    return render_template('applicant/view_application.html', app=app, profile=profile, edus=edus, emps=emps, docs=docs, pay=pay, t=g.t)
+    return render_template('applicant/view_application.html', app=app, profile=app.profile, edus=app.educations,
+                           emps=app.employments, docs=app.documents, pay=app.payment, t=g.t)
 
 @applicant_bp.route('/application/<int:app_id>/pdf')
 @login_required
 def application_pdf(app_id):
-    from reportlab.lib.pagesizes import A4
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.utils import ImageReader
-    from io import BytesIO
     app = Application.query.get_or_404(app_id)
-    profile = ApplicantProfile.query.filter_by(user_id=app.user_id).first()
-    edus = Education.query.filter_by(application_id=app.id).all()
-    pay = Payment.query.filter_by(application_id=app.id).first()
-    buffer = BytesIO(); c = canvas.Canvas(buffer, pagesize=A4)
-    w,h = A4; y = h-50
-    c.setFont('Helvetica-Bold', 14); c.drawString(50,y, f"CSIR-SERC Scientist Application — {app.post_code}"); y-=30
-    # Photo on right
-    if profile and profile.photo_path and os.path.exists(profile.photo_path):
-        try:
-            img = ImageReader(profile.photo_path)
-            c.drawImage(img, w-150, h-150, width=96, height=96, preserveAspectRatio=True, mask='auto')
-        except Exception: pass
-    c.setFont('Helvetica', 10); c.drawString(50,y, f"Applicant: {profile.name if profile else ''} | Email: {app.user_id}"); y-=20
-    c.drawString(50,y, f"Status: {app.status} | Submitted: {app.submitted_at.strftime('%Y-%m-%d %H:%M')}"); y-=30
-    c.setFont('Helvetica-Bold', 12); c.drawString(50,y, 'Education:'); y-=20; c.setFont('Helvetica',10)
-    for e in edus:
-        c.drawString(50,y, f"{e.degree_level} — {e.discipline} — {e.institute} — {e.year} — {e.marks}"); y-=16
-        if y<100: c.showPage(); y=h-50; c.setFont('Helvetica',10)
-    y-=10; c.setFont('Helvetica-Bold',12); c.drawString(50,y,'Payment:'); y-=20; c.setFont('Helvetica',10)
-    if pay: c.drawString(50,y, f"Applicable: {pay.applicable} | UTR: {pay.utr} | Amount: {pay.amount} | Verified: {pay.verified}")
-    else: c.drawString(50,y, 'No payment record')
-    c.showPage(); c.save(); buffer.seek(0)
-    return send_file(buffer, mimetype='application/pdf', as_attachment=True, download_name=f'application_{app.id}.pdf')
+    if app.user_id != current_user.id and current_user.role not in ['admin','reviewer']:
+        flash('Unauthorized', 'danger'); return redirect(url_for('applicant.apply'))
+    pdf = open_cached(current_app.config['PDF_CACHE_FOLDER'], app)
+    return send_file(pdf, mimetype='application/pdf', as_attachment=True, download_name=f'application_{app.id}.pdf')
+
+@applicant_bp.route('/application/<int:app_id>/document/<int:doc_id>')
+@login_required
+def document(app_id, doc_id):
+    app = Application.query.get_or_404(app_id)
+    if app.user_id != current_user.id and current_user.role not in ['admin','reviewer']:
+        flash('Unauthorized', 'danger'); return redirect(url_for('applicant.apply'))
+    doc = Document.query.filter_by(id=doc_id, application_id=app.id).first_or_404()
+    return send_blob(doc.storage_path, f'{doc.doc_type}_{doc.id}.pdf', mimetype='application/pdf', etag=doc.sha256)
+
+@applicant_bp.route('/application/<int:app_id>/photo')
+@login_required
+def photo(app_id):
+    app = Application.query.get_or_404(app_id)
+    if app.user_id != current_user.id and current_user.role not in ['admin','reviewer']:
+        flash('Unauthorized', 'danger'); return redirect(url_for('applicant.apply'))
+    profile = ApplicantProfile.query.filter_by(user_id=app.user_id).first_or_404()
+    ref = profile.photo_print_path or profile.photo_path
+    if not ref: abort(404)
+    return send_blob(ref, f'photo_{app.id}.{ref.rsplit(".", 1)[-1]}')
@@ -0,0 +1,168 @@
+import string, time
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, update, func, literal, or_, and_
+from .extensions import db
+from .models import Application, ApplicantProfile, User, BulkEmailLog, BulkEmailRecipient
+from .mailer import MailerPool
+
+RECIPIENT_FIELDS = ('name', 'post_code', 'app_id')
+CAMPAIGN_FIELDS = ('interview_dt', 'venue')
+
+_fmt = string.Formatter()
+
+def compile_template(text, **campaign_values):
+    """Render the campaign-wide placeholders once and return fill(values) for the per-recipient ones.
+
+    Raises KeyError for placeholders that are neither recipient nor campaign fields.
+    """
+    parts = []
+    for literal_text, field, spec, conv in _fmt.parse(text):
+        if literal_text: parts.append(literal_text)
+        if field is None: continue
+        if field in CAMPAIGN_FIELDS:
+            parts.append(_fmt.format_field(_fmt.convert_field(campaign_values.get(field) or '', conv), spec))
+        elif field in RECIPIENT_FIELDS:
+            parts.append((field, spec, conv))
+        else:
+            raise KeyError(field)
+    merged = []
+    for p in parts:
+        if isinstance(p, str) and merged and isinstance(merged[-1], str): merged[-1] += p
+        else: merged.append(p)
+    def fill(values):
+        return ''.join(p if isinstance(p, str) else _fmt.format_field(_fmt.convert_field(values[p[0]], p[2]), p[1]) for p in merged)
+    return fill
+
+def recipients_select(filter_status=None, filter_post_code=None):
+    q = (select(Application.id, Application.post_code, User.email, func.coalesce(ApplicantProfile.name, ''))
+         .join(User, User.id == Application.user_id)
+         .outerjoin(ApplicantProfile, ApplicantProfile.user_id == Application.user_id)
+         .where(User.email.isnot(None), User.email != ''))
+    if filter_status: q = q.where(Application.status == filter_status)
+    if filter_post_code: q = q.where(Application.post_code == filter_post_code)
+    return q.order_by(Application.id)
+
+def iter_recipients(filter_status=None, filter_post_code=None, chunk=500):
+    q = recipients_select(filter_status, filter_post_code).execution_options(yield_per=chunk)
+    for app_id, post_code, email, name in db.session.execute(q):
+        yield {'app_id': app_id, 'post_code': post_code, 'to': email, 'name': name}
+
+def create_campaign(subject, body, filter_status=None, filter_post_code=None, interview_dt='', venue='', created_by=None):
+    compile_template(body, interview_dt=interview_dt, venue=venue)  # fail fast on unknown placeholders
+    log = BulkEmailLog(subject=subject, body=body, body_preview=(body[:500]+'...' if len(body)>500 else body),
+                       filter_status=filter_status, filter_post_code=filter_post_code, interview_dt=interview_dt,
+                       venue=venue, status='queued', count_sent=0, count_failed=0, created_by=created_by)
+    db.session.add(log); db.session.flush()
+    # Materialise the recipient list with one INSERT ... SELECT; nothing is pulled into Python
+    src = recipients_select(filter_status, filter_post_code).with_only_columns(
+        literal(log.id), Application.id, User.email, func.coalesce(ApplicantProfile.name, ''), Application.post_code, literal('pending'))
+    res = db.session.execute(insert(BulkEmailRecipient).from_select(
+        ['log_id', 'application_id', 'to_email', 'name', 'post_code', 'status'], src))
+    log.total = res.rowcount
+    db.session.commit()
+    return log
+
+def _claimable(lease_seconds):
+    # Queued, or running under a worker that stopped heartbeating (or a campaign from before heartbeats)
+    stale = datetime.utcnow() - timedelta(seconds=lease_seconds)
+    return or_(BulkEmailLog.status == 'queued',
+               and_(BulkEmailLog.status == 'running', or_(BulkEmailLog.heartbeat_at.is_(None), BulkEmailLog.heartbeat_at < stale)))
+
+def requeue(log, lease_seconds):
+    """Put an interrupted or partly failed campaign back in the queue; sent recipients are kept.
+
+    Returns False, changing nothing, while a worker still holds the campaign's lease.
+    """
+    R = BulkEmailRecipient
+    resumable = or_(BulkEmailLog.status == 'done', _claimable(lease_seconds))
+    n = (BulkEmailLog.query.filter(BulkEmailLog.id == log.id, resumable)
+         .update({'status': 'queued', 'count_failed': 0, 'finished_at': None, 'heartbeat_at': None}, synchronize_session=False))
+    if not n:
+        db.session.rollback(); return False
+    db.session.execute(update(R).where(R.log_id == log.id, R.status.in_(('failed', 'sending'))).values(status='pending', error=None))
+    db.session.commit()
+    return True
+
+class CampaignRunner:
+    """Sends queued campaigns, one at a time, over a MailerPool.
+
+    A campaign is held by a lease: heartbeat_at moves after every batch, and a running
+    campaign whose heartbeat is older than BULK_EMAIL_LEASE_SECONDS is claimed again.
+    Recipients are claimed pending -> sending with conditional UPDATEs, so two runners on
+    one campaign never send to the same recipient; counters move with SQL increments.
+    """
+    def __init__(self, app, sessions=None, rate=None, batch_size=None):
+        cfg = app.config
+        self.app = app
+        self.batch_size = batch_size or cfg['BULK_EMAIL_BATCH_SIZE']
+        self.lease = cfg['BULK_EMAIL_LEASE_SECONDS']
+        rate = cfg['BULK_EMAIL_RATE_PER_SEC'] if rate is None else rate
+        self.pool = MailerPool(cfg, sessions or cfg['BULK_EMAIL_SMTP_SESSIONS'], rate=rate or None, worker='campaign')
+
+    def claim(self):
+        claimable = _claimable(self.lease)
+        log_id = db.session.scalar(select(BulkEmailLog.id).where(claimable).order_by(BulkEmailLog.id).limit(1))
+        if log_id is None: return None
+        n = (BulkEmailLog.query.filter(BulkEmailLog.id == log_id, claimable)
+             .update({'status': 'running', 'heartbeat_at': datetime.utcnow()}, synchronize_session=False))
+        if n:
+            # Taken over from a dead worker: whatever it had in flight is sent again
+            R = BulkEmailRecipient
+            db.session.execute(update(R).where(R.log_id == log_id, R.status == 'sending').values(status='pending'))
+        db.session.commit()
+        return db.session.get(BulkEmailLog, log_id) if n else None
+
+    def claim_batch(self, log_id):
+        R = BulkEmailRecipient
+        candidates = db.session.scalars(select(R.id).where(R.log_id == log_id, R.status == 'pending').order_by(R.id).limit(self.batch_size)).all()
+        claimed = [i for i in candidates
+                   if db.session.execute(update(R).where(R.id == i, R.status == 'pending').values(status='sending')).rowcount]
+        db.session.commit()
+        if not claimed: return []
+        return db.session.execute(select(R.id, R.to_email, R.name, R.post_code, R.application_id)
+                                  .where(R.id.in_(claimed)).order_by(R.id)).all()
+
+    def run(self, log):
+        fill = compile_template(log.body or '', interview_dt=log.interview_dt, venue=log.venue)
+        R = BulkEmailRecipient; L = BulkEmailLog
+        log_id, subject = log.id, log.subject
+        while True:
+            batch = self.claim_batch(log_id)
+            if not batch:
+                # Nothing pending: done, unless a resume put the campaign back in the queue meanwhile
+                db.session.execute(update(L).where(L.id == log_id, L.status == 'running').values(status='done', finished_at=datetime.utcnow()))
+                db.session.commit()
+                break
+            results = self.pool.send_many([
+                (r.id, r.to_email, subject, fill({'name': r.name or '', 'post_code': r.post_code, 'app_id': r.application_id}))
+                for r in batch])
+            now = datetime.utcnow()
+            sent = [k for k, e in results if e is None]
+            if sent:
+                db.session.execute(update(R).where(R.id.in_(sent), R.status == 'sending').values(status='sent', sent_at=now, error=None))
+            for k, e in results:
+                if e is not None:
+                    db.session.execute(update(R).where(R.id == k, R.status == 'sending').values(status='failed', error=e[:1000]))
+            # Counters move in the same transaction as the recipient rows they summarise
+            db.session.execute(update(L).where(L.id == log_id).values(
+                count_sent=func.coalesce(L.count_sent, 0) + len(sent),
+                count_failed=func.coalesce(L.count_failed, 0) + len(results) - len(sent), heartbeat_at=now))
+            db.session.commit()
+        db.session.expire(log)
+        return log
+
+    def run_pending(self, once=False, poll_interval=None):
+        poll_interval = poll_interval or self.app.config['OUTBOX_POLL_INTERVAL']
+        done = 0
+        try:
+            while True:
+                log = self.claim()
+                if log is not None:
+                    self.run(log); done += 1
+                elif once:
+                    break
+                else:
+                    time.sleep(poll_interval)
+        finally:
+            self.pool.close()
+        return done
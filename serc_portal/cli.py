@@ -0,0 +1,201 @@
+import os
+import click
+
+def register_commands(app):
+    @app.cli.command('init-db')
+    def init_db():
+        """Create the schema on an empty database, mark it migrated to head and seed the admin."""
+        from sqlalchemy import inspect
+        from flask_migrate import stamp
+        from .extensions import db
+        from .models import seed_admin_if_needed
+        from .search import create_index
+        if inspect(db.engine).has_table('alembic_version'):
+            click.echo('The database is already under migration control; run `flask db upgrade` instead.')
+        else:
+            db.create_all(bind_key=None)  # the primary only; a replica gets the schema by replication
+            with db.engine.begin() as conn: create_index(conn)
+            stamp()
+            click.echo('Schema created and stamped at the latest migration.')
+        seed_admin_if_needed()
+        click.echo('Admin account ready.')
+
+    @app.cli.command('seed-admin')
+    def seed_admin():
+        """Create the ADMIN_EMAIL account if it does not exist yet."""
+        from .models import seed_admin_if_needed
+        seed_admin_if_needed()
+        click.echo('Admin account ready.')
+
+    @app.cli.command('outbox-worker')
+    @click.option('--workers', type=int, default=None, help='SMTP sessions to keep open (default OUTBOX_WORKERS).')
+    @click.option('--once', is_flag=True, help='Drain what is due now and exit (for cron).')
+    def outbox_worker(workers, once):
+        """Deliver queued transactional email."""
+        from .outbox import OutboxWorker
+        worker = OutboxWorker(app, workers=workers)
+        if once:
+            total = 0
+            try:
+                while True:
+                    n = worker.run_once()
+                    if not n: break
+                    total += n
+            finally:
+                worker.shutdown()
+            click.echo(f'Processed {total} message(s).')
+        else:
+            worker.run_forever()
+
+    @app.cli.command('campaign-worker')
+    @click.option('--sessions', type=int, default=None, help='SMTP sessions to keep open (default BULK_EMAIL_SMTP_SESSIONS).')
+    @click.option('--rate', type=float, default=None, help='Messages per second across all sessions; 0 disables the cap.')
+    @click.option('--once', is_flag=True, help='Run queued campaigns and exit.')
+    def campaign_worker(sessions, rate, once):
+        """Send queued bulk email campaigns."""
+        from .campaigns import CampaignRunner
+        n = CampaignRunner(app, sessions=sessions, rate=rate).run_pending(once=once)
+        click.echo(f'Completed {n} campaign(s).')
+
+    @app.cli.command('report-worker')
+    @click.option('--workers', type=int, default=None, help='Jobs to run at once (default REPORT_JOB_WORKERS).')
+    @click.option('--once', is_flag=True, help='Run queued jobs and exit (for cron).')
+    def report_worker(workers, once):
+        """Build queued exports and PDF bundles in a local process pool."""
+        from .jobs import ReportWorker
+        n = ReportWorker(app, workers=workers).run_pending(once=once)
+        click.echo(f'Finished {n} report job(s).')
+
+    @app.cli.command('backfill-images')
+    @click.option('--force', is_flag=True, help='Regenerate variants that already exist.')
+    @click.option('--workers', type=int, default=None, help='Processes (default EXPORT_THUMBNAIL_WORKERS).')
+    @click.option('--batch', type=int, default=500)
+    def backfill_images(force, workers, batch):
+        """Generate thumbnails and print-size JPEGs for existing uploads."""
+        import shutil, tempfile
+        from concurrent.futures import ProcessPoolExecutor
+        from .extensions import db
+        from .models import ApplicantProfile
+        from .imaging import derive_profile_images
+        from .storage import blob_key, file_sha256, get_storage, local_path
+        P = ApplicantProfile; storage = get_storage()
+        variant_cols = ('photo_thumb_path', 'photo_print_path', 'sign_print_path')
+        q = P.query.filter(P.photo_path.isnot(None))
+        if not force:
+            q = q.filter((P.photo_thumb_path.is_(None)) | (P.photo_print_path.is_(None)) | (P.sign_print_path.is_(None)))
+        last_id = 0; done = 0
+        tmpdir = tempfile.mkdtemp(prefix='serc-derive-')
+        sizes = (app.config['IMAGE_PRINT_MAX'], app.config['IMAGE_THUMB_SIZE'])
+        try:
+            with ProcessPoolExecutor(max_workers=workers or app.config['EXPORT_THUMBNAIL_WORKERS']) as pool:
+                while True:
+                    profiles = q.filter(P.id > last_id).order_by(P.id).limit(batch).all()
+                    if not profiles: break
+                    last_id = profiles[-1].id
+                    futures = []
+                    for p in profiles:
+                        out_dir = os.path.join(tmpdir, str(p.id)); os.makedirs(out_dir)  # profiles may share a photo blob
+                        futures.append(pool.submit(derive_profile_images, local_path(p.photo_path), local_path(p.sign_path), *sizes, out_dir))
+                    for p, fut in zip(profiles, futures):
+                        variants = fut.result(); keys = []
+                        for v in variants:
+                            if v: key = blob_key(file_sha256(v), 'jpg'); storage.put(key, v, move=True); v = key
+                            keys.append(v)
+                        for col, key in zip(variant_cols, keys): setattr(p, col, key)  # flushed through count_blob_refs
+                    db.session.commit(); done += len(profiles)
+                    click.echo(f'{done} profile(s) processed')
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    @app.cli.command('import-uploads')
+    @click.option('--batch', type=int, default=500)
+    def import_uploads(batch):
+        """Copy files referenced by plain filesystem paths into content-addressed storage and re-point the rows."""
+        from .extensions import db
+        from .models import BLOB_COLUMNS, is_blob_key
+        from .storage import blob_key, file_sha256, get_storage
+        storage = get_storage(); moved = 0
+        for model, cols in BLOB_COLUMNS.items():
+            last_id = 0
+            while True:
+                rows = model.query.filter(model.id > last_id).order_by(model.id).limit(batch).all()
+                if not rows: break
+                last_id = rows[-1].id
+                for row in rows:
+                    for col in cols:
+                        ref = getattr(row, col)
+                        if not ref or is_blob_key(ref) or not os.path.exists(ref): continue
+                        key = blob_key(file_sha256(ref), os.path.splitext(ref)[1].lstrip('.') or 'bin')
+                        storage.put(key, ref); setattr(row, col, key); moved += 1
+                db.session.commit()
+        click.echo(f'Imported {moved} file(s); the originals are left in place.')
+
+    @app.cli.command('storage-gc')
+    def storage_gc():
+        """Delete stored uploads that no row references any more."""
+        from .storage import collect_garbage
+        click.echo(f'Removed {collect_garbage()} unreferenced blob(s).')
+
+    @app.cli.command('rebuild-status-counts')
+    def rebuild_status_counts_cmd():
+        """Recompute the per-(post_code, status) dashboard counters from the applications table."""
+        from .models import rebuild_status_counts, status_totals
+        rebuild_status_counts()
+        click.echo(', '.join(f'{k}: {v}' for k, v in sorted(status_totals().items())) or 'No applications.')
+
+    @app.cli.command('rebuild-analytics')
+    def rebuild_analytics():
+        """Recompute the submission rollups behind /admin/analytics/data from scratch."""
+        from .analytics.rollups import rebuild
+        click.echo(f'Rolled up {rebuild()} application(s).')
+
+    @app.cli.command('search-reindex')
+    def search_reindex():
+        """Rebuild the full-text applicant search index from the application tables."""
+        from .extensions import db
+        from .search import create_index, reindex
+        conn = db.session.connection()
+        create_index(conn); n = reindex(conn); db.session.commit()
+        click.echo(f'Indexed {n} application(s).')
+
+    @app.cli.command('rescreen')
+    @click.option('--rules', 'rules_path', default=None, help='Rules file to screen against (default: the configured rules).')
+    @click.option('--closing-date', default=None, help='YYYY-MM-DD (default CLOSING_DATE).')
+    @click.option('--out', type=click.Path(dir_okay=False), default=None, help='Write application_id, post_code, eligible, reasons as CSV.')
+    def rescreen(rules_path, closing_date, out):
+        """Re-check every application against the eligibility rules in one vectorized pass."""
+        import time
+        from .extensions import db
+        from .rules import RuleBook, get_rules, load_frames, screen
+        t0 = time.perf_counter()
+        book = RuleBook.load(rules_path) if rules_path else get_rules()
+        apps, edus = load_frames(db.session.connection())
+        result = screen(book, apps, edus, closing_date or app.config['CLOSING_DATE'])
+        if out: result.to_csv(out, index=False)
+        failed = result[~result.eligible]
+        click.echo(f'{len(result)} application(s) screened in {time.perf_counter() - t0:.1f}s: '
+                   f'{len(result) - len(failed)} eligible, {len(failed)} not.')
+        for post_code, n in failed.groupby('post_code').size().items():
+            click.echo(f'  {post_code}: {n} ineligible')
+        for reason, n in failed.reasons.str.split('; ').explode().value_counts().head(10).items():
+            click.echo(f'  {n:>8}  {reason}')
+
+    @app.cli.command('find-duplicates')
+    @click.option('--max-block', type=int, default=None, help='Skip blocking values shared by more applications (default DEDUPE_MAX_BLOCK).')
+    @click.option('--out', type=click.Path(dir_okay=False), default=None, help='Write the clusters as CSV.')
+    def find_duplicates(max_block, out):
+        """Cluster applications that share a name and DOB, mobile, photo, UTR or account and post code.
+
+        The result replaces the stored scan that the admin Duplicates page shows.
+        """
+        import time
+        from .extensions import db
+        from .dedupe import detect, store
+        t0 = time.perf_counter()
+        clusters, skipped = detect(db.session.connection(), max_block or app.config['DEDUPE_MAX_BLOCK'])
+        store(clusters, skipped, max_block or app.config['DEDUPE_MAX_BLOCK'])
+        if out: clusters.to_csv(out, index=False)
+        n = int(clusters.cluster.max()) if len(clusters) else 0
+        click.echo(f'{n} cluster(s) covering {len(clusters)} application(s) in {time.perf_counter() - t0:.1f}s.')
+        for key, blocks in skipped.items():
+            if blocks: click.echo(f'  skipped {blocks} {key} value(s) shared by more than {max_block or app.config["DEDUPE_MAX_BLOCK"]} applications')
@@ -1,10 +1,23 @@
 import os
 from dotenv import load_dotenv
 load_dotenv()
+
+def engine_options():
+    # Pool sizing only applies to QueuePool engines (PostgreSQL, file SQLite); unset values keep SQLAlchemy's defaults
+    opts = {'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', '1').lower() in ('1', 'true', 'yes'),
+            'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800'))}
+    for key, cast in (('pool_size', int), ('max_overflow', int), ('pool_timeout', float)):
+        value = os.getenv('DB_' + key.upper())
+        if value: opts[key] = cast(value)
+    return opts
+
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret')
     SQLALCHEMY_DATABASE_URI = os.getenv('SQLALCHEMY_DATABASE_URI', 'sqlite:///serc_portal.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options()
+    REPLICA_DATABASE_URI = os.getenv('REPLICA_DATABASE_URI', '')  # read-only copy for reporting; empty reads the primary
+    SQLALCHEMY_BINDS = {'replica': {'url': REPLICA_DATABASE_URI, **SQLALCHEMY_ENGINE_OPTIONS}} if REPLICA_DATABASE_URI else {}
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads')
     MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', '20971520'))
     MAX_PHOTO_SIZE = int(os.getenv('MAX_PHOTO_SIZE', '102400'))
@@ -19,3 +32,49 @@ class Config:
     SMTP_USER = os.getenv('SMTP_USER')
     SMTP_PASS = os.getenv('SMTP_PASS')
     FROM_EMAIL = os.getenv('FROM_EMAIL', 'no-reply@serc.res.in')
+    OUTBOX_WORKERS = int(os.getenv('OUTBOX_WORKERS', '2'))
+    OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '50'))
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '6'))
+    OUTBOX_BACKOFF_SECONDS = int(os.getenv('OUTBOX_BACKOFF_SECONDS', '30'))
+    OUTBOX_LEASE_SECONDS = int(os.getenv('OUTBOX_LEASE_SECONDS', '300'))
+    OUTBOX_POLL_INTERVAL = float(os.getenv('OUTBOX_POLL_INTERVAL', '5'))
+    BULK_EMAIL_SMTP_SESSIONS = int(os.getenv('BULK_EMAIL_SMTP_SESSIONS', '3'))
+    BULK_EMAIL_RATE_PER_SEC = float(os.getenv('BULK_EMAIL_RATE_PER_SEC', '10'))
+    BULK_EMAIL_BATCH_SIZE = int(os.getenv('BULK_EMAIL_BATCH_SIZE', '200'))
+    BULK_EMAIL_PREVIEW_LIMIT = int(os.getenv('BULK_EMAIL_PREVIEW_LIMIT', '50'))
+    BULK_EMAIL_LEASE_SECONDS = int(os.getenv('BULK_EMAIL_LEASE_SECONDS', '300'))  # a running campaign silent this long is re-claimed
+    EXPORT_THUMBNAIL_WORKERS = int(os.getenv('EXPORT_THUMBNAIL_WORKERS', str(os.cpu_count() or 1)))
+    IMAGE_THUMB_SIZE = int(os.getenv('IMAGE_THUMB_SIZE', '96'))
+    IMAGE_PRINT_MAX = int(os.getenv('IMAGE_PRINT_MAX', '600'))
+    PDF_CACHE_FOLDER = os.getenv('PDF_CACHE_FOLDER', 'pdf_cache')
+    PDF_WORKERS = int(os.getenv('PDF_WORKERS', str(os.cpu_count() or 1)))
+    LANGUAGES = [l.strip() for l in os.getenv('LANGUAGES', 'en,hi').split(',') if l.strip()]
+    LOCALE_AUTO_RELOAD = os.getenv('LOCALE_AUTO_RELOAD', '0').lower() in ('1', 'true', 'yes')
+    DASHBOARD_PAGE_SIZE = int(os.getenv('DASHBOARD_PAGE_SIZE', '50'))
+    ANALYTICS_CACHE_TTL = float(os.getenv('ANALYTICS_CACHE_TTL', '15'))
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'local')  # local / s3
+    STORAGE_ROOT = os.getenv('STORAGE_ROOT', '')  # local blobs; default <UPLOAD_FOLDER>/blobs
+    STORAGE_CACHE_FOLDER = os.getenv('STORAGE_CACHE_FOLDER', '')
+    S3_BUCKET = os.getenv('S3_BUCKET', '')
+    S3_PREFIX = os.getenv('S3_PREFIX', 'uploads/')
+    S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL', '')
+    USE_X_SENDFILE = os.getenv('USE_X_SENDFILE', '0').lower() in ('1', 'true', 'yes')
+    X_ACCEL_REDIRECT_PREFIX = os.getenv('X_ACCEL_REDIRECT_PREFIX', '')  # nginx internal location aliased to the blob root
+    USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', '30'))
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '10000'))
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1').lower() in ('1', 'true', 'yes')
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')  # lets a Prometheus scraper read /metrics without a session
+    METRICS_TEXTFILE_DIR = os.getenv('METRICS_TEXTFILE_DIR', '')  # node_exporter textfile directory for the mail workers' metrics
+    SERVER_TIMING = os.getenv('SERVER_TIMING', '0').lower() in ('1', 'true', 'yes')  # Server-Timing header, admins only
+    SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', '1000'))
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '200'))
+    SEARCH_RANK_WINDOW = int(os.getenv('SEARCH_RANK_WINDOW', '2000'))  # newest matches ranked by relevance; older ones follow newest first
+    ELIGIBILITY_RULES = os.getenv('ELIGIBILITY_RULES', '')  # JSON rules file; empty uses serc_portal/eligibility.json
+    PAYMENT_DATE_TOLERANCE_DAYS = int(os.getenv('PAYMENT_DATE_TOLERANCE_DAYS', '3'))
+    PAYMENT_RECON_PREVIEW = int(os.getenv('PAYMENT_RECON_PREVIEW', '200'))
+    DEDUPE_MAX_BLOCK = int(os.getenv('DEDUPE_MAX_BLOCK', '50'))  # larger blocks are placeholder values, not people
+    REPORT_JOB_FOLDER = os.getenv('REPORT_JOB_FOLDER', 'report_jobs')
+    REPORT_JOB_WORKERS = int(os.getenv('REPORT_JOB_WORKERS', '2'))
+    REPORT_JOB_LEASE_SECONDS = int(os.getenv('REPORT_JOB_LEASE_SECONDS', '300'))  # a running job silent this long is re-claimed
+    REPORT_JOB_MAX_ATTEMPTS = int(os.getenv('REPORT_JOB_MAX_ATTEMPTS', '3'))  # claims before a job that keeps killing its worker is failed
+    REPORT_JOB_RETENTION_HOURS = float(os.getenv('REPORT_JOB_RETENTION_HOURS', '24'))
@@ -0,0 +1,188 @@
+"""Duplicate detection: clusters of applications that look like the same person or the same submission.
+
+Applications are never compared pairwise. Each one gets a value per blocking key, and a
+key links the applications that share a value:
+
+    submission  the same account applied twice for one post code
+    name_dob    token-sorted normalized name + date of birth, across accounts
+    mobile      the last 10 digits of the account's mobile number, across accounts
+    photo       the photo's content hash (its blob key), across accounts
+    utr         the same normalized UTR on several payments
+
+Blocks are found with one hash groupby per key and merged into clusters by connected
+components over star edges, so a whole cycle costs O(n) per key. A block larger than
+DEDUPE_MAX_BLOCK is a placeholder value ("0000000000", a stock photo), not a person, and
+is skipped and reported instead of chaining thousands of applications together.
+
+A scan takes seconds on a full cycle, so it runs in `flask find-duplicates` or as a
+'duplicates' report job and store() keeps its clusters; the admin pages page through the
+stored result with the applicants' current details.
+"""
+import json, re
+from .models import is_blob_key
+
+KEYS = ('submission', 'name_dob', 'mobile', 'photo', 'utr')
+ACROSS_ACCOUNTS = ('name_dob', 'mobile', 'photo')  # one account applying for several posts is not a duplicate
+HONORIFICS = {'dr', 'mr', 'mrs', 'ms', 'miss', 'shri', 'sri', 'smt', 'kum', 'km', 'prof'}
+NOT_LETTER, NOT_DIGIT, NOT_ALNUM = re.compile(r'[^a-z ]'), re.compile(r'\D'), re.compile(r'[^0-9A-Z]')
+CLUSTER_COLUMNS = ['cluster', 'application_id', 'user_id', 'email', 'name', 'dob', 'post_code', 'status', 'mobile', 'utr', 'matched_on']
+
+def normalize_name(name):
+    """'Dr. Kumar,  RAVI' and 'ravi kumar' both become 'kumar ravi'."""
+    tokens = NOT_LETTER.sub(' ', (name or '').lower()).split()
+    return ' '.join(sorted(t for t in tokens if t not in HONORIFICS))
+
+def normalize_mobile(mobile):
+    digits = NOT_DIGIT.sub('', mobile or '')
+    return digits[-10:] if len(digits) >= 10 else ''
+
+def normalize_utr(utr):
+    return NOT_ALNUM.sub('', (utr or '').upper())
+
+def load_frames(conn):
+    """(applications, payments) DataFrames with the columns the blocking keys are built from."""
+    import pandas as pd
+    apps = pd.read_sql_query(
+        'SELECT a.id AS application_id, a.user_id, a.post_code, a.status, u.email, u.mobile, p.name, p.dob, p.photo_path '
+        'FROM application a JOIN "user" u ON u.id = a.user_id LEFT JOIN applicant_profile p ON p.user_id = a.user_id', conn)
+    pays = pd.read_sql_query("SELECT application_id, utr FROM payment WHERE utr IS NOT NULL AND utr <> ''", conn)
+    return apps, pays
+
+def _per_value(series, fn):
+    # The normalizers run once per distinct raw value, not once per row
+    import numpy as np, pandas as pd
+    codes, uniques = pd.factorize(series.astype(object).where(series.notna(), None), use_na_sentinel=True)
+    table = np.asarray([fn(v) for v in uniques] + [''], dtype=object)
+    return pd.Series(table[codes], index=series.index, dtype=object)
+
+def block_values(apps, pays):
+    """Long frame of (application_id, user_id, key, value) for every non-empty blocking value."""
+    import pandas as pd
+    dob = _per_value(apps.dob, lambda v: str(v)[:10])
+    name = _per_value(apps.name, normalize_name)
+    values = {
+        'submission': apps.user_id.astype(str) + '/' + apps.post_code.fillna(''),
+        'name_dob': (name + '/' + dob).where((name != '') & (dob != ''), ''),
+        'mobile': _per_value(apps.mobile, normalize_mobile),
+        'photo': _per_value(apps.photo_path, lambda v: v[:64] if is_blob_key(v) else ''),
+    }
+    frames = [pd.DataFrame({'application_id': apps.application_id, 'user_id': apps.user_id, 'key': key, 'value': v})
+              for key, v in values.items()]
+    utr = pays.assign(value=_per_value(pays.utr, normalize_utr), key='utr').merge(apps[['application_id', 'user_id']], on='application_id')
+    frames.append(utr[['application_id', 'user_id', 'key', 'value']])
+    out = pd.concat(frames, ignore_index=True)
+    return out[out.value != '']
+
+def _components(n, a, b):
+    """Connected-component label (the smallest member index) for n nodes joined by edges a[i]-b[i]."""
+    import numpy as np
+    labels = np.arange(n)
+    while True:
+        low = np.minimum(labels[a], labels[b])
+        before = labels.copy()
+        np.minimum.at(labels, a, low); np.minimum.at(labels, b, low)
+        labels = labels[labels]  # pointer jumping: hop straight to the label's own label
+        if np.array_equal(labels, before): return labels
+
+def find_clusters(apps, pays, max_block=50):
+    """(clusters DataFrame in CLUSTER_COLUMNS, {key: blocks skipped as too common}).
+
+    Clusters are numbered from 1, largest first; matched_on lists the keys that put each
+    application in its cluster.
+    """
+    import numpy as np, pandas as pd
+    apps = apps.reset_index(drop=True)
+    vals = block_values(apps, pays)
+    grouped = vals.groupby(['key', 'value'], sort=False)
+    size = grouped.application_id.transform('size'); accounts = grouped.user_id.transform('nunique')
+    linking = (size > 1) & (~vals.key.isin(ACROSS_ACCOUNTS) | (accounts > 1))
+    too_big = linking & (size > max_block)
+    skipped = {k: 0 for k in KEYS}
+    skipped.update(vals[too_big].drop_duplicates(['key', 'value']).key.value_counts().to_dict())
+    links = vals[linking & ~too_big].copy()
+    node = pd.Index(apps.application_id)
+    links['node'] = node.get_indexer(links.application_id)
+    first = links.groupby(['key', 'value'], sort=False).node.transform('first')
+    labels = _components(len(apps), first.to_numpy(), links.node.to_numpy())
+    linked = np.zeros(len(apps), dtype=bool); linked[links.node.to_numpy()] = True
+    out = apps[linked].copy()
+    if out.empty: return pd.DataFrame(columns=CLUSTER_COLUMNS), skipped
+    out['root'] = labels[linked]
+    # matched_on: one bit per key, OR-ed per application, spelled out once per distinct mask
+    bits = links.drop_duplicates(['application_id', 'key']).assign(bit=lambda d: d.key.map({k: 1 << i for i, k in enumerate(KEYS)}))
+    mask = out.application_id.map(bits.groupby('application_id').bit.sum())
+    out['matched_on'] = mask.map({m: ', '.join(k for i, k in enumerate(KEYS) if m >> i & 1) for m in mask.unique()})
+    out['utr'] = out.application_id.map(pays.drop_duplicates('application_id').set_index('application_id').utr)
+    sizes = out.groupby('root').application_id.transform('size')
+    out = out.assign(_size=-sizes).sort_values(['_size', 'root', 'application_id'])
+    out['cluster'] = pd.factorize(out.root)[0] + 1
+    return out[CLUSTER_COLUMNS].reset_index(drop=True), skipped
+
+def detect(conn, max_block=50):
+    apps, pays = load_frames(conn)
+    return find_clusters(apps, pays, max_block)
+
+def store(clusters, skipped, max_block):
+    """Replace the stored scan with these clusters in one transaction; returns the DuplicateRun."""
+    from sqlalchemy import insert
+    from .extensions import db
+    from .models import DuplicateRun, DuplicateMember
+    by_key = {k: int(clusters.matched_on.str.contains(k, regex=False).sum()) if len(clusters) else 0 for k in KEYS}
+    DuplicateMember.query.delete(); DuplicateRun.query.delete()
+    run = DuplicateRun(clusters=int(clusters.cluster.max()) if len(clusters) else 0, applications=len(clusters), max_block=max_block,
+                       summary=json.dumps({'by_key': by_key, 'skipped': {k: int(v) for k, v in skipped.items()}}))
+    db.session.add(run); db.session.flush()
+    rows = [{'run_id': run.id, 'cluster': int(c), 'application_id': int(a), 'matched_on': m}
+            for c, a, m in zip(clusters.cluster, clusters.application_id, clusters.matched_on)]
+    if rows: db.session.execute(insert(DuplicateMember), rows)
+    db.session.commit()
+    return run
+
+def latest_run():
+    from .models import DuplicateRun
+    return DuplicateRun.query.order_by(DuplicateRun.id.desc()).first()
+
+def stored_clusters(run_id, first=None, last=None):
+    """Rows in CLUSTER_COLUMNS order for the stored clusters first..last, with each applicant's current details."""
+    from sqlalchemy import func, select
+    from .extensions import db
+    from .models import Application, ApplicantProfile, User, Payment, DuplicateMember as M
+    utr = select(func.min(Payment.utr)).where(Payment.application_id == Application.id).scalar_subquery()
+    q = (db.session.query(M.cluster, M.application_id, Application.user_id, User.email, ApplicantProfile.name, ApplicantProfile.dob,
+                          Application.post_code, Application.status, User.mobile, utr.label('utr'), M.matched_on)
+         .join(Application, Application.id == M.application_id).join(User, User.id == Application.user_id)
+         .outerjoin(ApplicantProfile, ApplicantProfile.user_id == Application.user_id)
+         .filter(M.run_id == run_id))
+    if first is not None: q = q.filter(M.cluster >= first)
+    if last is not None: q = q.filter(M.cluster <= last)
+    return q.order_by(M.cluster, M.application_id)
+
+def prior_submission(user_id, post_code, utr):
+    """(field, application_id) of an earlier application this submission would duplicate, or None.
+
+    Two index lookups (ix_application_user_id_post_code, ix_payment_utr) on the submit path;
+    spellings of a UTR that differ only in case or separators are left to the detect() job.
+    """
+    from .extensions import db
+    from .models import Application, Payment
+    prior = db.session.query(Application.id).filter_by(user_id=user_id, post_code=post_code).first()
+    if prior: return 'post_code', prior[0]
+    if utr:
+        prior = db.session.query(Payment.application_id).filter(Payment.utr == utr).first()
+        if prior: return 'utr', prior[0]
+    return None
+
+def submission_keys(user_id, post_code, utr):
+    keys = [f'post:{user_id}:{post_code}']
+    if utr: keys.append(f'utr:{utr}')
+    return keys
+
+def claim_submission(application_id, user_id, post_code, utr):
+    """Stage the SubmissionKey rows of a new application in the caller's transaction.
+
+    prior_submission() catches the ordinary repeat with a friendly message; these rows catch
+    the concurrent one, whose commit fails with an IntegrityError on submission_key.
+    """
+    from .extensions import db
+    from .models import SubmissionKey
+    db.session.add_all(SubmissionKey(key=k, application_id=application_id) for k in submission_keys(user_id, post_code, utr))
@@ -0,0 +1,66 @@
+import os
+
+THUMB_SIZE = 96
+PRINT_MAX = 600
+
+def _save_jpeg(src, dest, size, quality):
+    from PIL import Image as PILImage, ImageOps
+    try:
+        with PILImage.open(src) as img:
+            img.draft('RGB', (size, size))  # JPEG: decode at reduced scale, much cheaper than a full decode
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((size, size))
+            if img.mode in ('RGBA', 'LA', 'P'):
+                img = img.convert('RGBA'); bg = PILImage.new('RGB', img.size, 'white')
+                bg.paste(img, mask=img.getchannel('A')); img = bg
+            elif img.mode != 'RGB':
+                img = img.convert('RGB')
+            img.save(dest, format='JPEG', quality=quality, optimize=True)
+        return dest
+    except (OSError, ValueError):
+        return None
+
+def thumbnail(src, dest, size=THUMB_SIZE):
+    """Write a size x size-bounded JPEG thumbnail of src to dest; returns dest, or None if src is unreadable.
+
+    Kept at module level (no app state) so it can run in a ProcessPoolExecutor.
+    """
+    return _save_jpeg(src, dest, size, 85)
+
+def derived_paths(src, out_dir=None):
+    base = os.path.splitext(src)[0]
+    if out_dir: base = os.path.join(out_dir, os.path.basename(base))
+    return base + '.thumb.jpg', base + '.print.jpg'
+
+def derive(src, thumb=True, print_max=PRINT_MAX, thumb_size=THUMB_SIZE, out_dir=None):
+    """Produce the normalised variants of an upload, next to it or in out_dir: (thumb_path, print_path), None where it failed."""
+    if not src or not os.path.exists(src): return None, None
+    thumb_path, print_path = derived_paths(src, out_dir)
+    return (thumbnail(src, thumb_path, thumb_size) if thumb else None,
+            _save_jpeg(src, print_path, print_max, 90))
+
+def derive_profile_images(photo_path, sign_path, print_max=PRINT_MAX, thumb_size=THUMB_SIZE, out_dir=None):
+    """(photo_thumb, photo_print, sign_print) for one profile; picklable for the backfill pool.
+
+    With out_dir each field derives into its own subdirectory: photo and signature may be the
+    same blob, and the caller moves each variant into storage separately.
+    """
+    photo_dir = sign_dir = None
+    if out_dir:
+        photo_dir, sign_dir = os.path.join(out_dir, 'photo'), os.path.join(out_dir, 'sign')
+        os.makedirs(photo_dir, exist_ok=True); os.makedirs(sign_dir, exist_ok=True)
+    photo_thumb, photo_print = derive(photo_path, True, print_max, thumb_size, photo_dir)
+    _, sign_print = derive(sign_path, False, print_max, thumb_size, sign_dir)
+    return photo_thumb, photo_print, sign_print
+
+def apply_derived_images(profile, cfg, batch=None):
+    # With an UploadBatch the originals are still staged: derive there, one scratch directory per field
+    # (photo and signature may be the same blob), and let the batch promote the results
+    if batch:
+        print_max, thumb_size = cfg['IMAGE_PRINT_MAX'], cfg['IMAGE_THUMB_SIZE']
+        photo_thumb, photo_print = derive(batch.staged_path(profile.photo_path), True, print_max, thumb_size, batch.scratch_dir('photo'))
+        _, sign_print = derive(batch.staged_path(profile.sign_path), False, print_max, thumb_size, batch.scratch_dir('sign'))
+        derived = [batch.adopt(p) for p in (photo_thumb, photo_print, sign_print)]
+    else:
+        derived = derive_profile_images(profile.photo_path, profile.sign_path, cfg['IMAGE_PRINT_MAX'], cfg['IMAGE_THUMB_SIZE'])
+    profile.photo_thumb_path, profile.photo_print_path, profile.sign_print_path = derived
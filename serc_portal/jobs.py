@@ -0,0 +1,269 @@
+"""Background report jobs: exports, PDF bundles and duplicate scans built outside the HTTP request.
+
+A ReportJob row is the queue; there is no broker. submit() inserts it, `flask report-worker`
+claims it with a conditional UPDATE and runs it in a local process pool, writing the
+artifact under REPORT_JOB_FOLDER for the reports pages to serve. Identical requests (same
+kind and normalized filters) share one in-flight job: the partial unique index on
+dedupe_key makes the second INSERT fail and submit() hands back the job already queued.
+
+Workers update progress and heartbeat_at as they go; a running job whose heartbeat is
+older than REPORT_JOB_LEASE_SECONDS belonged to a worker that died and is claimed again,
+up to REPORT_JOB_MAX_ATTEMPTS claims in all, after which it is marked failed.
+"""
+import csv, hashlib, json, logging, os, time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import update, or_, and_
+from sqlalchemy.exc import IntegrityError, OperationalError
+from .extensions import db
+from .models import ReportJob, Application
+from .replica import use_replica
+
+log = logging.getLogger(__name__)
+
+IN_FLIGHT = ('queued', 'running')
+EXPORT_FORMATS = ('csv', 'xlsx')
+MIMETYPES = {'csv': 'text/csv', 'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'zip': 'application/zip'}
+PROGRESS_INTERVAL = 1.0  # seconds between progress writes
+
+class JobError(ValueError):
+    pass
+
+def normalize_params(kind, params):
+    """The filters that define a job, in canonical form; raises JobError for unknown kinds or formats."""
+    status = params.get('status') or None; post_code = params.get('post_code') or None
+    if kind == 'export':
+        fmt = params.get('format') or 'csv'
+        if fmt not in EXPORT_FORMATS: raise JobError(f'Unsupported format: {fmt}')
+        return {'format': fmt, 'status': status, 'post_code': post_code,
+                'include_photo': fmt == 'xlsx' and params.get('include_photo') in (True, '1', 'on')}
+    if kind == 'pdf_zip':
+        return {'status': status, 'post_code': post_code}
+    if kind == 'duplicates':
+        return {}  # always the whole table
+    raise JobError(f'Unknown job kind: {kind}')
+
+def dedupe_key(kind, params):
+    return hashlib.sha256(json.dumps([kind, params], sort_keys=True).encode()).hexdigest()
+
+def extension(job):
+    return {'export': json.loads(job.params).get('format'), 'duplicates': 'csv'}.get(job.kind, 'zip')
+
+def download_name(job):
+    p = json.loads(job.params)
+    names = {'export': 'applications', 'pdf_zip': 'applications_pdf', 'duplicates': 'duplicates'}
+    parts = [names[job.kind]] + [v.replace(' ', '_') for v in (p.get('status'), p.get('post_code')) if v]
+    return '_'.join(parts) + '.' + extension(job)
+
+def submit(kind, params, requested_by=None):
+    """(job, created): a new queued job, or the identical one already queued or running."""
+    params = normalize_params(kind, params); key = dedupe_key(kind, params)
+    existing = ReportJob.query.filter(ReportJob.dedupe_key == key, ReportJob.status.in_(IN_FLIGHT)).first()
+    if existing: return existing, False
+    job = ReportJob(kind=kind, params=json.dumps(params, sort_keys=True), dedupe_key=key, status='queued', progress=0,
+                    requested_by=requested_by)
+    db.session.add(job)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Lost the race to an identical request submitted in between
+        db.session.rollback()
+        existing = ReportJob.query.filter(ReportJob.dedupe_key == key, ReportJob.status.in_(IN_FLIGHT)).first()
+        if existing: return existing, False
+        raise
+    return job, True
+
+def recent_jobs(limit=20):
+    return ReportJob.query.order_by(ReportJob.id.desc()).limit(limit).all()
+
+def claim(lease_seconds, max_attempts=3):
+    """Claim the oldest queued job, or a running one whose worker stopped heartbeating; None if idle.
+
+    A stale job already claimed max_attempts times keeps killing its worker and is failed instead.
+    """
+    now = datetime.utcnow(); stale = now - timedelta(seconds=lease_seconds)
+    abandoned = and_(ReportJob.status == 'running', ReportJob.heartbeat_at < stale)
+    (ReportJob.query.filter(abandoned, ReportJob.attempts >= max_attempts)
+     .update({'status': 'failed', 'finished_at': now, 'error': f'Worker stopped without finishing {max_attempts} times'},
+             synchronize_session=False))
+    claimable = or_(ReportJob.status == 'queued', abandoned)
+    job_id = db.session.query(ReportJob.id).filter(claimable).order_by(ReportJob.id).limit(1).scalar()
+    if job_id is None: db.session.commit(); return None
+    n = (ReportJob.query.filter(ReportJob.id == job_id, claimable)
+         .update({'status': 'running', 'started_at': now, 'heartbeat_at': now, 'progress': 0, 'error': None,
+                  'attempts': ReportJob.attempts + 1}, synchronize_session=False))
+    db.session.commit()
+    return job_id if n else None
+
+def fail(job_id, error):
+    """Record a job as failed, unless it already finished."""
+    (ReportJob.query.filter(ReportJob.id == job_id, ReportJob.status.in_(IN_FLIGHT))
+     .update({'status': 'failed', 'error': error[:1000], 'finished_at': datetime.utcnow()}, synchronize_session=False))
+    db.session.commit()
+
+class Progress:
+    """Callable that records rows done on the job at most every PROGRESS_INTERVAL seconds.
+
+    Written on its own connection, because the export's streamed query holds the session's.
+    A write that cannot get the database (SQLite busy) is skipped; the next one catches up.
+    """
+    def __init__(self, job_id):
+        self.job_id = job_id; self.done = 0; self.last = 0.0
+
+    def __call__(self, n=1, force=False):
+        self.done += n
+        now = time.monotonic()
+        if not force and now - self.last < PROGRESS_INTERVAL: return
+        self.last = now
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(update(ReportJob).where(ReportJob.id == self.job_id)
+                             .values(progress=self.done, heartbeat_at=datetime.utcnow()))
+        except OperationalError as e:
+            log.debug('report job %s: progress not recorded: %s', self.job_id, e)
+
+def _counted(rows, progress):
+    for row in rows:
+        yield row; progress()
+
+def _filtered(params):
+    q = Application.query
+    if params.get('status'): q = q.filter(Application.status == params['status'])
+    if params.get('post_code'): q = q.filter(Application.post_code == params['post_code'])
+    return q
+
+def build_export(params, dest, progress, cfg):
+    from .reports.routes import export_rows, EXPORT_COLUMNS
+    rows = _counted(export_rows(params['status'], params['post_code'], with_thumbs=params['include_photo']), progress)
+    if params['format'] == 'csv':
+        with open(dest, 'w', newline='', encoding='utf-8') as f:
+            w = csv.writer(f, lineterminator='\n'); w.writerow(EXPORT_COLUMNS); w.writerows(rows)
+    else:
+        from .reports.xlsx import write_xlsx
+        include_photo = params['include_photo']
+        write_xlsx(rows, EXPORT_COLUMNS, dest,
+                   photo_index=EXPORT_COLUMNS.index('PhotoFile') if include_photo else None,
+                   thumb_index=len(EXPORT_COLUMNS) if include_photo else None,
+                   workers=cfg['EXPORT_THUMBNAIL_WORKERS'])
+
+def build_pdf_zip(params, dest, progress, cfg):
+    from .pdfs import iter_pdf_zip
+    with open(dest, 'wb') as f:
+        for chunk in iter_pdf_zip(_filtered(params), cfg['PDF_CACHE_FOLDER'], workers=cfg['PDF_WORKERS']):
+            f.write(chunk); progress()  # iter_pdf_zip yields once per application, then the central directory
+
+def build_duplicates(params, dest, progress, cfg):
+    # Reads and writes the primary: the stored result must not lag behind a replica
+    from .dedupe import detect, store
+    from .replica import use_primary
+    with use_primary():
+        clusters, skipped = detect(db.session.connection(), cfg['DEDUPE_MAX_BLOCK'])
+        store(clusters, skipped, cfg['DEDUPE_MAX_BLOCK'])
+    clusters.to_csv(dest, index=False)
+
+BUILDERS = {'export': build_export, 'pdf_zip': build_pdf_zip, 'duplicates': build_duplicates}
+
+def run_job(app, job_id):
+    """Build one claimed job's artifact and record the outcome. Safe to call in any process with an app."""
+    with app.app_context():
+        job = db.session.get(ReportJob, job_id)
+        params = json.loads(job.params); cfg = app.config
+        folder = cfg['REPORT_JOB_FOLDER']; os.makedirs(folder, exist_ok=True)
+        dest = os.path.abspath(os.path.join(folder, f'{job.id}.{extension(job)}')); part = dest + '.part'
+        kind = job.kind
+        progress = Progress(job_id)
+        try:
+            with use_replica(): total = _filtered(params).order_by(None).count()
+            job.total = total; db.session.commit()
+            with use_replica(): BUILDERS[kind](params, part, progress, cfg)
+            os.replace(part, dest)
+        except Exception as e:
+            db.session.rollback()
+            if os.path.exists(part): os.remove(part)
+            log.exception('report job %s failed', job_id)
+            fail(job_id, f'{type(e).__name__}: {e}')
+            return 'failed'
+        db.session.rollback()  # drop the streamed read before writing the outcome
+        job = db.session.get(ReportJob, job_id)
+        job.status = 'done'; job.progress = job.total if job.total is not None else progress.done; job.artifact_path = dest; job.size_bytes = os.path.getsize(dest)
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        return 'done'
+
+def purge_expired(retention_hours):
+    """Delete artifacts of jobs finished more than retention_hours ago; returns how many."""
+    cutoff = datetime.utcnow() - timedelta(hours=retention_hours); n = 0
+    for job in ReportJob.query.filter(ReportJob.status == 'done', ReportJob.finished_at < cutoff).all():
+        if job.artifact_path and os.path.exists(job.artifact_path): os.remove(job.artifact_path)
+        job.status = 'expired'; job.artifact_path = None; n += 1
+    db.session.commit()
+    return n
+
+# Worker processes build their own app once, from the dispatcher's config so they use the same
+# databases and folders; create_app() is cheap and touches no tables
+_worker_app = None
+
+def _init_worker(config):
+    global _worker_app
+    from . import create_app
+    _worker_app = create_app(config)
+    with _worker_app.app_context():
+        for engine in db.engines.values(): engine.dispose()  # never reuse connections inherited from the dispatcher
+
+def _run_in_worker(job_id):
+    return run_job(_worker_app, job_id)
+
+class ReportWorker:
+    """Claims queued ReportJobs and runs up to `workers` of them at once in a process pool."""
+    def __init__(self, app, workers=None):
+        cfg = app.config
+        self.app = app
+        self.workers = workers or cfg['REPORT_JOB_WORKERS']
+        self.lease = cfg['REPORT_JOB_LEASE_SECONDS']
+        self.max_attempts = cfg['REPORT_JOB_MAX_ATTEMPTS']
+        self.retention = cfg['REPORT_JOB_RETENTION_HOURS']
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(dict(cfg),))
+        self.running = {}
+
+    def fill(self):
+        """Claim jobs until every worker is busy; returns how many were started."""
+        started = 0
+        with self.app.app_context():
+            while len(self.running) < self.workers:
+                job_id = claim(self.lease, self.max_attempts)
+                if job_id is None: break
+                self.running[job_id] = self.pool.submit(_run_in_worker, job_id); started += 1
+        return started
+
+    def reap(self):
+        """Collect finished futures; returns how many jobs ended done or failed."""
+        finished = 0
+        for job_id, fut in list(self.running.items()):
+            if not fut.done(): continue
+            del self.running[job_id]
+            try:
+                outcome = fut.result()
+            except Exception as e:
+                log.exception('report job %s: worker process failed', job_id)
+                with self.app.app_context(): fail(job_id, f'Worker process failed: {type(e).__name__}: {e}')
+                outcome = 'failed'
+            log.info('report job %s: %s', job_id, outcome)
+            finished += outcome in ('done', 'failed')
+        return finished
+
+    def run_pending(self, once=False, poll_interval=None):
+        """Run jobs until stopped, or with once=True until the queue is empty; returns jobs finished."""
+        poll_interval = poll_interval or self.app.config['OUTBOX_POLL_INTERVAL']
+        done = 0; last_purge = 0.0
+        try:
+            while True:
+                self.fill()
+                if once and not self.running: break
+                time.sleep(min(poll_interval, 0.5) if self.running else poll_interval)
+                done += self.reap()
+                if time.monotonic() - last_purge > 600:
+                    with self.app.app_context(): purge_expired(self.retention)
+                    last_purge = time.monotonic()
+        finally:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+        return done
@@ -0,0 +1,26 @@
+from sqlalchemy.orm import joinedload, selectinload
+from .models import Application
+
+# One joined SELECT for the application, its user and profile, then one SELECT ... IN per
+# child collection: a fixed query count however many rows each application has.
+GRAPH = (
+    joinedload(Application.user),
+    joinedload(Application.profile),
+    selectinload(Application.educations),
+    selectinload(Application.employments),
+    selectinload(Application.documents),
+    selectinload(Application.payments),
+)
+
+def load_application(app_id):
+    """The full application graph, or 404."""
+    return Application.query.options(*GRAPH).filter(Application.id == app_id).first_or_404()
+
+def iter_applications(query, batch=200):
+    """Yield applications from query with their graphs loaded, batch by batch in id order."""
+    last_id = 0
+    while True:
+        apps = query.options(*GRAPH).filter(Application.id > last_id).order_by(Application.id).limit(batch).all()
+        if not apps: return
+        last_id = apps[-1].id
+        yield apps
@@ -0,0 +1,59 @@
+import json, os, re, threading, time
+from types import MappingProxyType
+
+_LANG_RE = re.compile(r'^[a-z]{2,3}$')
+
+class LocaleCatalogs:
+    """Translation catalogs parsed once per process into read-only mappings.
+
+    Only whitelisted language codes ever reach the filesystem. Non-default catalogs are
+    layered over the default one, so a missing key falls back to English. With
+    auto_reload, file mtimes are re-checked at most every `reload_interval` seconds.
+    """
+    def __init__(self, directory, languages, default='en', auto_reload=False, reload_interval=2.0):
+        self.directory = directory
+        self.default = default
+        self.languages = tuple(l for l in languages if _LANG_RE.match(l))
+        if default not in self.languages: self.languages = (default,) + self.languages
+        self.auto_reload = auto_reload; self.reload_interval = reload_interval
+        self._lock = threading.Lock(); self._checked = 0.0
+        self._catalogs = {}; self._mtimes = {}
+        self.load()
+
+    def _path(self, lang):
+        return os.path.join(self.directory, f'{lang}.json')
+
+    def _read(self, lang):
+        try:
+            with open(self._path(lang), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _mtime(self, lang):
+        try: return os.stat(self._path(lang)).st_mtime
+        except OSError: return None
+
+    def load(self):
+        raw = {lang: self._read(lang) for lang in self.languages}
+        base = raw[self.default]
+        catalogs = {lang: MappingProxyType({**base, **raw[lang]}) for lang in self.languages}
+        self._mtimes = {lang: self._mtime(lang) for lang in self.languages}
+        self._catalogs = catalogs  # swapped in one assignment; readers never see a half-built set
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked < self.reload_interval: return
+        with self._lock:
+            if now - self._checked < self.reload_interval: return
+            self._checked = now
+            if any(self._mtime(lang) != m for lang, m in self._mtimes.items()):
+                self.load()
+
+    def normalize(self, lang_code):
+        code = (lang_code or '').strip().lower().replace('_', '-').split('-', 1)[0]
+        return code if code in self._catalogs else self.default
+
+    def get(self, lang_code=None):
+        if self.auto_reload: self._maybe_reload()
+        return self._catalogs[self.normalize(lang_code)]
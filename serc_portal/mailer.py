@@ -1,21 +1,105 @@
-import smtplib
+import smtplib, threading, time
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
 from email.utils import formataddr
+from .metrics import timed, TextfileExport
 
 class Mailer:
     def __init__(self, host, port, user, password, from_email):
         self.host = host; self.port = port
         self.user = user; self.password = password
         self.from_email = from_email
-    def send(self, to_email, subject, body):
-        if not self.host: return False
+        self._smtp = None
+    @classmethod
+    def from_config(cls, cfg):
+        return cls(cfg.get('SMTP_HOST'), cfg.get('SMTP_PORT'), cfg.get('SMTP_USER'), cfg.get('SMTP_PASS'), cfg.get('FROM_EMAIL'))
+    def _connect(self):
+        s = smtplib.SMTP(self.host, self.port)
+        s.starttls()
+        if self.user:
+            s.login(self.user, self.password)
+        return s
+    def _message(self, to_email, subject, body):
         msg = MIMEText(body, 'plain', 'utf-8')
         msg['Subject'] = subject
         msg['From'] = formataddr(('CSIR-SERC', self.from_email))
         msg['To'] = to_email
-        with smtplib.SMTP(self.host, self.port) as s:
-            s.starttls()
-            if self.user:
-                s.login(self.user, self.password)
-            s.sendmail(self.from_email, [to_email], msg.as_string())
+        return msg
+    # Keep-alive mode: `with mailer:` holds one authenticated session across sends
+    def open(self):
+        if self.host and self._smtp is None:
+            self._smtp = self._connect()
+        return self
+    def __enter__(self):
+        return self.open()
+    def __exit__(self, *exc):
+        self.close()
+    def close(self):
+        if self._smtp is not None:
+            try: self._smtp.quit()
+            except Exception: pass
+            self._smtp = None
+    def send(self, to_email, subject, body):
+        if not self.host: return False
+        msg = self._message(to_email, subject, body)
+        with timed('mail'):
+            if self._smtp is None:
+                with self._connect() as s:
+                    s.sendmail(self.from_email, [to_email], msg.as_string())
+                return True
+            try:
+                self._smtp.sendmail(self.from_email, [to_email], msg.as_string())
+            except smtplib.SMTPServerDisconnected:
+                self._smtp = self._connect()
+                self._smtp.sendmail(self.from_email, [to_email], msg.as_string())
         return True
+
+class MailerPool:
+    """A small set of kept-alive SMTP sessions driven by a thread pool, with an optional rate cap.
+
+    A pool named after its worker publishes the process's mail timings with TextfileExport.
+    """
+    def __init__(self, cfg, size, rate=None, worker=None):
+        self.cfg = cfg; self.size = max(1, size)
+        self._export = TextfileExport(cfg.get('METRICS_TEXTFILE_DIR'), worker) if worker else None
+        self._local = threading.local(); self._mailers = []
+        self._lock = threading.Lock()
+        self._interval = 1.0 / rate if rate else 0.0; self._next = 0.0
+        self._pool = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix='smtp')
+    def _mailer(self):
+        m = getattr(self._local, 'mailer', None)
+        if m is None:
+            m = self._local.mailer = Mailer.from_config(self.cfg)
+            with self._lock: self._mailers.append(m)
+        return m
+    def _throttle(self):
+        if not self._interval: return
+        with self._lock:
+            now = time.monotonic(); wait = self._next - now
+            self._next = max(now, self._next) + self._interval
+        if wait > 0: time.sleep(wait)
+    def _deliver(self, messages):
+        mailer = self._mailer(); results = []
+        for key, to_email, subject, body in messages:
+            self._throttle()
+            try:
+                mailer.open()
+                if not mailer.send(to_email, subject, body):
+                    raise RuntimeError('SMTP_HOST is not configured')
+                results.append((key, None))
+            except Exception as e:
+                mailer.close()  # reconnect on the next message
+                results.append((key, str(e) or e.__class__.__name__))
+        return results
+    def send_many(self, messages):
+        """Send (key, to, subject, body) tuples; returns [(key, error-or-None)]."""
+        chunks = [messages[i::self.size] for i in range(self.size)]
+        results = []
+        for fut in [self._pool.submit(self._deliver, c) for c in chunks if c]:
+            results.extend(fut.result())
+        if self._export: self._export.write()
+        return results
+    def close(self):
+        self._pool.shutdown(wait=True)
+        for m in self._mailers: m.close()
+        if self._export: self._export.write(force=True)
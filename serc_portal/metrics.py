@@ -0,0 +1,166 @@
+import hmac, logging, os, threading, time
+from contextlib import contextmanager
+from flask import g, has_request_context, request, current_app, abort, Response
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+SETTINGS = {'slow_query_ms': 0}
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Histogram:
+    """Prometheus-style cumulative histogram keyed by label values; thread-safe, per process."""
+    def __init__(self, name, help, labelnames, buckets=LATENCY_BUCKETS):
+        self.name = name; self.help = help; self.labelnames = labelnames; self.buckets = buckets
+        self._lock = threading.Lock(); self._series = {}
+
+    def observe(self, value, *labels):
+        with self._lock:
+            s = self._series.get(labels)
+            if s is None: s = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, b in enumerate(self.buckets):
+                if value <= b: s[0][i] += 1
+            s[1] += value; s[2] += 1
+
+    def render(self, const=None):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock: series = [(k, list(v[0]), v[1], v[2]) for k, v in sorted(self._series.items())]
+        for labels, counts, total, n in series:
+            base = ','.join(f'{k}="{_label(v)}"' for k, v in list((const or {}).items()) + list(zip(self.labelnames, labels)))
+            sep = ',' if base else ''
+            for b, c in zip(self.buckets, counts): lines.append(f'{self.name}_bucket{{{base}{sep}le="{b:g}"}} {c}')
+            lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {n}')
+            lines.append(f'{self.name}_sum{{{base}}} {total:.6f}')
+            lines.append(f'{self.name}_count{{{base}}} {n}')
+        return '\n'.join(lines)
+
+REQUEST_SECONDS = Histogram('serc_request_duration_seconds', 'Wall time per request.', ('endpoint', 'method', 'status'))
+REQUEST_QUERIES = Histogram('serc_request_db_queries', 'SQL statements executed per request.', ('endpoint',), COUNT_BUCKETS)
+REQUEST_DB_SECONDS = Histogram('serc_request_db_seconds', 'Time spent in SQL per request.', ('endpoint',))
+SECTION_SECONDS = Histogram('serc_section_duration_seconds', 'Time spent in instrumented sections (mail, pdf, xlsx).', ('section',))
+HISTOGRAMS = (REQUEST_SECONDS, REQUEST_QUERIES, REQUEST_DB_SECONDS, SECTION_SECONDS)
+
+def render(const=None):
+    return '\n'.join(h.render(const) for h in HISTOGRAMS) + '\n'
+
+class TextfileExport:
+    """Writes a worker process's histograms to <METRICS_TEXTFILE_DIR>/serc_<worker>.prom.
+
+    The outbox and campaign workers send mail outside the web processes that serve /metrics,
+    so they publish through node_exporter's textfile collector instead, labelled worker=<name>.
+    Written at most every `interval` seconds, atomically; a no-op when the directory is unset.
+    """
+    def __init__(self, directory, worker, interval=10.0):
+        self.path = os.path.join(directory, f'serc_{worker}.prom') if directory else None
+        self.labels = {'worker': worker}; self.interval = interval; self.last = 0.0
+
+    def write(self, force=False):
+        if not self.path: return
+        now = time.monotonic()
+        if not force and now - self.last < self.interval: return
+        self.last = now
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path + '.tmp', 'w') as f: f.write(render(self.labels))  # the collector only reads *.prom
+            os.replace(self.path + '.tmp', self.path)
+        except OSError as e:
+            log.warning('metrics not written to %s: %s', self.path, e)
+
+class RequestStats:
+    __slots__ = ('start', 'queries', 'db_time', 'sections', 'slowest')
+    def __init__(self):
+        self.start = time.perf_counter(); self.queries = 0; self.db_time = 0.0; self.sections = {}; self.slowest = []
+    def add_query(self, statement, elapsed):
+        self.queries += 1; self.db_time += elapsed
+        if len(self.slowest) < 3 or elapsed > self.slowest[-1][0]:
+            self.slowest = sorted(self.slowest + [(elapsed, statement)], key=lambda x: -x[0])[:3]
+
+def _stats():
+    return g.get('perf') if has_request_context() else None
+
+@contextmanager
+def timed(section):
+    """Time a block into serc_section_duration_seconds and, inside a request, the request's stats."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        SECTION_SECONDS.observe(elapsed, section)
+        stats = _stats()
+        if stats is not None: stats.sections[section] = stats.sections.get(section, 0.0) + elapsed
+
+def _sql(statement):
+    return ' '.join(statement.split())[:500]
+
+def _before_cursor(conn, cursor, statement, parameters, context, executemany):
+    if context is not None: context._serc_t0 = time.perf_counter()
+
+def _after_cursor(conn, cursor, statement, parameters, context, executemany):
+    t0 = getattr(context, '_serc_t0', None)
+    if t0 is None: return
+    elapsed = time.perf_counter() - t0
+    stats = _stats()
+    if stats is not None: stats.add_query(statement, elapsed)
+    slow = SETTINGS['slow_query_ms']
+    if slow and elapsed * 1000 >= slow:
+        log.warning('slow query %.1f ms: %s | params=%.200r', elapsed * 1000, _sql(statement), parameters)
+
+def _record(stats, endpoint, method, status, slow_request_ms):
+    wall = time.perf_counter() - stats.start
+    REQUEST_SECONDS.observe(wall, endpoint, method, status)
+    REQUEST_QUERIES.observe(stats.queries, endpoint)
+    REQUEST_DB_SECONDS.observe(stats.db_time, endpoint)
+    if slow_request_ms and wall * 1000 >= slow_request_ms:
+        sections = ', '.join(f'{k} {v * 1000:.0f} ms' for k, v in stats.sections.items()) or 'none'
+        worst = ''.join(f'\n    {t * 1000:.1f} ms  {_sql(s)}' for t, s in stats.slowest)
+        log.warning('slow request %s %s -> %s: %.0f ms, %d queries / %.0f ms in SQL, sections: %s%s',
+                    method, endpoint, status, wall * 1000, stats.queries, stats.db_time * 1000, sections, worst)
+
+def metrics():
+    token = current_app.config['METRICS_TOKEN']
+    bearer = request.headers.get('Authorization', '')
+    if not ((token and hmac.compare_digest(bearer, f'Bearer {token}')) or
+            (current_user.is_authenticated and current_user.role == 'admin')):
+        abort(403)
+    return Response(render(), mimetype='text/plain; version=0.0.4')
+
+def init_metrics(app):
+    """Per-request wall time, SQL count/time and section timings; slow logs; admin-only /metrics.
+
+    Histograms are per process: with several workers, scrape each one or aggregate upstream.
+    Mail is timed in the outbox and campaign workers, which publish it through TextfileExport.
+    With SERVER_TIMING on, admins also get the request's SQL and app time in a Server-Timing header.
+    Streamed (generator) responses are recorded when the body finishes, not when the view returns.
+    """
+    if not app.config['METRICS_ENABLED']: return
+    SETTINGS['slow_query_ms'] = app.config['SLOW_QUERY_MS']
+    slow_request_ms = app.config['SLOW_REQUEST_MS']; server_timing = app.config['SERVER_TIMING']
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor)
+
+    @app.before_request
+    def start_request_stats():
+        g.perf = RequestStats()
+
+    @app.after_request
+    def finish_request_stats(resp):
+        stats = g.get('perf')
+        if stats is None: return resp
+        if server_timing and current_user.is_authenticated and current_user.role == 'admin':
+            resp.headers['Server-Timing'] = (f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", '
+                                             f'app;dur={(time.perf_counter() - stats.start) * 1000:.1f}')
+        args = (stats, request.endpoint or 'unmatched', request.method, resp.status_code, slow_request_ms)
+        # Generators run after this hook, so record them on close; files (direct_passthrough) never call close hooks
+        if resp.is_streamed and not resp.direct_passthrough: resp.call_on_close(lambda: _record(*args))
+        else: _record(*args)
+        return resp
+
+    app.add_url_rule('/metrics', 'metrics', metrics)
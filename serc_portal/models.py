@@ -1,5 +1,7 @@
-import os
+import os, re
 from datetime import datetime
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
 from .extensions import db
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -18,14 +20,14 @@ class User(UserMixin, db.Model):
 
 class ApplicantProfile(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     name = db.Column(db.String(200))
     father = db.Column(db.String(200))
     mother = db.Column(db.String(200))
     dob = db.Column(db.Date)
     gender = db.Column(db.String(20))
     nationality = db.Column(db.String(100))
-    category = db.Column(db.String(20))
+    category = db.column_property(db.Column(db.String(20)), active_history=True)  # for count_submissions
     pwbd = db.Column(db.String(20))
     exsm = db.Column(db.String(10))
     addr1 = db.Column(db.String(250))
@@ -33,21 +35,48 @@ class ApplicantProfile(db.Model):
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     pin = db.Column(db.String(6))
-    photo_path = db.Column(db.String(300))
-    sign_path = db.Column(db.String(300))
+    # Blob references: active_history so count_blob_refs always sees the key being replaced
+    photo_path = db.column_property(db.Column(db.String(300)), active_history=True)
+    sign_path = db.column_property(db.Column(db.String(300)), active_history=True)
+    # Derived at upload time (see imaging.py) so exports and PDFs never decode the originals
+    photo_thumb_path = db.column_property(db.Column(db.String(300)), active_history=True)
+    photo_print_path = db.column_property(db.Column(db.String(300)), active_history=True)
+    sign_print_path = db.column_property(db.Column(db.String(300)), active_history=True)
 
 class Application(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    post_code = db.Column(db.String(16), nullable=False)
-    status = db.Column(db.String(32), default='Submitted')
+    # active_history so the StatusCounter and SubmissionRollup hooks always see the previous value
+    user_id = db.column_property(db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False), active_history=True)
+    post_code = db.column_property(db.Column(db.String(16), nullable=False, index=True), active_history=True)
+    status = db.column_property(db.Column(db.String(32), default='Submitted', index=True), active_history=True)
     shortlist_tag = db.Column(db.String(64))
     reviewer_notes = db.Column(db.Text)
-    submitted_at = db.Column(db.DateTime, default=datetime.utcnow)
+    submitted_at = db.column_property(db.Column(db.DateTime, default=datetime.utcnow), active_history=True)
+    # Bumped whenever the application or its payment/documents/education change; keys the PDF cache
+    content_version = db.Column(db.Integer, default=1, nullable=False)
+    __table_args__ = (
+        db.Index('ix_application_submitted_at_id', 'submitted_at', 'id'),
+        db.Index('ix_application_status_submitted_at', 'status', 'submitted_at', 'id'),
+        db.Index('ix_application_post_code_submitted_at', 'post_code', 'submitted_at', 'id'),
+        db.Index('ix_application_user_id_post_code', 'user_id', 'post_code'),
+    )
+    # The application graph; load it through loaders.py rather than attribute by attribute
+    user = db.relationship('User', lazy='select')
+    profile = db.relationship('ApplicantProfile', primaryjoin='Application.user_id == foreign(ApplicantProfile.user_id)',
+                              uselist=False, viewonly=True, lazy='select')
+    educations = db.relationship('Education', order_by='Education.id', lazy='select')
+    employments = db.relationship('Employment', order_by='Employment.id', lazy='select')
+    documents = db.relationship('Document', order_by='Document.id', lazy='select')
+    payments = db.relationship('Payment', order_by='Payment.id', lazy='select')
+
+    @property
+    def payment(self):
+        # The latest payment: a retried fee leaves the earlier attempt behind
+        return self.payments[-1] if self.payments else None
 
 class Education(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    application_id = db.Column(db.Integer, db.ForeignKey('application.id'), nullable=False)
+    application_id = db.Column(db.Integer, db.ForeignKey('application.id'), nullable=False, index=True)
     degree_level = db.Column(db.String(32))
     discipline = db.Column(db.String(200))
     institute = db.Column(db.String(200))
@@ -56,7 +85,7 @@ class Education(db.Model):
 
 class Employment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    application_id = db.Column(db.Integer, db.ForeignKey('application.id'), nullable=False)
+    application_id = db.Column(db.Integer, db.ForeignKey('application.id'), nullable=False, index=True)
     org = db.Column(db.String(200))
     designation = db.Column(db.String(200))
     dt_from = db.Column(db.Date)
@@ -64,16 +93,18 @@ class Employment(db.Model):
 
 class Document(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    application_id = db.Column(db.Integer, db.ForeignKey('application.id'), nullable=False)
+    application_id = db.Column(db.Integer, db.ForeignKey('application.id'), nullable=False, index=True)
     doc_type = db.Column(db.String(50))
-    storage_path = db.Column(db.String(400))
+    storage_path = db.column_property(db.Column(db.String(400)), active_history=True)
+    sha256 = db.Column(db.String(64))
+    size_bytes = db.Column(db.Integer)
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class Payment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    application_id = db.Column(db.Integer, db.ForeignKey('application.id'), nullable=False)
+    application_id = db.Column(db.Integer, db.ForeignKey('application.id'), nullable=False, index=True)
     applicable = db.Column(db.Boolean, default=True)
-    utr = db.Column(db.String(64))
+    utr = db.Column(db.String(64), index=True)
     utr_date = db.Column(db.Date)
     amount = db.Column(db.Integer)
     receipt_path = db.Column(db.String(300))
@@ -89,6 +120,281 @@ class BulkEmailLog(db.Model):
     filter_status = db.Column(db.String(32))
     filter_post_code = db.Column(db.String(16))
     count_sent = db.Column(db.Integer)
+    # Campaign state: recipients live in BulkEmailRecipient, so a run can resume where it stopped
+    body = db.Column(db.Text)
+    interview_dt = db.Column(db.String(200))
+    venue = db.Column(db.String(300))
+    status = db.Column(db.String(16), default='queued')  # queued / running / done
+    total = db.Column(db.Integer, default=0)
+    count_failed = db.Column(db.Integer, default=0)
+    created_by = db.Column(db.String(255))
+    finished_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)  # moved by the running worker; a stale one means the worker died
+
+class BulkEmailRecipient(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    log_id = db.Column(db.Integer, db.ForeignKey('bulk_email_log.id'), nullable=False)
+    application_id = db.Column(db.Integer, db.ForeignKey('application.id'))
+    to_email = db.Column(db.String(255), nullable=False)
+    name = db.Column(db.String(200))
+    post_code = db.Column(db.String(16))
+    status = db.Column(db.String(16), default='pending')  # pending / sending / sent / failed
+    error = db.Column(db.Text)
+    sent_at = db.Column(db.DateTime)
+    __table_args__ = (db.Index('ix_bulk_email_recipient_log_status', 'log_id', 'status', 'id'),)
+
+class EmailOutbox(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    application_id = db.Column(db.Integer, db.ForeignKey('application.id'), index=True)
+    to_email = db.Column(db.String(255), nullable=False)
+    subject = db.Column(db.String(300))
+    body = db.Column(db.Text)
+    status = db.Column(db.String(16), default='pending')  # pending / sending / sent / failed
+    attempts = db.Column(db.Integer, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+    __table_args__ = (db.Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),)
+
+class StatusChange(db.Model):
+    # Audit trail: one row per application per status transition, single or bulk
+    id = db.Column(db.Integer, primary_key=True)
+    application_id = db.Column(db.Integer, db.ForeignKey('application.id'), nullable=False, index=True)
+    from_status = db.Column(db.String(32))
+    to_status = db.Column(db.String(32), nullable=False)
+    shortlist_tag = db.Column(db.String(64))
+    reviewer_notes = db.Column(db.Text)
+    changed_by = db.Column(db.String(255))
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    bulk = db.Column(db.Boolean, default=False, nullable=False)
+
+class ReportJob(db.Model):
+    # Background export/report queue, drained by `flask report-worker` (see jobs.py)
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(32), nullable=False)
+    params = db.Column(db.Text, nullable=False)  # JSON of the normalized filters
+    dedupe_key = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(16), nullable=False, default='queued')  # queued / running / done / failed / expired
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer)
+    artifact_path = db.Column(db.String(400))
+    size_bytes = db.Column(db.Integer)
+    error = db.Column(db.Text)
+    requested_by = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # claims so far
+    __table_args__ = (
+        # At most one queued/running job per identical request; a second INSERT fails and joins it
+        db.Index('uq_report_job_in_flight', 'dedupe_key', unique=True,
+                 sqlite_where=db.text("status IN ('queued', 'running')"), postgresql_where=db.text("status IN ('queued', 'running')")),
+        db.Index('ix_report_job_status_created_at', 'status', 'created_at'),
+    )
+
+class SubmissionKey(db.Model):
+    # 'post:<user_id>:<post_code>' and 'utr:<utr>' of every application since 0009; the primary key
+    # makes a concurrent duplicate submission fail at commit (see dedupe.claim_submission)
+    key = db.Column(db.String(100), primary_key=True)
+    application_id = db.Column(db.Integer, db.ForeignKey('application.id'), nullable=False)
+
+class DuplicateRun(db.Model):
+    # The latest duplicate scan (see dedupe.store); the admin pages read it instead of re-running detect()
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    clusters = db.Column(db.Integer, nullable=False, default=0)
+    applications = db.Column(db.Integer, nullable=False, default=0)
+    max_block = db.Column(db.Integer)
+    summary = db.Column(db.Text)  # JSON: {"by_key": {...}, "skipped": {...}}
+
+class DuplicateMember(db.Model):
+    run_id = db.Column(db.Integer, db.ForeignKey('duplicate_run.id'), primary_key=True)
+    application_id = db.Column(db.Integer, primary_key=True)
+    cluster = db.Column(db.Integer, nullable=False)
+    matched_on = db.Column(db.String(100))
+    __table_args__ = (db.Index('ix_duplicate_member_run_id_cluster', 'run_id', 'cluster'),)
+
+# Content versioning: any flushed change to an application's own row or its child rows
+# bumps Application.content_version once per flush, and so does a change to the applicant's
+# profile or to the User columns the PDF shows, for every application of that user.
+# Set-based UPDATEs bypass this and must bump the column themselves.
+CONTENT_CHILDREN = (Payment, Document, Education, Employment)
+CONTENT_USER_FIELDS = ('email',)
+
+@event.listens_for(Session, 'before_flush')
+def bump_content_version(session, flush_context, instances):
+    bumped = set(); users = set()
+    def bump(app):
+        if app is None or app in session.new or id(app) in bumped: return
+        app.content_version = (app.content_version or 1) + 1; bumped.add(id(app))
+    with session.no_autoflush:
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(obj, Application):
+                bump(obj if (obj not in session.new and session.is_modified(obj, include_collections=False)) else None)
+            elif isinstance(obj, CONTENT_CHILDREN) and obj.application_id:
+                if obj in session.dirty and not session.is_modified(obj, include_collections=False): continue
+                bump(session.get(Application, obj.application_id))
+            elif isinstance(obj, ApplicantProfile) and obj.user_id:
+                if obj in session.dirty and not session.is_modified(obj, include_collections=False): continue
+                users.add(obj.user_id)
+            elif isinstance(obj, User) and obj in session.dirty:
+                if any(inspect(obj).attrs[f].history.has_changes() for f in CONTENT_USER_FIELDS): users.add(obj.id)
+        if users:
+            for app in session.query(Application).filter(Application.user_id.in_(users)): bump(app)
+
+class StatusCounter(db.Model):
+    # Materialised COUNT(*) per (post_code, status), kept current by count_status_changes below
+    post_code = db.Column(db.String(16), primary_key=True)
+    status = db.Column(db.String(32), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+def upsert_increment(conn, table, keys, rows, column='count'):
+    """Add each row's `column` value onto the row with the same `keys`, inserting it if missing.
+
+    A single INSERT ... ON CONFLICT DO UPDATE on SQLite/PostgreSQL, so concurrent writers never lose updates.
+    """
+    if not rows: return
+    if conn.dialect.name in ('sqlite', 'postgresql'):
+        if conn.dialect.name == 'sqlite': from sqlalchemy.dialects.sqlite import insert
+        else: from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table)
+        conn.execute(stmt.on_conflict_do_update(index_elements=[table.c[k] for k in keys],
+                                                set_={column: table.c[column] + stmt.excluded[column]}), rows)
+        return
+    for r in rows:
+        res = conn.execute(table.update().where(*[table.c[k] == r[k] for k in keys])
+                           .values({column: table.c[column] + r[column]}))
+        if not res.rowcount: conn.execute(table.insert(), [r])
+
+def adjust_status_counts(conn, deltas):
+    """Apply {(post_code, status): delta} atomically on conn."""
+    rows = [{'post_code': pc, 'status': st, 'count': d} for (pc, st), d in deltas.items() if d]
+    upsert_increment(conn, StatusCounter.__table__, ('post_code', 'status'), rows)
+
+def rebuild_status_counts():
+    conn = db.session.connection()
+    conn.execute(StatusCounter.__table__.delete())
+    groups = db.session.query(Application.post_code, Application.status, func.count()).group_by(Application.post_code, Application.status).all()
+    adjust_status_counts(conn, {(pc, st): n for pc, st, n in groups})
+    db.session.commit()
+
+def status_totals(post_code=None):
+    q = db.session.query(StatusCounter.status, func.sum(StatusCounter.count))
+    if post_code: q = q.filter(StatusCounter.post_code == post_code)
+    return {st: int(n or 0) for st, n in q.group_by(StatusCounter.status)}
+
+class SubmissionRollup(db.Model):
+    # Applications per (day, post_code, applicant category), kept current by count_submissions below
+    day = db.Column(db.Date, primary_key=True)
+    post_code = db.Column(db.String(16), primary_key=True)
+    category = db.Column(db.String(20), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+@event.listens_for(Session, 'after_flush')
+def count_status_changes(session, flush_context):
+    deltas = {}
+    def add(pc, st, d): deltas[(pc, st)] = deltas.get((pc, st), 0) + d
+    for obj in session.new:
+        if isinstance(obj, Application): add(obj.post_code, obj.status, 1)
+    for obj in session.deleted:
+        if isinstance(obj, Application):
+            ph = inspect(obj).attrs.post_code.history; sh = inspect(obj).attrs.status.history
+            add(ph.deleted[0] if ph.deleted else obj.post_code, sh.deleted[0] if sh.deleted else obj.status, -1)
+    for obj in session.dirty:
+        if not isinstance(obj, Application): continue
+        attrs = inspect(obj).attrs; ph = attrs.post_code.history; sh = attrs.status.history
+        if not (ph.has_changes() or sh.has_changes()): continue
+        old = (ph.deleted[0] if ph.deleted else obj.post_code, sh.deleted[0] if sh.deleted else obj.status)
+        new = (obj.post_code, obj.status)
+        if old != new: add(*old, -1); add(*new, 1)
+    adjust_status_counts(session.connection(), deltas)
+
+def _old(obj, attr):
+    h = inspect(obj).attrs[attr].history
+    return h.deleted[0] if h.deleted else getattr(obj, attr)
+
+def _rollup_key(submitted_at, post_code, category):
+    day = submitted_at.date() if isinstance(submitted_at, datetime) else submitted_at
+    return (day, post_code, category or '')
+
+@event.listens_for(Session, 'after_flush')
+def count_submissions(session, flush_context):
+    """Move SubmissionRollup by the flush's deltas: applications added, deleted or moved to another
+    post or day, and every application of a user whose profile category changed."""
+    conn = session.connection(); current = {}
+    def category(user_id):
+        if user_id not in current:
+            current[user_id] = conn.execute(db.select(ApplicantProfile.category).where(ApplicantProfile.user_id == user_id).limit(1)).scalar()
+        return current[user_id]
+    changed = {}  # user_id -> (category before, category after) for profiles changed in this flush
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, ApplicantProfile): continue
+        before = None if obj in session.new else _old(obj, 'category')
+        after = None if obj in session.deleted else obj.category
+        if (before or '') != (after or ''): changed[obj.user_id] = (before, after)
+    before_cat = lambda uid: changed[uid][0] if uid in changed else category(uid)
+    after_cat = lambda uid: changed[uid][1] if uid in changed else category(uid)
+    deltas = {}; seen = set()
+    def add(key, d):
+        if key[0] is not None: deltas[key] = deltas.get(key, 0) + d
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, Application): continue
+        attrs = inspect(obj).attrs
+        if obj in session.dirty and obj.user_id not in changed and not any(
+                attrs[a].history.has_changes() for a in ('submitted_at', 'post_code', 'user_id')): continue
+        seen.add(obj.id)
+        if obj not in session.new:
+            uid = _old(obj, 'user_id'); add(_rollup_key(_old(obj, 'submitted_at'), _old(obj, 'post_code'), before_cat(uid)), -1)
+        if obj not in session.deleted:
+            add(_rollup_key(obj.submitted_at, obj.post_code, after_cat(obj.user_id)), 1)
+    if changed:
+        A = Application.__table__.c
+        for app_id, user_id, submitted_at, post_code in conn.execute(
+                db.select(A.id, A.user_id, A.submitted_at, A.post_code).where(A.user_id.in_(changed))):
+            if app_id in seen: continue
+            add(_rollup_key(submitted_at, post_code, changed[user_id][0]), -1)
+            add(_rollup_key(submitted_at, post_code, changed[user_id][1]), 1)
+    rows = [{'day': d, 'post_code': pc, 'category': cat, 'count': n} for (d, pc, cat), n in deltas.items() if n]
+    upsert_increment(conn, SubmissionRollup.__table__, ('day', 'post_code', 'category'), rows)
+
+# Uploaded files live in storage.py's content-addressed store under keys "<sha256>.<ext>".
+# StoredBlob counts the row references to each key; count_blob_refs keeps it current, and
+# blobs that drop to zero are removed by `flask storage-gc`. Older rows may still hold
+# plain filesystem paths, which are not counted.
+BLOB_KEY = re.compile(r'^[0-9a-f]{64}\.[a-z0-9]{1,5}$')
+BLOB_COLUMNS = {ApplicantProfile: ('photo_path', 'sign_path', 'photo_thumb_path', 'photo_print_path', 'sign_print_path'),
+                Document: ('storage_path',)}
+
+class StoredBlob(db.Model):
+    key = db.Column(db.String(80), primary_key=True)
+    refs = db.Column(db.Integer, nullable=False, default=0)
+
+def is_blob_key(ref):
+    return bool(ref) and BLOB_KEY.match(ref) is not None
+
+def adjust_blob_refs(conn, deltas):
+    """Apply {key: delta} atomically on conn."""
+    upsert_increment(conn, StoredBlob.__table__, ('key',), [{'key': k, 'refs': d} for k, d in deltas.items() if d], column='refs')
+
+@event.listens_for(Session, 'after_flush')
+def count_blob_refs(session, flush_context):
+    deltas = {}
+    def add(ref, d):
+        if is_blob_key(ref): deltas[ref] = deltas.get(ref, 0) + d
+    for obj in list(session.new) + list(session.deleted) + list(session.dirty):
+        cols = BLOB_COLUMNS.get(type(obj))
+        if not cols: continue
+        attrs = inspect(obj).attrs
+        for col in cols:
+            h = attrs[col].history
+            if obj in session.new: add(getattr(obj, col), 1)
+            elif obj in session.deleted: add(h.deleted[0] if h.deleted else getattr(obj, col), -1)
+            else:
+                for ref in h.added: add(ref, 1)
+                for ref in h.deleted: add(ref, -1)
+    adjust_blob_refs(session.connection(), deltas)
 
 # Seeder
 from .config import Config
@@ -0,0 +1,89 @@
+import logging, time
+from datetime import datetime, timedelta
+from .extensions import db
+from .models import EmailOutbox
+from .mailer import MailerPool
+
+log = logging.getLogger(__name__)
+
+CLAIMABLE = ('pending', 'sending')
+
+def enqueue(to_email, subject, body, application_id=None):
+    # Staged in the caller's transaction; nothing is sent until a worker picks it up
+    if not to_email: return None
+    msg = EmailOutbox(to_email=to_email, subject=subject, body=body, application_id=application_id)
+    db.session.add(msg)
+    return msg
+
+def delivery_status(application_id):
+    return EmailOutbox.query.filter_by(application_id=application_id).order_by(EmailOutbox.id).all()
+
+def due_message_ids(now, limit):
+    # Ordered by due time so the (status, next_attempt_at) index serves both filter and sort
+    return [i for (i,) in db.session.query(EmailOutbox.id)
+            .filter(EmailOutbox.status.in_(CLAIMABLE), EmailOutbox.next_attempt_at <= now)
+            .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id).limit(limit)]
+
+class OutboxWorker:
+    """Drains EmailOutbox over a MailerPool of kept-alive SMTP sessions.
+
+    Only the dispatching thread touches the database: it claims a batch, fans the
+    messages out to the pool and records the results.
+    """
+    def __init__(self, app, workers=None, batch_size=None):
+        cfg = app.config
+        self.app = app
+        self.workers = workers or cfg['OUTBOX_WORKERS']
+        self.batch_size = batch_size or cfg['OUTBOX_BATCH_SIZE']
+        self.max_attempts = cfg['OUTBOX_MAX_ATTEMPTS']
+        self.backoff = cfg['OUTBOX_BACKOFF_SECONDS']
+        self.lease = cfg['OUTBOX_LEASE_SECONDS']
+        self.pool = MailerPool(cfg, self.workers, worker='outbox')
+
+    def claim(self):
+        now = datetime.utcnow()
+        candidates = due_message_ids(now, self.batch_size)
+        claimed = []
+        for msg_id in candidates:
+            # Conditional update so concurrent worker processes never claim the same row
+            n = (EmailOutbox.query
+                 .filter(EmailOutbox.id == msg_id, EmailOutbox.status.in_(CLAIMABLE), EmailOutbox.next_attempt_at <= now)
+                 .update({'status': 'sending', 'next_attempt_at': now + timedelta(seconds=self.lease)}, synchronize_session=False))
+            if n: claimed.append(msg_id)
+        db.session.commit()
+        return EmailOutbox.query.filter(EmailOutbox.id.in_(claimed)).all() if claimed else []
+
+    def record(self, results):
+        now = datetime.utcnow()
+        for msg_id, error in results:
+            msg = db.session.get(EmailOutbox, msg_id)
+            msg.attempts = (msg.attempts or 0) + 1
+            if error is None:
+                msg.status = 'sent'; msg.sent_at = now; msg.last_error = None
+            elif msg.attempts >= self.max_attempts:
+                msg.status = 'failed'; msg.last_error = error
+            else:
+                msg.status = 'pending'; msg.last_error = error
+                msg.next_attempt_at = now + timedelta(seconds=self.backoff * 2 ** (msg.attempts - 1))
+        db.session.commit()
+
+    def run_once(self):
+        msgs = self.claim()
+        if not msgs: return 0
+        results = self.pool.send_many([(m.id, m.to_email, m.subject, m.body) for m in msgs])
+        self.record(results)
+        failed = sum(1 for _, e in results if e)
+        if failed: log.warning('outbox: %d of %d messages failed', failed, len(results))
+        return len(results)
+
+    def run_forever(self, poll_interval=None):
+        poll_interval = poll_interval or self.app.config['OUTBOX_POLL_INTERVAL']
+        try:
+            while True:
+                if not self.run_once():
+                    time.sleep(poll_interval)
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        self.pool.close()
@@ -0,0 +1,145 @@
+"""Fee reconciliation: match a bank statement against Payment rows in one vectorized pass.
+
+Statement lines and payments are joined on the normalized UTR (upper-case, letters and
+digits only). A line verifies its payment only if exactly one line and one payment carry
+that UTR, the amounts agree and the dates are within PAYMENT_DATE_TOLERANCE_DAYS;
+everything else is reported with the reason it was left alone.
+"""
+import csv, io, itertools, re
+from datetime import datetime
+from sqlalchemy import Table, MetaData, Column, Integer, select, update, insert
+from ..extensions import db
+from ..models import Application, Payment
+
+OUTCOMES = ('matched', 'already_verified', 'duplicate_utr', 'amount_mismatch', 'date_mismatch', 'unmatched', 'invalid')
+REPORT_COLUMNS = ['line', 'utr', 'amount', 'date', 'outcome', 'application_id', 'expected_amount', 'claimed_date']
+# Header spellings seen in Indian bank statement exports, normalized to lower-case alphanumerics
+ALIASES = {
+    'utr': ('utr', 'utrno', 'utrnumber', 'utrref', 'reference', 'referenceno', 'refno', 'chqrefno', 'refnochequeno', 'chequerefno', 'transactionreference',
+            'txnref', 'transactionid', 'txnid', 'narration', 'description', 'remarks'),
+    'amount': ('amount', 'creditamount', 'credit', 'cr', 'deposit', 'depositamt', 'depositamount', 'amountinr', 'amountrs'),
+    'date': ('date', 'txndate', 'transactiondate', 'valuedate', 'valuedt', 'postingdate', 'trandate'),
+}
+FREE_TEXT = ('narration', 'description', 'remarks')  # the UTR is extracted from these with UTR_IN_TEXT
+UTR_IN_TEXT = re.compile(r'\b([A-Z]{4}[0-9A-Z]{8,18}|[0-9]{12,22}|UTR[0-9A-Z]{6,20})\b')
+HEADER_SCAN_ROWS = 30
+
+class StatementError(ValueError):
+    pass
+
+def _key(name):
+    return re.sub(r'[^a-z0-9]', '', str(name).lower())
+
+def _locate(rows):
+    """(header row index, {field: (column, alias)}) from the first rows of a statement."""
+    for i, row in enumerate(rows):
+        cols = {}
+        for pos, cell in enumerate(row):
+            k = _key(cell) if isinstance(cell, str) else ''
+            for field, names in ALIASES.items():
+                # earlier aliases win: a dedicated "UTR No" column beats a free-text narration
+                if k in names and (field not in cols or names.index(k) < names.index(cols[field][1])):
+                    cols[field] = (pos, k)
+        if 'utr' in cols and 'amount' in cols: return i, cols
+    raise StatementError('No header row with a UTR/reference and an amount column was found')
+
+def _dates(values):
+    # Excel cells come through as ISO text; CSV exports write dd/mm/yyyy or dd-Mon-yyyy
+    import pandas as pd
+    iso = pd.to_datetime(values, errors='coerce', format='ISO8601')
+    return iso.fillna(pd.to_datetime(values.where(iso.isna()), errors='coerce', dayfirst=True, format='mixed'))
+
+def read_statement(stream, filename):
+    """DataFrame of line, utr, amount, date from a CSV or XLSX statement; preamble rows are skipped."""
+    import pandas as pd
+    ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if ext in ('xlsx', 'xlsm'):
+        raw = pd.read_excel(stream, header=None, dtype=str, engine='openpyxl')
+        header, cols = _locate(raw.head(HEADER_SCAN_ROWS).values.tolist())
+        body = raw.iloc[header + 1:]; first_line = header + 2
+    elif ext in ('csv', 'txt'):
+        text = stream.read().decode('utf-8-sig', errors='replace')
+        header, cols = _locate(itertools.islice(csv.reader(io.StringIO(text)), HEADER_SCAN_ROWS))
+        width = max(pos for pos, _ in cols.values()) + 1
+        body = pd.read_csv(io.StringIO(text), skiprows=header + 1, header=None, usecols=range(width), names=range(width),
+                           dtype=str, on_bad_lines='skip', skip_blank_lines=True)
+        first_line = header + 2
+    else:
+        raise StatementError('Upload a .csv or .xlsx statement')
+    column = lambda field: body.iloc[:, cols[field][0]]
+    utr = column('utr').fillna('').astype(str).str.upper()
+    if cols['utr'][1] in FREE_TEXT: utr = utr.str.extract(UTR_IN_TEXT, expand=False).fillna('')
+    amount = pd.to_numeric(column('amount').fillna('').astype(str).str.replace(r'[^0-9.\-]', '', regex=True), errors='coerce')
+    date = _dates(column('date')) if 'date' in cols else pd.Series(pd.NaT, index=body.index)
+    out = pd.DataFrame({'line': range(first_line, first_line + len(body)), 'utr': utr.str.replace(r'[^0-9A-Z]', '', regex=True).to_numpy(),
+                        'amount': amount.round(2).to_numpy(), 'date': date.dt.normalize().to_numpy()})
+    # Trailing totals and blank lines carry neither a UTR nor an amount
+    return out[(out.utr != '') | out.amount.notna()].reset_index(drop=True)
+
+def load_payments(conn):
+    import pandas as pd
+    pays = pd.read_sql_query('SELECT id, application_id, utr, utr_date, amount, verified FROM payment WHERE utr IS NOT NULL', conn)
+    pays['utr'] = pays.utr.astype(str).str.upper().str.replace(r'[^0-9A-Z]', '', regex=True)
+    pays['utr_date'] = pd.to_datetime(pays.utr_date, errors='coerce')
+    pays['verified'] = pays.verified.fillna(False).astype(bool)
+    return pays[pays.utr != '']
+
+def match(statement, pays, date_tolerance_days=3):
+    """The statement with outcome, application_id, payment_id, expected_amount and claimed_date added."""
+    import numpy as np, pandas as pd
+    pays = pays.assign(claims=pays.groupby('utr').id.transform('size'))
+    m = statement.merge(pays.drop_duplicates('utr').rename(columns={'id': 'payment_id', 'amount': 'expected_amount', 'utr_date': 'claimed_date'}),
+                        on='utr', how='left')
+    lines = m.groupby('utr').line.transform('size')
+    days = (m.date - m.claimed_date).abs().dt.days
+    m['outcome'] = np.select(
+        [(m.utr == '') | m.amount.isna(),
+         (lines > 1) | (m.claims > 1),
+         m.payment_id.isna(),
+         m.verified.eq(True),
+         ~np.isclose(m.amount, m.expected_amount.astype(float)),
+         days > date_tolerance_days],
+        ['invalid', 'duplicate_utr', 'unmatched', 'already_verified', 'amount_mismatch', 'date_mismatch'], default='matched')
+    m['application_id'] = m.application_id.astype('Int64'); m['payment_id'] = m.payment_id.astype('Int64')
+    return m
+
+def apply_matches(payment_ids, verified_by):
+    """Verify the given payments in one set-based UPDATE; returns how many flipped.
+
+    The ids go through a temporary table so the statement stays one UPDATE at any size.
+    Payments already verified meanwhile are left alone, and the owning applications'
+    content_version is bumped here because set-based writes bypass the flush hook.
+    """
+    if not payment_ids: return 0
+    conn = db.session.connection(); now = datetime.utcnow()
+    ids = Table('reconcile_payment_ids', MetaData(), Column('id', Integer, primary_key=True), prefixes=['TEMPORARY'])
+    ids.create(conn)
+    try:
+        conn.execute(insert(ids), [{'id': int(i)} for i in payment_ids])
+        targets = select(ids.c.id)
+        flipped = select(Payment.id).where(Payment.id.in_(targets), Payment.verified.isnot(True))
+        conn.execute(update(Application)
+                     .where(Application.id.in_(select(Payment.application_id).where(Payment.id.in_(flipped))))
+                     .values(content_version=Application.content_version + 1))
+        n = conn.execute(update(Payment).where(Payment.id.in_(targets), Payment.verified.isnot(True))
+                         .values(verified=True, verified_at=now, verified_by=verified_by)).rowcount
+    finally:
+        ids.drop(conn)
+    db.session.commit()
+    return n
+
+def reconcile(stream, filename, verified_by, date_tolerance_days=3, dry_run=False):
+    """(report DataFrame, {outcome: count}, verified) for one uploaded statement."""
+    statement = read_statement(stream, filename)
+    result = match(statement, load_payments(db.session.connection()), date_tolerance_days)
+    matched = result.payment_id[result.outcome == 'matched'].tolist()
+    verified = 0 if dry_run else apply_matches(matched, verified_by)
+    counts = {o: 0 for o in OUTCOMES}
+    counts.update(result.outcome.value_counts().to_dict())
+    return result[REPORT_COLUMNS], counts, verified
+
+def preview(report, outcome, limit):
+    """Up to `limit` report rows with one outcome as plain dicts: missing values None, dates as text."""
+    rows = report[report.outcome == outcome].head(limit).copy()
+    for col in ('date', 'claimed_date'): rows[col] = rows[col].dt.strftime('%Y-%m-%d')
+    return rows.astype(object).where(rows.notna(), None).to_dict('records')
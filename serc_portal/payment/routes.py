@@ -1,2 +1,40 @@
-from flask import Blueprint
+from flask import Blueprint, render_template, request, redirect, url_for, flash, g, current_app, Response
+from flask_login import login_required, current_user
+from ..metrics import timed
+from .reconcile import reconcile as run_reconcile, preview, StatementError, OUTCOMES, REPORT_COLUMNS
+
 payment_bp = Blueprint('payment', __name__, url_prefix='/payment')
+
+@payment_bp.before_request
+def restrict_to_admin():
+    if not current_user.is_authenticated:
+        return redirect(url_for('auth.login'))
+    if current_user.role not in ['admin','reviewer']:
+        flash('Admins/Reviewers only', 'danger')
+        return redirect(url_for('applicant.apply'))
+
+@payment_bp.route('/reconcile', methods=['GET','POST'])
+@login_required
+def reconcile():
+    if request.method == 'GET':
+        return render_template('payment/reconcile.html', report=None, t=g.t)
+    f = request.files.get('statement')
+    if not f or not f.filename:
+        flash('Choose a bank statement (.csv or .xlsx).', 'danger'); return redirect(url_for('payment.reconcile'))
+    dry_run = request.form.get('dry_run') == 'on'
+    try:
+        with timed('reconcile'):
+            report, counts, verified = run_reconcile(f.stream, f.filename, current_user.email,
+                                                     current_app.config['PAYMENT_DATE_TOLERANCE_DAYS'], dry_run=dry_run)
+    except StatementError as e:
+        flash(str(e), 'danger'); return redirect(url_for('payment.reconcile'))
+    if request.form.get('download') == 'on':
+        # Full line-by-line report; the page below only previews the problem rows
+        return Response(report.to_csv(index=False, date_format='%Y-%m-%d'), mimetype='text/csv',
+                        headers={'Content-Disposition': 'attachment; filename=reconciliation.csv'})
+    limit = current_app.config['PAYMENT_RECON_PREVIEW']
+    problems = {o: preview(report, o, limit) for o in OUTCOMES if o != 'matched' and counts.get(o)}
+    if dry_run: flash(f"Dry run: {counts['matched']} line(s) would be verified. Nothing was changed.", 'info')
+    else: flash(f'{verified} payment(s) verified from {len(report)} statement line(s).', 'success')
+    return render_template('payment/reconcile.html', report=True, counts=counts, problems=problems, columns=REPORT_COLUMNS,
+                           limit=limit, dry_run=dry_run, t=g.t)
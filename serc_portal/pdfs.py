@@ -0,0 +1,127 @@
+import glob, io, os, shutil, tempfile, zipfile
+from concurrent.futures import ProcessPoolExecutor
+from .extensions import db
+from .models import Application
+from .loaders import GRAPH
+from .storage import local_path
+from .metrics import timed
+
+def snapshot(app, profile, edus, pay, email=''):
+    """Plain, picklable view of everything render_pdf draws."""
+    return {
+        'id': app.id, 'post_code': app.post_code, 'status': app.status, 'submitted_at': app.submitted_at,
+        'email': email or '',
+        'name': profile.name if profile else '',
+        'photo': local_path(profile.photo_print_path or profile.photo_path) if profile else None,
+        'edus': [(e.degree_level, e.discipline, e.institute, e.year, e.marks) for e in edus],
+        'pay': (pay.applicable, pay.utr, pay.amount, pay.verified) if pay else None,
+    }
+
+def render_pdf(snap):
+    """Render one application to PDF bytes. No app state, so it can run in a ProcessPoolExecutor."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.utils import ImageReader
+    buffer = io.BytesIO(); c = canvas.Canvas(buffer, pagesize=A4)
+    w,h = A4; y = h-50
+    c.setFont('Helvetica-Bold', 14); c.drawString(50,y, f"CSIR-SERC Scientist Application — {snap['post_code']}"); y-=30
+    # Photo on right
+    if snap['photo'] and os.path.exists(snap['photo']):
+        try:
+            img = ImageReader(snap['photo'])
+            c.drawImage(img, w-150, h-150, width=96, height=96, preserveAspectRatio=True, mask='auto')
+        except Exception: pass
+    c.setFont('Helvetica', 10); c.drawString(50,y, f"Applicant: {snap['name']} | Email: {snap['email']}"); y-=20
+    c.drawString(50,y, f"Status: {snap['status']} | Submitted: {snap['submitted_at'].strftime('%Y-%m-%d %H:%M')}"); y-=30
+    c.setFont('Helvetica-Bold', 12); c.drawString(50,y, 'Education:'); y-=20; c.setFont('Helvetica',10)
+    for level, disc, inst, year, marks in snap['edus']:
+        c.drawString(50,y, f"{level} — {disc} — {inst} — {year} — {marks}"); y-=16
+        if y<100: c.showPage(); y=h-50; c.setFont('Helvetica',10)
+    y-=10; c.setFont('Helvetica-Bold',12); c.drawString(50,y,'Payment:'); y-=20; c.setFont('Helvetica',10)
+    if snap['pay']:
+        applicable, utr, amount, verified = snap['pay']
+        c.drawString(50,y, f"Applicable: {applicable} | UTR: {utr} | Amount: {amount} | Verified: {verified}")
+    else: c.drawString(50,y, 'No payment record')
+    c.showPage(); c.save()
+    return buffer.getvalue()
+
+# Rendered-PDF cache: <PDF_CACHE_FOLDER>/<app_id>-v<content_version>.pdf
+
+def cache_path(cache_dir, app):
+    return os.path.join(cache_dir, f'{app.id}-v{app.content_version or 1}.pdf')
+
+def store(cache_dir, app, data):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = cache_path(cache_dir, app)
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix='.part')
+    with os.fdopen(fd, 'wb') as f: f.write(data)
+    os.replace(tmp, path)
+    for stale in glob.glob(os.path.join(cache_dir, f'{app.id}-v*.pdf')):
+        if stale != path:
+            try: os.remove(stale)
+            except OSError: pass
+    return path
+
+def open_cached(cache_dir, app):
+    """The application's cached PDF opened for reading, rendered and stored first on a miss.
+
+    Read from the handle, never by path again: a concurrent store() for a newer
+    content_version deletes this file, and an open handle survives that.
+    """
+    try:
+        return open(cache_path(cache_dir, app), 'rb')
+    except FileNotFoundError:
+        with timed('pdf'): data = render_pdf(load_snapshots([app])[0])
+        store(cache_dir, app, data)
+        return io.BytesIO(data)
+
+def snapshot_of(app):
+    """snapshot() of an application whose graph is loaded (see loaders.py)."""
+    return snapshot(app, app.profile, app.educations, app.payment, app.user.email if app.user else '')
+
+def load_snapshots(apps):
+    """Snapshots for a batch of applications, loading their graphs in one fixed set of queries."""
+    if not apps: return []
+    loaded = {a.id: a for a in Application.query.options(*GRAPH).filter(Application.id.in_([a.id for a in apps]))}
+    return [snapshot_of(loaded[a.id]) for a in apps]
+
+class _Sink(io.RawIOBase):
+    # Unseekable write target so ZipFile emits data descriptors and we can stream as we go
+    def __init__(self): self.chunks = []
+    def writable(self): return True
+    def write(self, b): self.chunks.append(bytes(b)); return len(b)
+    def drain(self):
+        data = b''.join(self.chunks); self.chunks.clear(); return data
+
+def iter_pdf_zip(query, cache_dir, workers=1, batch=100):
+    """Yield a ZIP of application PDFs for every Application in query, rendering cache misses in a process pool."""
+    sink = _Sink(); zf = zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    last_id = 0
+    try:
+        while True:
+            apps = query.filter(Application.id > last_id).order_by(Application.id).limit(batch).all()
+            if not apps: break
+            last_id = apps[-1].id
+            misses = [a for a in apps if not os.path.exists(cache_path(cache_dir, a))]
+            snaps = load_snapshots(misses)
+            with timed('pdf'):
+                rendered = list(pool.map(render_pdf, snaps, chunksize=4) if pool else map(render_pdf, snaps))
+            fresh = {}
+            for a, data in zip(misses, rendered):
+                store(cache_dir, a, data); fresh[a.id] = data
+            for a in apps:
+                name = f'application_{a.id}.pdf'
+                if a.id in fresh:
+                    zf.writestr(name, fresh.pop(a.id))
+                else:
+                    try:
+                        f = open(cache_path(cache_dir, a), 'rb')
+                    except FileNotFoundError:  # superseded by a newer version since the batch was checked
+                        db.session.refresh(a); f = open_cached(cache_dir, a)
+                    with f, zf.open(name, 'w') as dst: shutil.copyfileobj(f, dst)
+                yield sink.drain()
+        zf.close()
+        yield sink.drain()
+    finally:
+        if pool is not None: pool.shutdown(cancel_futures=True)
@@ -0,0 +1,45 @@
+"""Read-replica routing for reporting traffic.
+
+When REPLICA_DATABASE_URI is set it becomes the 'replica' bind, and SELECTs issued while
+routing is on are sent there; INSERT/UPDATE/DELETE, every flush and raw session.connection()
+work stay on the primary. Routing is on for the rest of a request in views marked
+@read_replica (streamed bodies included) and inside `with use_replica():` blocks. Without a
+replica both are no-ops and everything reads the primary.
+
+A replica lags: a view that reads back what it has just written must do so in use_primary().
+"""
+import functools
+from contextlib import contextmanager
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+
+REPLICA = 'replica'
+
+def routed():
+    return has_app_context() and g.get('_db_replica', False)
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kw):
+        if bind is None and routed() and not self._flushing and getattr(clause, 'is_select', False):
+            engine = self._db.engines.get(REPLICA)
+            if engine is not None: return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kw)
+
+@contextmanager
+def use_replica(on=True):
+    prev = g.get('_db_replica', False); g._db_replica = on
+    try:
+        yield
+    finally:
+        g._db_replica = prev
+
+def use_primary():
+    return use_replica(False)
+
+def read_replica(view):
+    """Route the view's reads to the replica; left on until the request ends so streamed responses read it too."""
+    @functools.wraps(view)
+    def wrapped(*args, **kwargs):
+        g._db_replica = True
+        return view(*args, **kwargs)
+    return wrapped
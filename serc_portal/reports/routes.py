@@ -1,12 +1,15 @@
-from flask import Blueprint, render_template, request, send_file, flash
+from flask import Blueprint, render_template, request, send_file, flash, Response, stream_with_context, current_app, redirect, url_for, jsonify, abort
 from flask_login import login_required, current_user
 from ..extensions import db
-from ..models import Application, ApplicantProfile, Payment
-import io
-import pandas as pd
-from openpyxl import Workbook
-from openpyxl.drawing.image import Image as XLImage
-from PIL import Image as PILImage
+from ..models import Application, ApplicantProfile, Payment, ReportJob
+import io, csv, json, os, tempfile
+from sqlalchemy import select, func
+from .xlsx import write_xlsx
+from ..pdfs import iter_pdf_zip
+from ..storage import local_path
+from ..metrics import timed
+from ..replica import read_replica
+from .. import jobs
 
 reports_bp = Blueprint('reports', __name__, url_prefix='/admin/reports')
 
@@ -23,73 +26,107 @@ def restrict_to_admin():
 @reports_bp.route('/')
 @login_required
 def reports_home():
-    return render_template('reports/reports.html')
+    return render_template('reports/reports.html', jobs=jobs.recent_jobs())
+
+EXPORT_COLUMNS = ['ApplicationID','Name','Category','PwBD','PostCode','Status','SubmittedAt','PhotoFile','UTR','Amount','PaymentVerified']
+
+def latest_payment_id():
+    return select(func.max(Payment.id)).where(Payment.application_id == Application.id).correlate(Application).scalar_subquery()
+
+def export_rows(status=None, post_code=None, chunk=1000, with_thumbs=False):
+    # One outer-joined, server-side streamed query instead of two lookups per application; only the
+    # latest payment is joined (as Application.payment), so a retried fee does not repeat the row.
+    # with_thumbs appends the precomputed photo thumbnail after the EXPORT_COLUMNS values and
+    # resolves both images to local files for embedding; otherwise PhotoFile is the stored reference.
+    q = (db.session.query(Application.id, ApplicantProfile.name, ApplicantProfile.category, ApplicantProfile.pwbd,
+                          Application.post_code, Application.status, Application.submitted_at, ApplicantProfile.photo_path,
+                          Payment.utr, Payment.amount, Payment.verified, ApplicantProfile.photo_thumb_path)
+         .outerjoin(Application.profile).outerjoin(Payment, Payment.id == latest_payment_id()))
+    if status: q = q.filter(Application.status == status)
+    if post_code: q = q.filter(Application.post_code == post_code)
+    for (app_id, name, category, pwbd, pc, st, submitted_at, photo, utr, amount, verified, thumb) in q.order_by(Application.id).yield_per(chunk):
+        row = (app_id, name or '', category or '', pwbd or '', pc, st, submitted_at, photo or '',
+               utr or '', amount if amount is not None else 0, bool(verified))
+        yield row[:7] + (local_path(photo) or '',) + row[8:] + (local_path(thumb),) if with_thumbs else row
+
+def iter_csv(status=None, post_code=None, rows_per_chunk=500):
+    buf = io.StringIO(); w = csv.writer(buf, lineterminator='\n')
+    w.writerow(EXPORT_COLUMNS)
+    for i, row in enumerate(export_rows(status, post_code), start=1):
+        w.writerow(row)
+        if i % rows_per_chunk == 0:
+            yield buf.getvalue(); buf.seek(0); buf.truncate()
+    yield buf.getvalue()
 
 @reports_bp.route('/export')
 @login_required
+@read_replica
 def export():
     fmt = request.args.get('format','csv')
     include_photo = request.args.get('include_photo','0') == '1'
     status = request.args.get('status')
     post_code = request.args.get('post_code')
 
-    q = Application.query
-    if status: q = q.filter_by(status=status)
-    if post_code: q = q.filter_by(post_code=post_code)
-    apps = q.order_by(Application.id).all()
-
-    rows = []
-    for a in apps:
-        prof = ApplicantProfile.query.filter_by(user_id=a.user_id).first()
-        pay = Payment.query.filter_by(application_id=a.id).first()
-        rows.append({
-            'ApplicationID': a.id,
-            'Name': prof.name if prof else '',
-            'Category': prof.category if prof else '',
-            'PwBD': prof.pwbd if prof else '',
-            'PostCode': a.post_code,
-            'Status': a.status,
-            'SubmittedAt': a.submitted_at,
-            'PhotoFile': prof.photo_path if prof else '',
-            'UTR': pay.utr if pay else '',
-            'Amount': pay.amount if pay else 0,
-            'PaymentVerified': pay.verified if pay else False,
-        })
-
     if fmt == 'csv':
-        df = pd.DataFrame(rows)
-        buf = io.StringIO(); df.to_csv(buf, index=False)
-        return send_file(io.BytesIO(buf.getvalue().encode('utf-8')), as_attachment=True, download_name='applications.csv', mimetype='text/csv')
+        return Response(stream_with_context(iter_csv(status, post_code)), mimetype='text/csv',
+                        headers={'Content-Disposition': 'attachment; filename=applications.csv'})
+
     elif fmt == 'xlsx':
-        wb = Workbook(); ws = wb.active; ws.title = 'Applications'
-        headers = list(rows[0].keys()) if rows else ['ApplicationID']
-        ws.append(headers)
-        # write rows first
-        for r in rows:
-            ws.append([r.get(h,'') for h in headers])
-        if include_photo:
-            # Embed photos in a dedicated column named 'Photo'
-            if 'Photo' not in headers:
-                ws.cell(row=1, column=len(headers)+1, value='Photo')
-                photo_col = len(headers)+1
-            else:
-                photo_col = headers.index('Photo')+1
-            for idx, r in enumerate(rows, start=2):
-                path = r.get('PhotoFile')
-                try:
-                    if path and os.path.exists(path):
-                        # Load & downscale to thumbnail
-                        img = PILImage.open(path)
-                        img.thumbnail((96,96))
-                        tmp = io.BytesIO()
-                        img.save(tmp, format='PNG'); tmp.seek(0)
-                        xlimg = XLImage(tmp)
-                        xlimg.width = 96; xlimg.height = 96
-                        ws.add_image(xlimg, f'{chr(64+photo_col)}{idx}')
-                except Exception:
-                    continue
-        buf = io.BytesIO(); wb.save(buf); buf.seek(0)
-        return send_file(buf, as_attachment=True, download_name='applications.xlsx', mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        tmp = tempfile.NamedTemporaryFile(suffix='.xlsx')  # removed when the response closes it
+        with timed('xlsx'):
+            write_xlsx(export_rows(status, post_code, with_thumbs=include_photo), EXPORT_COLUMNS, tmp,
+                       photo_index=EXPORT_COLUMNS.index('PhotoFile') if include_photo else None,
+                       thumb_index=len(EXPORT_COLUMNS) if include_photo else None,
+                       workers=current_app.config['EXPORT_THUMBNAIL_WORKERS'])
+        tmp.seek(0)
+        return send_file(tmp, as_attachment=True, download_name='applications.xlsx', mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
     else:
         flash('Unsupported format', 'danger')
         return render_template('reports/reports.html')
+
+@reports_bp.route('/pdf-zip')
+@login_required
+@read_replica
+def pdf_zip():
+    q = Application.query
+    status = request.args.get('status'); post_code = request.args.get('post_code')
+    if status: q = q.filter_by(status=status)
+    if post_code: q = q.filter_by(post_code=post_code)
+    gen = iter_pdf_zip(q, current_app.config['PDF_CACHE_FOLDER'], workers=current_app.config['PDF_WORKERS'])
+    return Response(stream_with_context(gen), mimetype='application/zip',
+                    headers={'Content-Disposition': 'attachment; filename=applications_pdf.zip'})
+
+# Background jobs: the reports page queues exports here instead of building them in the request
+
+@reports_bp.route('/jobs', methods=['POST'])
+@login_required
+def submit_job():
+    try:
+        job, created = jobs.submit(request.form.get('kind', 'export'), request.form.to_dict(), requested_by=current_user.email)
+    except jobs.JobError as e:
+        flash(str(e), 'danger'); return redirect(url_for('reports.reports_home'))
+    if not created: flash(f'An identical report is already {job.status}; you will get the same file.', 'info')
+    return redirect(url_for('reports.job_page', job_id=job.id))
+
+def job_state(job):
+    return {'id': job.id, 'kind': job.kind, 'status': job.status, 'progress': job.progress, 'total': job.total,
+            'error': job.error, 'size_bytes': job.size_bytes,
+            'download_url': url_for('reports.job_download', job_id=job.id) if job.status == 'done' else None}
+
+@reports_bp.route('/jobs/<int:job_id>')
+@login_required
+def job_page(job_id):
+    job = ReportJob.query.get_or_404(job_id)
+    return render_template('reports/job.html', job=job, params=json.loads(job.params), in_flight=job.status in jobs.IN_FLIGHT)
+
+@reports_bp.route('/jobs/<int:job_id>/status')
+@login_required
+def job_status(job_id):
+    return jsonify(job_state(ReportJob.query.get_or_404(job_id)))
+
+@reports_bp.route('/jobs/<int:job_id>/download')
+@login_required
+def job_download(job_id):
+    job = ReportJob.query.get_or_404(job_id)
+    if job.status != 'done' or not job.artifact_path or not os.path.exists(job.artifact_path): abort(404)
+    return send_file(job.artifact_path, as_attachment=True, download_name=jobs.download_name(job), mimetype=jobs.MIMETYPES[jobs.extension(job)])
@@ -0,0 +1,53 @@
+import os, shutil, tempfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from ..imaging import thumbnail
+
+def write_xlsx(rows, columns, dest, photo_index=None, thumb_index=None, workers=1, window=None):
+    """Stream rows into a write-only workbook and save it to dest (path or binary file object).
+
+    With photo_index set, the photo path at that position of each row is thumbnailed
+    across a process pool and anchored in a trailing 'Photo' column as soon as each
+    thumbnail finishes. At most `window` thumbnails are in flight, and finished ones
+    are referenced from disk rather than held in memory, so memory stays bounded.
+    Rows may carry a precomputed thumbnail path at thumb_index (beyond the written
+    columns); those are embedded directly and only rows without one hit the pool.
+    """
+    from openpyxl import Workbook
+    from openpyxl.drawing.image import Image as XLImage
+    from openpyxl.utils import get_column_letter
+    width = len(columns)
+    wb = Workbook(write_only=True); ws = wb.create_sheet('Applications')
+    headers = list(columns) + (['Photo'] if photo_index is not None else [])
+    ws.append(headers)
+    if photo_index is None:
+        for r in rows: ws.append(list(r[:width]))
+        wb.save(dest); return
+
+    photo_col = get_column_letter(len(headers))
+    def place(row_idx, thumb_path):
+        if thumb_path: ws.add_image(XLImage(thumb_path), f'{photo_col}{row_idx}')
+
+    tmpdir = tempfile.mkdtemp(prefix='serc-xlsx-')
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    window = window or max(1, workers) * 8
+    in_flight = {}
+    try:
+        for row_idx, r in enumerate(rows, start=2):
+            ws.append(list(r[:width]))
+            if thumb_index is not None and r[thumb_index] and os.path.exists(r[thumb_index]):
+                place(row_idx, r[thumb_index]); continue
+            src = r[photo_index]
+            if not src or not os.path.exists(src): continue
+            thumb_path = os.path.join(tmpdir, f'{row_idx}.jpg')
+            if pool is None:
+                place(row_idx, thumbnail(src, thumb_path)); continue
+            in_flight[pool.submit(thumbnail, src, thumb_path)] = row_idx
+            if len(in_flight) >= window:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for fut in done: place(in_flight.pop(fut), fut.result())
+        for fut in wait(in_flight).done:
+            place(in_flight[fut], fut.result())
+        wb.save(dest)
+    finally:
+        if pool is not None: pool.shutdown(cancel_futures=True)
+        shutil.rmtree(tmpdir, ignore_errors=True)
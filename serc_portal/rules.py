@@ -0,0 +1,186 @@
+"""Eligibility rules: per-post age limits, relaxations and required degrees, kept as data.
+
+The rules file (ELIGIBILITY_RULES, default eligibility.json next to this module) has a
+"defaults" block and a "posts" block; each post's entry is laid over the defaults. A degree
+requirement matches any held discipline containing one of its keywords. The file is
+compiled once per process into a RuleBook. validate_eligibility() checks one submission;
+screen() re-screens a whole cycle at once over pandas frames, with the same rules and the
+same reasons, so a rule change can be previewed against every application in seconds.
+"""
+import json, os, re
+from collections import namedtuple
+from datetime import date, datetime
+from flask import current_app
+
+DEFAULT_RULES = os.path.join(os.path.dirname(__file__), 'eligibility.json')
+YES = ('yes', 'y', 'true', '1')
+
+Degree = namedtuple('Degree', 'level pattern label')
+PostRule = namedtuple('PostRule', 'post_code title min_age max_age category_relaxation pwbd_relaxation exsm_relaxation degrees')
+
+class RuleError(ValueError):
+    pass
+
+def normalize_category(category):
+    # "OBC(NCL)" and "obc" both mean OBC
+    return re.split(r'[\s(]', (category or '').strip().upper(), maxsplit=1)[0]
+
+def _degree(spec):
+    keywords = [k.strip().lower() for k in spec.get('disciplines') or [] if k.strip()]
+    pattern = re.compile('|'.join(map(re.escape, keywords)), re.I) if keywords else None
+    subject = spec.get('label') or ' / '.join(spec.get('disciplines') or [])
+    label = f"{spec['level']}'s degree" + (f' in {subject}' if keywords else '')
+    return Degree(spec['level'], pattern, label)
+
+class RuleBook:
+    """Compiled rules for every post code."""
+    def __init__(self, data):
+        defaults = data.get('defaults', {}); self.posts = {}
+        for code, spec in (data.get('posts') or {}).items():
+            merged = {**defaults, **spec}
+            try:
+                self.posts[code] = PostRule(
+                    code, merged.get('title', code), int(merged.get('min_age', 0)), int(merged['max_age']),
+                    {normalize_category(k): int(v) for k, v in (merged.get('category_relaxation') or {}).items()},
+                    int(merged.get('pwbd_relaxation', 0)), int(merged.get('exsm_relaxation', 0)),
+                    tuple(_degree(d) for d in merged.get('degrees') or []))
+            except (KeyError, TypeError, ValueError, re.error) as e:
+                raise RuleError(f'Invalid eligibility rule for {code}: {e!r}')
+
+    @classmethod
+    def load(cls, path=None):
+        with open(path or DEFAULT_RULES, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def age_limit(self, rule, category, pwbd, exsm):
+        return (rule.max_age + rule.category_relaxation.get(normalize_category(category), 0)
+                + (rule.pwbd_relaxation if (pwbd or '').strip().lower() in YES else 0)
+                + (rule.exsm_relaxation if (exsm or '').strip().lower() in YES else 0))
+
+    def check(self, post_code, category, dob, degrees, closing, pwbd=None, exsm=None):
+        """Reasons the applicant is ineligible; an empty list means eligible."""
+        rule = self.posts.get(post_code)
+        if rule is None: return [f'Unknown post code {post_code!r}']
+        reasons = []
+        if dob is None:
+            reasons.append('Date of birth missing')
+        else:
+            age = completed_years(dob, closing); limit = self.age_limit(rule, category, pwbd, exsm)
+            if age < rule.min_age: reasons.append(f'Below the minimum age of {rule.min_age}')
+            if age > limit: reasons.append(f'Over the age limit of {limit}')
+        for req in rule.degrees:
+            held = [d.get('discipline') or '' for d in degrees if d.get('level') == req.level and (d.get('discipline') or '').strip()]
+            if not any(req.pattern is None or req.pattern.search(disc) for disc in held):
+                reasons.append(f'Requires a {req.label}')
+        return reasons
+
+def completed_years(dob, on):
+    return on.year - dob.year - ((on.month, on.day) < (dob.month, dob.day))
+
+def _date(value):
+    if isinstance(value, datetime): return value.date()
+    if isinstance(value, date): return value
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+def init_rules(app):
+    app.extensions['eligibility'] = RuleBook.load(app.config['ELIGIBILITY_RULES'] or None)
+
+def get_rules():
+    return current_app.extensions['eligibility']
+
+def validate_eligibility(post_code, category, dob_str, degrees, closing_date, pwbd=None, exsm=None):
+    """(ok, message) for one submission against the process's compiled rules."""
+    try:
+        dob = _date(dob_str)
+    except ValueError:
+        return False, 'Invalid Date of Birth'
+    reasons = get_rules().check(post_code, category, dob, degrees, _date(closing_date), pwbd, exsm)
+    return (False, 'Not eligible: ' + '; '.join(reasons)) if reasons else (True, 'Eligible')
+
+# Batch re-screening
+
+def load_frames(conn):
+    """(applications, educations) DataFrames for every application, straight from SQL."""
+    import pandas as pd
+    apps = pd.read_sql_query(
+        'SELECT a.id AS application_id, a.post_code, p.category, p.pwbd, p.exsm, p.dob '
+        'FROM application a LEFT JOIN applicant_profile p ON p.user_id = a.user_id', conn)
+    edus = pd.read_sql_query('SELECT application_id, degree_level, discipline FROM education', conn)
+    return apps, edus
+
+def _factor(values):
+    """(codes, distinct values) with None for missing. Category, post code, level, discipline
+    and date of birth have a few hundred distinct values across a whole cycle, so rules are
+    evaluated once per distinct value and broadcast back through the codes."""
+    import pandas as pd
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=False)
+    return codes, [None if pd.isna(v) else v for v in uniques]
+
+def _per_value(factor, fn, dtype=None):
+    import numpy as np
+    codes, uniques = factor
+    return np.asarray([fn(v) for v in uniques], dtype=dtype)[codes]
+
+def screen(book, apps, edus, closing):
+    """Vectorized check(): a frame of application_id, post_code, eligible, reasons ('; '-joined).
+
+    apps needs application_id, post_code, category, pwbd, exsm and dob; edus needs
+    application_id, degree_level and discipline. Python only ever runs per distinct value
+    and per (post, requirement); everything per row is a NumPy array operation.
+    """
+    import numpy as np, pandas as pd
+    closing = _date(closing)
+    out = apps[['application_id', 'post_code']].reset_index(drop=True)
+    n = len(out); failures = []  # (mask, message) in check()'s order; message is a str or (per-row values, format)
+    post = _factor(out.post_code); post_codes, posts = post
+    rules = [book.posts.get(p) for p in posts]
+    known = _per_value(post, lambda p: p in book.posts, bool)
+    failures.append((~known, (post_codes, lambda i: f'Unknown post code {posts[i]!r}')))
+
+    years = _per_value(_factor(apps.dob), lambda v: completed_years(_date(v), closing) if v else -1, int)
+    no_dob = years < 0
+    category = _factor(_per_value(_factor(apps.category), normalize_category, object))
+    yes = lambda col: _per_value(_factor(apps[col]), lambda v: str(v or '').strip().lower() in YES, bool)
+    pwbd, exsm = yes('pwbd'), yes('exsm')
+    min_age = np.zeros(n, dtype=int); limit = np.zeros(n, dtype=int)
+    for i, rule in enumerate(rules):
+        if rule is None: continue
+        sel = post_codes == i
+        relax = _per_value(category, lambda c: rule.category_relaxation.get(c, 0), int)
+        min_age[sel] = rule.min_age
+        limit[sel] = rule.max_age + relax[sel] + rule.pwbd_relaxation * pwbd[sel] + rule.exsm_relaxation * exsm[sel]
+    failures.append((known & no_dob, 'Date of birth missing'))
+    failures.append((known & ~no_dob & (years < min_age), (min_age, 'Below the minimum age of {}'.format)))
+    failures.append((known & ~no_dob & (years > limit), (limit, 'Over the age limit of {}'.format)))
+
+    row = pd.Index(out.application_id).get_indexer(edus.application_id)
+    keep = row >= 0; row = row[keep]
+    edu_post = post_codes[row]
+    level = _factor(edus.degree_level.to_numpy(dtype=object)[keep])
+    discipline = _factor(edus.discipline.to_numpy(dtype=object)[keep])
+    for i, rule in enumerate(rules):
+        if rule is None: continue
+        at_post = edu_post == i
+        for req in rule.degrees:
+            ok = (at_post & _per_value(level, lambda l: l == req.level, bool)
+                  & _per_value(discipline, lambda d: bool(d and d.strip()) and (req.pattern is None or bool(req.pattern.search(d))), bool))
+            met = np.zeros(n, dtype=bool); met[row[ok]] = True
+            failures.append(((post_codes == i) & ~met, f'Requires a {req.label}'))
+
+    # Each check appends its message to the rows it failed, in check()'s order; a message that
+    # depends on the row is formatted once per distinct value
+    failed = np.zeros(n, dtype=bool); reasons = np.full(n, '', dtype=object)
+    for mask, message in failures:
+        sel = np.flatnonzero(mask)
+        if not len(sel): continue
+        if isinstance(message, tuple):
+            values, fmt = message
+            distinct, inverse = np.unique(values[sel], return_inverse=True)
+            text = np.array([fmt(v) for v in distinct], dtype=object)[inverse.ravel()]
+        else:
+            text = message
+        failed[sel] = True
+        reasons[sel] = np.where(reasons[sel] == '', text, reasons[sel] + '; ' + text)
+    out['eligible'] = ~failed
+    out['reasons'] = reasons
+    return out
@@ -0,0 +1,80 @@
+"""Full-text applicant search: FTS5 on SQLite, a weighted tsvector with a GIN index on PostgreSQL.
+
+One row per application in `application_search`, covering the applicant's name, email and
+every degree's discipline and institute. The table lives outside the ORM metadata (FTS5 is
+a virtual table), so it is created here and by migration 0005, and kept out of autogenerate
+by include_name. submit() reindexes the applicant's applications inside its own transaction,
+so the index never lags a committed submission; `flask search-reindex` rebuilds it all.
+"""
+import re
+from sqlalchemy import text
+
+TABLE = 'application_search'
+WEIGHTS = (10.0, 4.0, 1.0)  # name, email, education (bm25 column weights; A/B/C on PostgreSQL)
+
+def include_name(name, type_, parent_names):
+    # FTS5 keeps shadow tables (application_search_data, ..._idx, ...) next to the virtual table
+    return not (type_ == 'table' and name.startswith(TABLE))
+
+def create_index(conn):
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text(f'CREATE TABLE IF NOT EXISTS {TABLE} (application_id INTEGER PRIMARY KEY, document TSVECTOR NOT NULL)'))
+        conn.execute(text(f'CREATE INDEX IF NOT EXISTS ix_{TABLE}_document ON {TABLE} USING GIN (document)'))
+    else:
+        # prefix indexes keep the type-ahead "rama*" style queries off a full term scan
+        conn.execute(text(f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(name, email, education, prefix='2 3', tokenize='unicode61 remove_diacritics 2')"))
+
+def _documents(conn, where):
+    if conn.dialect.name == 'postgresql':
+        education = ("(SELECT string_agg(concat_ws(' ', e.discipline, e.institute), ' ') FROM education e WHERE e.application_id = a.id)")
+        return (f"SELECT a.id, setweight(to_tsvector('simple', coalesce(p.name, '')), 'A') || "
+                f"setweight(to_tsvector('simple', regexp_replace(u.email, '[@._+-]', ' ', 'g')), 'B') || "
+                f"setweight(to_tsvector('simple', coalesce({education}, '')), 'C') "
+                f'FROM application a JOIN "user" u ON u.id = a.user_id LEFT JOIN applicant_profile p ON p.user_id = a.user_id WHERE {where}')
+    education = ("(SELECT group_concat(coalesce(e.discipline, '') || ' ' || coalesce(e.institute, ''), ' ') FROM education e WHERE e.application_id = a.id)")
+    return (f"SELECT a.id, coalesce(p.name, ''), u.email, coalesce({education}, '') "
+            f'FROM application a JOIN "user" u ON u.id = a.user_id LEFT JOIN applicant_profile p ON p.user_id = a.user_id WHERE {where}')
+
+def reindex(conn, user_id=None):
+    """Rebuild the search rows for one applicant's applications, or for every application; returns rows written."""
+    where, params = ('a.user_id = :uid', {'uid': user_id}) if user_id is not None else ('1 = 1', {})
+    if conn.dialect.name == 'postgresql':
+        key = 'application_id'
+        insert = f'INSERT INTO {TABLE} (application_id, document) '
+    else:
+        key = 'rowid'
+        insert = f'INSERT INTO {TABLE} (rowid, name, email, education) '
+    if user_id is None: conn.execute(text(f'DELETE FROM {TABLE}'))
+    else: conn.execute(text(f'DELETE FROM {TABLE} WHERE {key} IN (SELECT id FROM application WHERE user_id = :uid)'), params)
+    return conn.execute(text(insert + _documents(conn, where)), params).rowcount
+
+def terms(q):
+    return re.findall(r'\w+', (q or '').lower())[:8]
+
+def search(conn, q, limit, offset=0, window=2000):
+    """[(application_id, rank)] for a free-text query: the `window` newest matches best first,
+    then every older match newest first with rank None.
+
+    Every word must match; the last one also matches as a prefix (type-ahead), earlier ones
+    exactly. Ranking is what costs on terms such as "iit" that match most of a cycle, so only
+    the newest matches are ranked; older ones are still returned on later pages.
+    """
+    words = terms(q)
+    if not words: return []
+    prefix = len(words[-1]) > 1
+    params = {'limit': limit, 'offset': offset, 'window': window}
+    if conn.dialect.name == 'postgresql':
+        params['q'] = ' & '.join(words) + (':*' if prefix else '')
+        sql = (f"SELECT application_id, CASE WHEN application_id >= cutoff.id THEN ts_rank('{{0.1, 0.25, 0.4, 1.0}}', document, query) END AS rank "
+               f"FROM {TABLE}, to_tsquery('simple', :q) query, "
+               f"(SELECT coalesce(min(application_id), 0) AS id FROM (SELECT application_id FROM {TABLE} "
+               f"WHERE document @@ to_tsquery('simple', :q) ORDER BY application_id DESC LIMIT :window) newest) cutoff "
+               f'WHERE document @@ query ORDER BY rank DESC NULLS LAST, application_id DESC LIMIT :limit OFFSET :offset')
+    else:
+        params['q'] = ' '.join(f'"{w}"' for w in words) + ('*' if prefix else '')
+        # NULL ranks sort last under DESC on SQLite
+        sql = (f"SELECT rowid, CASE WHEN rowid >= (SELECT coalesce(min(rowid), 0) FROM "
+               f'(SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH :q ORDER BY rowid DESC LIMIT :window)) '
+               f"THEN -bm25({TABLE}, {', '.join(map(str, WEIGHTS))}) END AS rank FROM {TABLE} "
+               f'WHERE {TABLE} MATCH :q ORDER BY rank DESC, rowid DESC LIMIT :limit OFFSET :offset')
+    return [(app_id, rank) for app_id, rank in conn.execute(text(sql), params)]
@@ -0,0 +1,42 @@
+(function () {
+  var root = document.getElementById('analytics');
+  if (!root) return;
+  var etag = null;
+
+  function rows(table, pairs) {
+    table.innerHTML = '';
+    pairs.forEach(function (p) {
+      var tr = table.insertRow();
+      p.forEach(function (v) { tr.insertCell().textContent = v; });
+    });
+  }
+
+  function render(data) {
+    root.querySelectorAll('[data-series]').forEach(function (t) {
+      var s = data[t.getAttribute('data-series')] || {};
+      rows(t, Object.keys(s).sort().map(function (k) { return [k, s[k]]; }));
+    });
+    var daily = data.daily_by_post || {}, posts = Object.keys(daily).sort(), days = {};
+    posts.forEach(function (p) { Object.keys(daily[p]).forEach(function (d) { days[d] = true; }); });
+    var table = document.getElementById('daily');
+    rows(table, Object.keys(days).sort().reverse().map(function (d) {
+      return [d].concat(posts.map(function (p) { return daily[p][d] || 0; }));
+    }));
+    var head = table.createTHead().insertRow();
+    ['Day'].concat(posts).forEach(function (h) { head.appendChild(document.createElement('th')).textContent = h; });
+  }
+
+  function poll() {
+    var headers = etag ? { 'If-None-Match': etag } : {};
+    fetch(root.getAttribute('data-src'), { headers: headers, credentials: 'same-origin' })
+      .then(function (r) {
+        if (r.status === 304) return null;
+        etag = r.headers.get('ETag');
+        return r.json();
+      })
+      .then(function (data) { if (data) render(data); })
+      .catch(function () {})
+      .then(function () { setTimeout(poll, 30000); });
+  }
+  poll();
+})();
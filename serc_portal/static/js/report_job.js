@@ -0,0 +1,25 @@
+(function () {
+  var root = document.getElementById('report-job');
+  if (!root || root.getAttribute('data-in-flight') !== '1') return;
+
+  function render(job) {
+    root.querySelector('[data-field=status]').textContent = job.status;
+    root.querySelector('[data-field=progress]').textContent =
+      job.total ? Math.min(job.progress, job.total) + ' / ' + job.total : String(job.progress);
+    var bar = root.querySelector('progress');
+    if (bar && job.total) { bar.max = job.total; bar.value = Math.min(job.progress, job.total); }
+  }
+
+  function poll() {
+    fetch(root.getAttribute('data-src'), { credentials: 'same-origin' })
+      .then(function (r) { return r.json(); })
+      .then(function (job) {
+        render(job);
+        // Finished or failed: reload once so the page shows the download link or the error
+        if (job.status !== 'queued' && job.status !== 'running') { window.location.reload(); return; }
+        setTimeout(poll, 2000);
+      })
+      .catch(function () { setTimeout(poll, 5000); });
+  }
+  setTimeout(poll, 1000);
+})();
@@ -0,0 +1,162 @@
+import hashlib, os, shutil, tempfile
+from flask import current_app, request, send_file, abort
+from .extensions import db
+from .models import StoredBlob, is_blob_key
+
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+def blob_key(sha256, ext):
+    return f'{sha256}.{ext.lower()}'
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''): digest.update(chunk)
+    return digest.hexdigest()
+
+def shard(key):
+    return f'{key[:2]}/{key[2:4]}/{key}'
+
+class LocalStorage:
+    """Content-addressed blobs on local disk at <root>/<aa>/<bb>/<sha256>.<ext>.
+
+    Identical uploads share one file, and two levels of 256-way sharding keep every
+    directory small however many blobs there are.
+    """
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, key):
+        return os.path.join(self.root, *shard(key).split('/'))
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def put(self, key, src, move=False):
+        """Store the file at src under key; a blob that already exists is left alone."""
+        dest = self.path(key)
+        if os.path.exists(dest):
+            if move: os.remove(src)
+            return
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        if move:
+            os.replace(src, dest)
+        else:
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest), suffix='.part')
+            with os.fdopen(fd, 'wb') as out, open(src, 'rb') as f: shutil.copyfileobj(f, out, CHUNK_SIZE)
+            os.replace(tmp, dest)
+
+    def open(self, key):
+        return open(self.path(key), 'rb')
+
+    def local_path(self, key):
+        return self.path(key)
+
+    def delete(self, key):
+        try: os.remove(self.path(key))
+        except FileNotFoundError: pass
+
+class S3Storage:
+    """Blobs in an S3-compatible bucket at <prefix><aa>/<bb>/<sha256>.<ext>.
+
+    client is a boto3 S3 client, or anything with its head_object / upload_file /
+    download_file / get_object / delete_object methods, such as a local stand-in.
+    local_path() keeps a read-through copy under cache_dir for code that needs a real
+    file, such as the PDF and XLSX renderers.
+    """
+    def __init__(self, bucket, client, prefix='', cache_dir=None):
+        self.bucket = bucket; self.client = client; self.prefix = prefix
+        self.cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), 'serc-blob-cache')
+
+    def name(self, key):
+        return self.prefix + shard(key)
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.name(key)); return True
+        except Exception as e:
+            if getattr(e, 'response', {}).get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'): return False
+            raise
+
+    def put(self, key, src, move=False):
+        if not self.exists(key):
+            self.client.upload_file(src, self.bucket, self.name(key))
+        if move: os.remove(src)
+
+    def open(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=self.name(key))['Body']
+
+    def local_path(self, key):
+        path = os.path.join(self.cache_dir, *shard(key).split('/'))
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part'); os.close(fd)
+            self.client.download_file(self.bucket, self.name(key), tmp)
+            os.replace(tmp, path)
+        return path
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self.name(key))
+        try: os.remove(os.path.join(self.cache_dir, *shard(key).split('/')))
+        except FileNotFoundError: pass
+
+def storage_from_config(cfg, client=None):
+    if cfg['STORAGE_BACKEND'] == 's3':
+        if client is None:
+            import boto3  # only needed for the s3 backend
+            client = boto3.client('s3', endpoint_url=cfg['S3_ENDPOINT_URL'] or None)
+        return S3Storage(cfg['S3_BUCKET'], client, cfg['S3_PREFIX'], cfg['STORAGE_CACHE_FOLDER'] or None)
+    return LocalStorage(cfg['STORAGE_ROOT'] or os.path.join(cfg['UPLOAD_FOLDER'], 'blobs'))
+
+def get_storage():
+    return current_app.extensions['storage']
+
+def local_path(ref):
+    """A readable filesystem path for a stored reference: a blob key, or a legacy plain path."""
+    if not ref: return None
+    return get_storage().local_path(ref) if is_blob_key(ref) else ref
+
+def send_blob(ref, download_name, mimetype=None, etag=None):
+    """Serve a stored upload inline to an already-authorised user.
+
+    Files go out through send_file (wsgi.file_wrapper, conditional and Range requests),
+    with the usual USE_X_SENDFILE support, or as an nginx X-Accel-Redirect into the blob
+    directory when X_ACCEL_REDIRECT_PREFIX is set and storage is local. A blob never
+    changes under its key, so it carries a strong ETag of its content hash and may be
+    cached privately for a year.
+    """
+    if is_blob_key(ref): etag = etag or ref.split('.')[0]
+    prefix = current_app.config['X_ACCEL_REDIRECT_PREFIX']
+    if prefix and is_blob_key(ref) and isinstance(get_storage(), LocalStorage):
+        rv = current_app.response_class(mimetype=mimetype)
+        rv.headers['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + shard(ref)
+        rv.headers['Content-Disposition'] = f'inline; filename="{download_name}"'
+    else:
+        path = local_path(ref)
+        if not path or not os.path.exists(path): abort(404)
+        rv = send_file(os.path.abspath(path), mimetype=mimetype, download_name=download_name, etag=etag or True)
+    if etag:
+        rv.set_etag(etag)
+        rv.cache_control.no_cache = None; rv.cache_control.public = False
+        rv.cache_control.private = True; rv.cache_control.max_age = IMMUTABLE_MAX_AGE; rv.cache_control.immutable = True
+        rv.expires = None
+    return rv.make_conditional(request) if 'X-Accel-Redirect' in rv.headers else rv
+
+def collect_garbage(batch=500):
+    """Delete blobs no row references any more; returns how many were removed.
+
+    Meant for a quiet period: an identical file re-uploaded while its blob is being swept
+    can find the blob gone after it was deduplicated against it.
+    """
+    storage = get_storage(); removed = 0
+    while True:
+        keys = [k for (k,) in db.session.query(StoredBlob.key).filter(StoredBlob.refs <= 0).limit(batch)]
+        if not keys: return removed
+        # Conditional delete: a key re-referenced since the SELECT keeps its row and its blob
+        gone = []
+        for k in keys:
+            if StoredBlob.query.filter(StoredBlob.key == k, StoredBlob.refs <= 0).delete(synchronize_session=False): gone.append(k)
+        db.session.commit()
+        for k in gone: storage.delete(k)
+        removed += len(gone)
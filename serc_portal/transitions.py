@@ -0,0 +1,60 @@
+from datetime import datetime
+from sqlalchemy import select, insert, update, literal, cast, String
+from .extensions import db
+from .models import Application, User, EmailOutbox, StatusChange, adjust_status_counts
+
+STATUSES = ('Submitted', 'Under Review', 'Shortlisted', 'Rejected')
+NOTIFY_SUBJECT = 'CSIR-SERC — Application Status Updated'
+
+def notification_body(app_id, status):
+    return f'Your application #{app_id} status is now: {status}.'
+
+def targets(app_ids=None, filter_status=None, filter_post_code=None):
+    """WHERE clauses selecting the applications a bulk transition applies to."""
+    where = []
+    if app_ids is not None: where.append(Application.id.in_(app_ids))
+    if filter_status: where.append(Application.status == filter_status)
+    if filter_post_code: where.append(Application.post_code == filter_post_code)
+    return where
+
+def bulk_transition(new_status, app_ids=None, filter_status=None, filter_post_code=None,
+                    shortlist_tag=None, reviewer_notes=None, changed_by=None, notify=True):
+    """Move every matching application to new_status in one transaction; returns how many matched.
+
+    One UPDATE does the transition; the audit rows and the notifications are INSERT ... SELECTs
+    over the same rows. The flush hooks never see set-based writes, so content_version and the
+    StatusCounter are maintained here. Mail goes through the outbox, whose worker delivers the
+    whole batch over its kept-alive SMTP sessions. A blank tag or note leaves the existing one.
+    """
+    if new_status not in STATUSES: raise ValueError(f'Unknown status: {new_status}')
+    shortlist_tag = shortlist_tag or None; reviewer_notes = reviewer_notes or None
+    where = targets(app_ids, filter_status, filter_post_code)
+    if not where: raise ValueError('A bulk transition needs application ids or a filter')
+    conn = db.session.connection(); now = datetime.utcnow()
+    # Lock the rows (PostgreSQL) so the counter deltas match what the UPDATE changes
+    rows = db.session.execute(select(Application.id, Application.post_code, Application.status)
+                              .where(*where).with_for_update()).all()
+    if not rows: return 0
+    deltas = {}
+    for _, post_code, status in rows:
+        if status == new_status: continue
+        deltas[(post_code, status)] = deltas.get((post_code, status), 0) - 1
+        deltas[(post_code, new_status)] = deltas.get((post_code, new_status), 0) + 1
+    conn.execute(insert(StatusChange).from_select(
+        ['application_id', 'from_status', 'to_status', 'shortlist_tag', 'reviewer_notes', 'changed_by', 'changed_at', 'bulk'],
+        select(Application.id, Application.status, literal(new_status), literal(shortlist_tag, String), literal(reviewer_notes, String),
+               literal(changed_by, String), literal(now), literal(True)).where(*where)))
+    if notify:
+        body = literal('Your application #') + cast(Application.id, String) + literal(f' status is now: {new_status}.')
+        conn.execute(insert(EmailOutbox).from_select(
+            ['application_id', 'to_email', 'subject', 'body', 'status', 'attempts', 'next_attempt_at', 'created_at'],
+            select(Application.id, User.email, literal(NOTIFY_SUBJECT), body, literal('pending'), literal(0), literal(now), literal(now))
+            .join(User, User.id == Application.user_id)
+            .where(*where, Application.status != new_status, User.email.isnot(None), User.email != '')))
+    values = {'status': new_status, 'content_version': Application.content_version + 1}
+    if shortlist_tag: values['shortlist_tag'] = shortlist_tag
+    if reviewer_notes: values['reviewer_notes'] = reviewer_notes
+    conn.execute(update(Application).where(*where).values(values))
+    adjust_status_counts(conn, deltas)
+    db.session.commit()
+    return len(rows)
@@ -0,0 +1,91 @@
+import hashlib, os, shutil, tempfile
+from .storage import blob_key, file_sha256
+
+CHUNK_SIZE = 64 * 1024
+MAGIC = {
+    'pdf': (b'%PDF-',),
+    'png': (b'\x89PNG\r\n\x1a\n',),
+    'jpg': (b'\xff\xd8\xff',),
+    'jpeg': (b'\xff\xd8\xff',),
+}
+
+class UploadError(ValueError):
+    pass
+
+class StagedFile:
+    def __init__(self, tmp_path, key, sha256, size):
+        self.tmp_path = tmp_path; self.key = key; self.sha256 = sha256; self.size = size
+
+class UploadBatch:
+    """Uploads for one unit of work, staged under <upload_dir>/.staging until the caller commits.
+
+    Each file is read once in CHUNK_SIZE pieces: the magic bytes are checked on the first
+    chunk, the size limit as the bytes arrive (so an oversized file is abandoned at the
+    limit, not after it has been written out) and the SHA-256 on the same pass. The blob
+    key is known up front so rows can reference it; promote() hands the files to storage
+    before the transaction commits, and anything not promoted is removed when the batch closes.
+    """
+    def __init__(self, storage, upload_dir):
+        self.storage = storage
+        staging_root = os.path.join(upload_dir, '.staging'); os.makedirs(staging_root, exist_ok=True)
+        self.staging = tempfile.mkdtemp(dir=staging_root)  # beside local blobs, so promote() is a rename
+        self.files = []
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.discard()
+
+    def stage(self, upload, allowed, max_bytes):
+        """Stream a werkzeug FileStorage into staging; returns a StagedFile or raises UploadError."""
+        ext = upload.filename.rsplit('.', 1)[-1].lower() if '.' in upload.filename else ''
+        if ext not in allowed: raise UploadError('Invalid file type')
+        tmp_path = os.path.join(self.staging, f'{len(self.files)}.part')
+        digest = hashlib.sha256(); size = 0
+        try:
+            with open(tmp_path, 'wb') as out:
+                while True:
+                    chunk = upload.stream.read(CHUNK_SIZE)
+                    if not chunk: break
+                    if size == 0 and ext in MAGIC and not chunk.startswith(MAGIC[ext]):
+                        raise UploadError('File content does not match its type')
+                    size += len(chunk)
+                    if max_bytes and size > max_bytes: raise UploadError('File exceeds allowed size')
+                    digest.update(chunk); out.write(chunk)
+            if not size: raise UploadError('Empty file')
+        except UploadError:
+            os.remove(tmp_path); raise
+        return self._add(tmp_path, digest.hexdigest(), ext, size)
+
+    def _add(self, tmp_path, sha, ext, size):
+        key = blob_key(sha, ext)
+        for f in self.files:
+            if f.key == key:  # same bytes twice in one submission
+                os.remove(tmp_path); return f
+        staged_path = os.path.join(self.staging, key)
+        os.replace(tmp_path, staged_path)
+        f = StagedFile(staged_path, key, sha, size)
+        self.files.append(f)
+        return f
+
+    def staged_path(self, key):
+        """Where the staged blob `key` currently lives, for work done on it before commit."""
+        return os.path.join(self.staging, key) if key else key
+
+    def scratch_dir(self, name):
+        """A fresh directory inside staging for files derived from one field, so two fields never collide."""
+        return tempfile.mkdtemp(prefix=f'{name}-', dir=self.staging)
+
+    def adopt(self, tmp_path, ext='jpg'):
+        """Take a file produced inside staging (e.g. a derived image) into the batch; returns its key.
+
+        Adopting bytes the batch already holds returns the existing key and drops tmp_path.
+        """
+        if not tmp_path: return None
+        return self._add(tmp_path, file_sha256(tmp_path), ext, os.path.getsize(tmp_path)).key
+
+    def promote(self):
+        for f in self.files: self.storage.put(f.key, f.tmp_path, move=True)
+        self.files = []
+        self.discard()
+
+    def discard(self):
+        shutil.rmtree(self.staging, ignore_errors=True)
@@ -0,0 +1,70 @@
+import threading, time, weakref
+from collections import OrderedDict
+from flask_login import UserMixin
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+class SessionUser(UserMixin):
+    """Read-only id/email/role snapshot of a User, standing in for it as current_user."""
+    __slots__ = ('id', 'email', 'role')
+    def __init__(self, id, email, role):
+        object.__setattr__(self, 'id', id); object.__setattr__(self, 'email', email); object.__setattr__(self, 'role', role)
+    def __setattr__(self, name, value):
+        raise AttributeError('SessionUser is read-only')
+    def __repr__(self):
+        return f'<SessionUser {self.id} {self.role}>'
+
+_caches = weakref.WeakSet()
+
+class UserCache:
+    """Per-process LRU of SessionUser snapshots, each trusted for at most ttl seconds.
+
+    Committed changes to a user's email, role or password evict it from every cache in
+    this process; other processes pick the change up when their entry expires. ttl=0
+    turns the cache off.
+    """
+    def __init__(self, ttl, maxsize=10000):
+        self.ttl = ttl; self.maxsize = maxsize
+        self._lock = threading.Lock(); self._entries = OrderedDict()
+        _caches.add(self)
+
+    def get(self, user_id, load):
+        if self.ttl <= 0: return load(user_id)
+        now = time.monotonic()
+        with self._lock:
+            hit = self._entries.get(user_id)
+            if hit and hit[0] > now:
+                self._entries.move_to_end(user_id); return hit[1]
+        user = load(user_id)
+        if user is not None:
+            with self._lock:
+                self._entries[user_id] = (now + self.ttl, user); self._entries.move_to_end(user_id)
+                while len(self._entries) > self.maxsize: self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id):
+        with self._lock: self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock: self._entries.clear()
+
+# Session-snapshot fields; a change to any of them must not be served from the cache
+WATCHED = ('email', 'role', 'password_hash')
+
+@event.listens_for(Session, 'after_flush')
+def _note_user_changes(session, flush_context):
+    from .models import User
+    ids = session.info.setdefault('changed_user_ids', set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            attrs = inspect(obj).attrs
+            if obj in session.deleted or any(attrs[f].history.has_changes() for f in WATCHED): ids.add(obj.id)
+
+@event.listens_for(Session, 'after_commit')
+def _evict_changed_users(session):
+    for user_id in session.info.pop('changed_user_ids', ()):
+        for cache in list(_caches): cache.invalidate(user_id)
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_user_changes(session):
+    session.info.pop('changed_user_ids', None)
@@ -0,0 +1,72 @@
+import io, os, smtplib, sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serc_portal import create_app
+from serc_portal.extensions import db
+from serc_portal.models import User, Application, ApplicantProfile
+
+ADMIN = ('admin@serc.res.in', 'Admin@123')
+
+def make_app(tmp_path, **config):
+    """An app on its own SQLite file under tmp_path, schema built and admin seeded by `flask init-db`."""
+    settings = {'TESTING': True, 'WTF_CSRF_ENABLED': False, 'SESSION_COOKIE_SECURE': False, 'REMEMBER_COOKIE_SECURE': False,
+                'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'primary.db'), 'SQLALCHEMY_BINDS': {},
+                'UPLOAD_FOLDER': str(tmp_path / 'uploads'), 'PDF_CACHE_FOLDER': str(tmp_path / 'pdf_cache'),
+                'REPORT_JOB_FOLDER': str(tmp_path / 'report_jobs'), 'STORAGE_BACKEND': 'local', 'STORAGE_ROOT': ''}
+    settings.update(config)
+    app = create_app(settings)
+    result = app.test_cli_runner().invoke(args=['init-db'])
+    assert result.exit_code == 0, result.output
+    return app
+
+@pytest.fixture
+def app(tmp_path):
+    return make_app(tmp_path)
+
+def add_applications(n, post_code='SCT-1', email_prefix='u'):
+    """n applicants with a profile and one application each, straight through the ORM; returns the applications."""
+    apps = []
+    for i in range(n):
+        user = User(email=f'{email_prefix}{User.query.count()}@example.in', mobile='9000000000', role='applicant')
+        user.set_password('pw'); db.session.add(user); db.session.flush()
+        db.session.add(ApplicantProfile(user_id=user.id, name=f'Applicant {user.id}', category='GEN'))
+        application = Application(user_id=user.id, post_code=post_code)
+        db.session.add(application); apps.append(application)
+    db.session.commit()
+    return apps
+
+def login(client, email=ADMIN[0], password=ADMIN[1]):
+    return client.post('/auth/login', data={'email': email, 'password': password})
+
+def submit_form():
+    """A complete, eligible /submit form for SCT-1 with a fresh photo and signature."""
+    from PIL import Image
+    def image(size):
+        buf = io.BytesIO(); Image.new('RGB', size, 'red').save(buf, format='PNG'); buf.seek(0)
+        return buf, 'image.png'
+    return {'name': 'Asha Kumar', 'father': 'F', 'mother': 'M', 'dob': '1990-01-02', 'gender': 'F', 'nationality': 'Indian',
+            'category': 'OBC', 'pwbd': 'No', 'exsm': 'No', 'addr1': 'a', 'addr2': 'b', 'city': 'Chennai', 'state': 'TN', 'pin': '600113',
+            'postcode': 'SCT-1', 'bdisc': 'Civil', 'buni': 'IIT', 'byear': '2011', 'bmarks': '80', 'mdisc': 'Structures', 'muni': 'IISc',
+            'myear': '2013', 'mmarks': '85', 'fee_applicable': 'Yes', 'utr': 'UTR000001', 'utr_date': '2025-12-01',
+            'photo': image((300, 400)), 'sign': image((200, 80))}
+
+class FakeSMTP:
+    """Stands in for smtplib.SMTP: records each recipient and message, and refuses those in `refuse`."""
+    sent = []; messages = []; refuse = set()
+    def __init__(self, host, port): pass
+    def starttls(self): pass
+    def login(self, user, password): pass
+    def sendmail(self, sender, to, message):
+        if to[0] in FakeSMTP.refuse: raise smtplib.SMTPRecipientsRefused({to[0]: (550, b'No such user')})
+        FakeSMTP.sent.append(to[0]); FakeSMTP.messages.append(message)
+    def quit(self): pass
+    def __enter__(self): return self
+    def __exit__(self, *exc): pass
+
+@pytest.fixture
+def smtp(monkeypatch):
+    FakeSMTP.sent = []; FakeSMTP.messages = []; FakeSMTP.refuse = set()
+    monkeypatch.setattr(smtplib, 'SMTP', FakeSMTP)
+    return FakeSMTP
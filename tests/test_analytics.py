@@ -0,0 +1,26 @@
+from datetime import datetime
+from conftest import add_applications, login
+from serc_portal.extensions import db
+from serc_portal.models import ApplicantProfile, SubmissionRollup
+from serc_portal.analytics.rollups import summary, rebuild
+
+def rollups():
+    return {(r.day, r.post_code, r.category): r.count for r in SubmissionRollup.query if r.count}
+
+def test_rollups_follow_deletes_moves_and_category_changes(app):
+    with app.app_context():
+        apps = add_applications(4) + add_applications(1, post_code='SCT-2')
+        profile = ApplicantProfile.query.filter_by(user_id=apps[3].user_id).one(); db.session.commit()
+        # every instance below was expired by the last commit, so the hook needs their loaded history
+        db.session.delete(apps[0]); apps[1].post_code = 'SCT-2'; apps[2].submitted_at = datetime(2025, 1, 15, 10)
+        db.session.commit()
+        profile.category = 'OBC'; db.session.commit()
+        db.session.delete(apps[4]); db.session.commit()
+        live = rollups(); data = summary()
+        assert data['by_post'] == {'SCT-1': 2, 'SCT-2': 1}
+        assert data['by_category'] == {'GEN': 2, 'OBC': 1}
+        assert '2025-01-15' in data['daily_by_post']['SCT-1']
+        assert rebuild() == 3 and rollups() == live
+    client = app.test_client(); login(client)
+    data = client.get('/admin/analytics/data').get_json()
+    assert sum(data['by_post'].values()) == sum(data['by_status'].values()) == 3
@@ -0,0 +1,62 @@
+import email
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import update
+from conftest import make_app, add_applications
+from serc_portal.extensions import db
+from serc_portal.models import BulkEmailLog, BulkEmailRecipient as R
+from serc_portal.campaigns import CampaignRunner, create_campaign, requeue
+
+@pytest.fixture
+def mail_app(tmp_path):
+    app = make_app(tmp_path, SMTP_HOST='smtp.test', BULK_EMAIL_LEASE_SECONDS=300)
+    with app.app_context():
+        add_applications(4); add_applications(1, post_code='SCT-2')
+    return app
+
+def runner(app):
+    return CampaignRunner(app, sessions=2, rate=0, batch_size=2)
+
+def statuses(log_id):
+    return dict(db.session.query(R.to_email, R.status).filter(R.log_id == log_id))
+
+def test_campaign_sends_each_recipient_once_with_their_own_values(mail_app, smtp):
+    with mail_app.app_context():
+        log = create_campaign('Interview', 'Dear {name}, #{app_id} for {post_code} at {venue}', filter_post_code='SCT-1', venue='Hall A')
+        assert log.total == 4
+        assert runner(mail_app).run_pending(once=True) == 1
+        log = db.session.get(BulkEmailLog, log.id)
+        assert (log.status, log.count_sent, log.count_failed) == ('done', 4, 0) and log.finished_at
+        assert sorted(smtp.sent) == sorted(statuses(log.id)) and set(statuses(log.id).values()) == {'sent'}
+        bodies = [email.message_from_string(m).get_payload(decode=True).decode() for m in smtp.messages]
+        assert 'Dear Applicant 2, #1 for SCT-1 at Hall A' in bodies
+
+def test_a_dead_runners_campaign_is_taken_over_without_resending(mail_app, smtp):
+    with mail_app.app_context():
+        log_id = create_campaign('Interview', 'Dear {name}').id
+        dead = runner(mail_app)
+        assert dead.claim().id == log_id
+        first = dead.claim_batch(log_id)  # sent the first, then died with the second in flight
+        db.session.execute(update(R).where(R.id == first[0].id).values(status='sent')); db.session.commit()
+        dead.pool.close()
+        assert runner(mail_app).run_pending(once=True) == 0  # still leased
+        assert requeue(db.session.get(BulkEmailLog, log_id), 300) is False
+        db.session.execute(update(BulkEmailLog).where(BulkEmailLog.id == log_id).values(heartbeat_at=datetime.utcnow() - timedelta(hours=1)))
+        db.session.commit()
+        assert runner(mail_app).run_pending(once=True) == 1
+        assert first[0].to_email not in smtp.sent and first[1].to_email in smtp.sent
+        assert len(smtp.sent) == len(set(smtp.sent)) == 4
+        assert db.session.get(BulkEmailLog, log_id).status == 'done'
+
+def test_requeue_retries_only_the_failed_recipients(mail_app, smtp):
+    with mail_app.app_context():
+        log_id = create_campaign('Interview', 'Dear {name}').id
+        smtp.refuse = {'u2@example.in'}
+        runner(mail_app).run_pending(once=True)
+        log = db.session.get(BulkEmailLog, log_id)
+        assert (log.status, log.count_sent, log.count_failed) == ('done', 4, 1)
+        assert requeue(log, 300) is True
+        smtp.refuse = set(); smtp.sent.clear()
+        runner(mail_app).run_pending(once=True)
+        log = db.session.get(BulkEmailLog, log_id)
+        assert smtp.sent == ['u2@example.in'] and (log.status, log.count_sent, log.count_failed) == ('done', 5, 0)
@@ -0,0 +1,51 @@
+import re
+from datetime import datetime
+from html import unescape
+from sqlalchemy import func
+from conftest import make_app, add_applications, login
+from serc_portal.extensions import db
+from serc_portal.models import Application, StatusCounter
+
+def counters():
+    return {(r.post_code, r.status): r.count for r in StatusCounter.query if r.count}
+
+def grouped():
+    return {(pc, st): n for pc, st, n in db.session.query(Application.post_code, Application.status, func.count())
+            .group_by(Application.post_code, Application.status)}
+
+def test_status_counters_follow_single_and_bulk_transitions(app):
+    with app.app_context():
+        ids = [a.id for a in add_applications(3) + add_applications(2, post_code='SCT-2')]
+        assert counters() == grouped() == {('SCT-1', 'Submitted'): 3, ('SCT-2', 'Submitted'): 2}
+    client = app.test_client(); login(client)
+    client.post(f'/admin/application/{ids[0]}/status', data={'status': 'Shortlisted'})
+    client.post('/admin/bulk-status', data={'status': 'Rejected', 'app_ids': f'{ids[0]}, {ids[1]}'})
+    client.post('/admin/bulk-status', data={'status': 'Under Review', 'scope': 'filter', 'filter_post_code': 'SCT-2'})
+    client.post('/admin/bulk-status', data={'status': 'Under Review', 'scope': 'filter', 'filter_post_code': 'SCT-2'})  # no-op
+    with app.app_context():
+        assert counters() == grouped() == {('SCT-1', 'Rejected'): 2, ('SCT-1', 'Submitted'): 1, ('SCT-2', 'Under Review'): 2}
+    page = client.get('/admin/').get_data(as_text=True)
+    assert all(f'{s}: {n}<' in page for s, n in (('Submitted', 1), ('Under Review', 2), ('Shortlisted', 0), ('Rejected', 2)))
+
+def page_ids(html):
+    return [int(i) for i in re.findall(r'name="app_id" value="(\d+)"', html)]
+
+def test_dashboard_pages_walk_every_application_once(tmp_path):
+    app = make_app(tmp_path, DASHBOARD_PAGE_SIZE=2)
+    with app.app_context():
+        apps = add_applications(5)
+        same = datetime(2025, 11, 1, 9, 30)  # a tie on submitted_at is broken by id
+        for a in apps[1:4]: a.submitted_at = same
+        apps[4].submitted_at = datetime(2025, 11, 2)
+        apps[0].submitted_at = datetime(2025, 10, 1)
+        db.session.commit()
+        ids = [a.id for a in apps]
+    client = app.test_client(); login(client)
+    url, pages = '/admin/', []
+    while url:
+        html = client.get(url).get_data(as_text=True)
+        pages.append(page_ids(html))
+        more = re.search(r'href="([^"]*before=[^"]*)"', html)
+        url = unescape(more.group(1)) if more else None
+    assert pages == [[ids[4], ids[3]], [ids[2], ids[1]], [ids[0]]]
+    assert page_ids(client.get('/admin/?before=garbage').get_data(as_text=True)) == [ids[4], ids[3]]
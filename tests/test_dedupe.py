@@ -0,0 +1,86 @@
+import csv, io
+import pytest
+from sqlalchemy.exc import IntegrityError
+from conftest import add_applications, login, submit_form
+from serc_portal import dedupe
+from serc_portal.extensions import db
+from serc_portal.models import Application, ApplicantProfile, User, DuplicateRun, DuplicateMember, SubmissionKey
+
+@pytest.fixture
+def scanned(app):
+    """Two clusters sharing a mobile (3 and 2 applications) and one loner, scanned by `flask find-duplicates`."""
+    with app.app_context():
+        apps = add_applications(6)
+        for a, mobile in zip(apps, ['9111111111'] * 3 + ['9222222222'] * 2 + ['9333333333']):
+            db.session.get(User, a.user_id).mobile = mobile
+        db.session.commit()
+        ids = [a.id for a in apps]
+    result = app.test_cli_runner().invoke(args=['find-duplicates'])
+    assert result.exit_code == 0 and '2 cluster(s) covering 5 application(s)' in result.output, result.output
+    return ids
+
+def test_scan_is_stored_and_replaces_the_previous_one(app, scanned):
+    with app.app_context():
+        run = dedupe.latest_run()
+        assert (run.clusters, run.applications) == (2, 5)
+        assert [m.cluster for m in DuplicateMember.query.order_by(DuplicateMember.application_id)] == [1, 1, 1, 2, 2]
+    app.test_cli_runner().invoke(args=['find-duplicates'])
+    with app.app_context():
+        assert DuplicateRun.query.count() == 1 and DuplicateMember.query.count() == 5
+
+def test_pages_and_download_read_the_stored_scan(app, scanned, monkeypatch):
+    monkeypatch.setattr(dedupe, 'detect', lambda *a, **k: pytest.fail('the page must not re-run detect()'))
+    app.config['DASHBOARD_PAGE_SIZE'] = 1
+    with app.app_context():  # details are read live, so an edit after the scan shows up
+        db.session.query(ApplicantProfile).filter_by(user_id=db.session.get(Application, scanned[0]).user_id).update({'name': 'Renamed'})
+        db.session.commit()
+    client = app.test_client(); login(client)
+    first = client.get('/admin/duplicates').get_data(as_text=True)
+    assert 'Cluster 1 — 3 application(s)' in first and 'Cluster 2' not in first and 'Renamed' in first and 'More' in first
+    second = client.get('/admin/duplicates?page=2').get_data(as_text=True)
+    assert 'Cluster 2 — 2 application(s)' in second and 'Cluster 1 ' not in second
+    rows = list(csv.reader(io.StringIO(client.get('/admin/duplicates?download=1').get_data(as_text=True))))
+    assert rows[0] == dedupe.CLUSTER_COLUMNS
+    assert [(int(r[0]), int(r[1])) for r in rows[1:]] == [(1, i) for i in scanned[:3]] + [(2, i) for i in scanned[3:5]]
+    assert rows[1][4] == 'Renamed' and rows[1][-1] == 'mobile'
+
+def test_page_before_any_scan_offers_one(app):
+    client = app.test_client(); login(client)
+    page = client.get('/admin/duplicates').get_data(as_text=True)
+    assert 'No scan has been run yet' in page and 'value="duplicates"' in page
+    assert client.get('/admin/duplicates?download=1').status_code == 404
+
+def test_duplicates_report_job_stores_the_scan(app, scanned):
+    from serc_portal import jobs
+    with app.app_context():
+        DuplicateMember.query.delete(); DuplicateRun.query.delete(); db.session.commit()
+        job, _ = jobs.submit('duplicates', {})
+        job_id = job.id; assert jobs.claim(60) == job_id
+    assert jobs.run_job(app, job_id) == 'done'
+    with app.app_context():
+        assert dedupe.latest_run().clusters == 2
+        assert jobs.download_name(db.session.get(jobs.ReportJob, job_id)) == 'duplicates.csv'
+
+def test_submission_keys_reject_a_second_claim(app):
+    with app.app_context():
+        first, second = add_applications(2)
+        dedupe.claim_submission(first.id, first.user_id, 'SCT-1', 'UTR1'); db.session.commit()
+        for user_id, post_code, utr in ((first.user_id, 'SCT-1', None), (second.user_id, 'SCT-2', 'UTR1')):
+            dedupe.claim_submission(second.id, user_id, post_code, utr)
+            with pytest.raises(IntegrityError): db.session.commit()
+            db.session.rollback()
+        dedupe.claim_submission(second.id, second.user_id, 'SCT-1', 'UTR2'); db.session.commit()
+        assert SubmissionKey.query.count() == 4
+
+def test_concurrent_duplicate_submission_is_refused(app, monkeypatch):
+    # Both requests pass prior_submission() before either commits; the key rows decide
+    import serc_portal.applicant.routes as applicant_routes
+    monkeypatch.setattr(applicant_routes, 'prior_submission', lambda *a: None)
+    client = app.test_client()
+    client.post('/auth/register', data={'email': 'asha@example.in', 'mobile': '9000000001', 'password': 'pw'})
+    first = client.post('/submit', data=submit_form(), content_type='multipart/form-data')
+    assert first.status_code == 302 and '/application/' in first.location
+    second = client.post('/submit', data=submit_form(), content_type='multipart/form-data', follow_redirects=True)
+    assert 'already applied for SCT-1' in second.get_data(as_text=True)
+    with app.app_context():
+        assert Application.query.count() == 1 and SubmissionKey.query.count() == 2
@@ -0,0 +1,63 @@
+import pytest
+from conftest import make_app, add_applications, login
+from serc_portal.extensions import db
+from serc_portal.models import ApplicantProfile, Document, User
+from serc_portal.storage import blob_key, file_sha256, shard
+
+PDF = b'%PDF-1.4\n' + b'x' * 2000
+
+@pytest.fixture
+def documents(tmp_path):
+    """build(**config) -> (app, owner email, another applicant's email, application id, document id, stored key)."""
+    def build(**config):
+        app = make_app(tmp_path, **config)
+        src = tmp_path / 'noc.pdf'; src.write_bytes(PDF)
+        key = blob_key(file_sha256(str(src)), 'pdf')
+        with app.app_context():
+            app.extensions['storage'].put(key, str(src))
+            mine, theirs = add_applications(2)
+            doc = Document(application_id=mine.id, doc_type='noc', storage_path=key, sha256=key.split('.')[0], size_bytes=len(PDF))
+            db.session.add(doc); db.session.add(Document(application_id=theirs.id, doc_type='noc', storage_path=key))
+            db.session.commit()
+            return app, db.session.get(User, mine.user_id).email, db.session.get(User, theirs.user_id).email, mine.id, doc.id, key
+    return build
+
+def test_owner_and_reviewers_get_the_document_and_others_do_not(documents):
+    app, owner, other, app_id, doc_id, key = documents()
+    url = f'/application/{app_id}/document/{doc_id}'
+    client = app.test_client(); login(client, owner, 'pw')
+    rv = client.get(url)
+    assert rv.status_code == 200 and rv.data == PDF and rv.mimetype == 'application/pdf'
+    assert rv.headers['ETag'] == f'"{key.split(".")[0]}"'
+    assert 'private' in rv.headers['Cache-Control'] and 'immutable' in rv.headers['Cache-Control']
+    assert client.get(f'/application/{app_id}/document/{doc_id + 1}').status_code == 404  # not this application's
+    stranger = app.test_client(); login(stranger, other, 'pw')
+    rv = stranger.get(url)
+    assert rv.status_code == 302 and PDF[:8] not in rv.data
+    admin = app.test_client(); login(admin)
+    assert admin.get(url).data == PDF
+
+def test_revalidation_and_ranges(documents):
+    app, owner, _, app_id, doc_id, key = documents()
+    url = f'/application/{app_id}/document/{doc_id}'
+    client = app.test_client(); login(client, owner, 'pw')
+    assert client.get(url, headers={'If-None-Match': f'"{key.split(".")[0]}"'}).status_code == 304
+    rv = client.get(url, headers={'Range': 'bytes=0-7'})
+    assert rv.status_code == 206 and rv.data == PDF[:8] and rv.headers['Content-Range'] == f'bytes 0-7/{len(PDF)}'
+
+def test_x_accel_redirect_hands_the_blob_to_nginx(documents):
+    app, owner, _, app_id, doc_id, key = documents(X_ACCEL_REDIRECT_PREFIX='/protected/')
+    url = f'/application/{app_id}/document/{doc_id}'
+    client = app.test_client(); login(client, owner, 'pw')
+    rv = client.get(url)
+    assert rv.status_code == 200 and rv.data == b'' and rv.headers['X-Accel-Redirect'] == '/protected/' + shard(key)
+    assert client.get(url, headers={'If-None-Match': rv.headers['ETag']}).status_code == 304
+
+def test_photo_prefers_the_print_variant(documents, tmp_path):
+    app, owner, _, app_id, _, key = documents()
+    with app.app_context():
+        ApplicantProfile.query.filter_by(user_id=User.query.filter_by(email=owner).one().id).update({'photo_path': 'f' * 64 + '.png', 'photo_print_path': key})
+        db.session.commit()
+    client = app.test_client(); login(client, owner, 'pw')
+    rv = client.get(f'/application/{app_id}/photo')
+    assert rv.status_code == 200 and rv.data == PDF
@@ -0,0 +1,48 @@
+from PIL import Image
+from conftest import add_applications, submit_form
+from serc_portal.extensions import db
+from serc_portal.imaging import derive
+from serc_portal.models import ApplicantProfile
+from serc_portal.storage import blob_key, file_sha256, local_path
+
+def sizes(paths):
+    out = []
+    for p in paths:
+        with Image.open(p) as img: out.append((img.format, img.mode, img.size))
+    return out
+
+def test_derive_bounds_and_flattens_the_variants(tmp_path):
+    src = str(tmp_path / 'photo.png'); Image.new('RGBA', (1200, 1600), (255, 0, 0, 0)).save(src)
+    thumb, printed = derive(src, print_max=600, thumb_size=96, out_dir=str(tmp_path))
+    assert sizes([thumb, printed]) == [('JPEG', 'RGB', (72, 96)), ('JPEG', 'RGB', (450, 600))]
+    with Image.open(printed) as img: assert img.getpixel((0, 0)) == (255, 255, 255)  # transparency on white
+    assert derive(src, thumb=False, out_dir=str(tmp_path))[0] is None
+    (tmp_path / 'broken.jpg').write_bytes(b'\xff\xd8\xff not really')
+    assert derive(str(tmp_path / 'broken.jpg')) == (None, None)
+    assert derive(str(tmp_path / 'missing.jpg')) == (None, None)
+
+def test_submission_stores_the_variants_beside_the_originals(app):
+    client = app.test_client()
+    client.post('/auth/register', data={'email': 'asha@example.in', 'mobile': '9000000001', 'password': 'pw'})
+    assert client.post('/submit', data=submit_form(), content_type='multipart/form-data').status_code == 302
+    with app.app_context():
+        p = ApplicantProfile.query.one()
+        assert sizes([local_path(p.photo_thumb_path), local_path(p.photo_print_path), local_path(p.sign_print_path)]) == [
+            ('JPEG', 'RGB', (72, 96)), ('JPEG', 'RGB', (300, 400)), ('JPEG', 'RGB', (200, 80))]
+
+def test_backfill_fills_only_missing_variants(app, tmp_path):
+    src = str(tmp_path / 'photo.png'); Image.new('RGB', (900, 1200), 'green').save(src)
+    with app.app_context():
+        key = blob_key(file_sha256(src), 'png'); app.extensions['storage'].put(key, src)
+        for a in add_applications(2):
+            ApplicantProfile.query.filter_by(user_id=a.user_id).update({'photo_path': key, 'sign_path': key})
+        db.session.commit()
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['backfill-images', '--workers', '1'])
+    assert result.exit_code == 0 and '2 profile(s) processed' in result.output, result.output
+    with app.app_context():
+        profiles = ApplicantProfile.query.all()
+        assert len({(p.photo_thumb_path, p.photo_print_path, p.sign_print_path) for p in profiles}) == 1  # same bytes, same blobs
+        assert sizes([local_path(profiles[0].photo_thumb_path), local_path(profiles[0].photo_print_path)]) == [
+            ('JPEG', 'RGB', (72, 96)), ('JPEG', 'RGB', (450, 600))]
+    assert 'processed' not in runner.invoke(args=['backfill-images', '--workers', '1']).output
@@ -0,0 +1,58 @@
+import csv, os
+from datetime import datetime, timedelta
+from conftest import add_applications
+from serc_portal import jobs
+from serc_portal.extensions import db
+from serc_portal.models import ReportJob
+
+def queue(app, kind='export', **params):
+    with app.app_context():
+        job, created = jobs.submit(kind, params, requested_by='admin@serc.res.in')
+        assert created
+        return job.id
+
+def test_worker_builds_a_csv_export_from_the_dispatchers_database(app):
+    with app.app_context(): add_applications(3, post_code='SCT-2')
+    job_id = queue(app, format='csv', post_code='SCT-2')
+    with app.app_context():  # an identical request joins the queued job
+        assert jobs.submit('export', {'format': 'csv', 'post_code': 'SCT-2'})[0].id == job_id
+    assert jobs.ReportWorker(app, workers=1).run_pending(once=True, poll_interval=0.05) == 1
+    with app.app_context():
+        job = db.session.get(ReportJob, job_id)
+        assert (job.status, job.total, job.progress, job.attempts) == ('done', 3, 3, 1)
+        assert os.path.dirname(job.artifact_path) == os.path.abspath(app.config['REPORT_JOB_FOLDER'])
+        with open(job.artifact_path, newline='') as f: rows = list(csv.reader(f))
+        assert len(rows) == 4 and {r[4] for r in rows[1:]} == {'SCT-2'}
+        assert jobs.download_name(job) == 'applications_SCT-2.csv'
+
+def test_a_builder_error_fails_the_job(app, monkeypatch):
+    def broken(*a): raise RuntimeError('disk full')
+    monkeypatch.setitem(jobs.BUILDERS, 'export', broken)  # inherited by the forked worker
+    job_id = queue(app, format='csv')
+    assert jobs.ReportWorker(app, workers=1).run_pending(once=True, poll_interval=0.05) == 1
+    with app.app_context():
+        job = db.session.get(ReportJob, job_id)
+        assert job.status == 'failed' and 'disk full' in job.error
+        assert not os.listdir(app.config['REPORT_JOB_FOLDER'])
+
+def test_a_worker_that_raises_outside_the_job_fails_it(app, monkeypatch):
+    def crash(app, job_id): raise RuntimeError('no such table: report_job')
+    monkeypatch.setattr(jobs, 'run_job', crash)
+    job_id = queue(app, format='csv')
+    assert jobs.ReportWorker(app, workers=1).run_pending(once=True, poll_interval=0.05) == 1
+    with app.app_context():
+        job = db.session.get(ReportJob, job_id)
+        assert job.status == 'failed' and 'no such table' in job.error
+
+def test_stale_jobs_are_reclaimed_until_attempts_run_out(app):
+    job_id = queue(app, format='csv')
+    with app.app_context():
+        stale = datetime.utcnow() - timedelta(hours=1)
+        assert jobs.claim(60, max_attempts=2) == job_id
+        assert jobs.claim(60, max_attempts=2) is None  # its worker is still heartbeating
+        ReportJob.query.filter_by(id=job_id).update({'heartbeat_at': stale}); db.session.commit()
+        assert jobs.claim(60, max_attempts=2) == job_id
+        ReportJob.query.filter_by(id=job_id).update({'heartbeat_at': stale}); db.session.commit()
+        assert jobs.claim(60, max_attempts=2) is None
+        job = db.session.get(ReportJob, job_id)
+        assert (job.status, job.attempts) == ('failed', 2) and 'stopped' in job.error
@@ -0,0 +1,78 @@
+from datetime import date
+import pytest
+from sqlalchemy import event
+from conftest import add_applications
+from serc_portal.extensions import db
+from serc_portal.models import Education, Employment, Document, Payment
+from serc_portal.loaders import load_application, iter_applications
+from serc_portal.pdfs import load_snapshots
+
+@pytest.fixture
+def graphs(app):
+    """(id with one row per child collection, id with many)."""
+    with app.app_context():
+        one, many = add_applications(2)
+        for application, n in ((one, 1), (many, 6)):
+            for i in range(n):
+                db.session.add_all([
+                    Education(application_id=application.id, degree_level='Bachelor', discipline=f'Civil {i}', institute='IIT', year=2010 + i),
+                    Employment(application_id=application.id, org=f'Org {i}', designation='Engineer', dt_from=date(2015, 1, 1)),
+                    Document(application_id=application.id, doc_type=f'doc{i}', storage_path=f'/u/{application.id}-{i}.pdf'),
+                    Payment(application_id=application.id, utr=f'UTR{application.id}{i:04d}', amount=500),
+                ])
+        db.session.commit()
+        return one.id, many.id
+
+def count_statements(app, load):
+    """Statements issued by load() on a fresh session, so nothing comes from the identity map."""
+    with app.app_context():
+        seen = []
+        listener = lambda *a: seen.append(a[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            load()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        return len(seen)
+
+def walk(application):
+    # Everything the review page and the PDF touch
+    return (application.user.email, application.profile.name, list(application.educations), list(application.employments),
+            list(application.documents), application.payment)
+
+def test_load_application_query_count_does_not_grow_with_children(app, graphs):
+    one, many = graphs
+    small = count_statements(app, lambda: walk(load_application(one)))
+    large = count_statements(app, lambda: walk(load_application(many)))
+    assert small == large == 5  # application + user + profile joined, then one SELECT ... IN per collection
+    # A lazy load costs one statement per application, so it only shows once several are loaded together
+    from serc_portal.models import Application
+    batch = lambda ids: [walk(a) for apps in iter_applications(Application.query.filter(Application.id.in_(ids))) for a in apps]
+    assert count_statements(app, lambda: batch([one])) == count_statements(app, lambda: batch([one, many]))
+
+def test_load_snapshots_query_count_does_not_grow_with_children(app, graphs):
+    from serc_portal.models import Application
+    one, many = graphs
+    snap = lambda app_id: load_snapshots([db.session.get(Application, app_id)])
+    small = count_statements(app, lambda: snap(one))
+    large = count_statements(app, lambda: snap(many))
+    both = count_statements(app, lambda: load_snapshots(Application.query.filter(Application.id.in_(graphs)).all()))
+    assert small == large == both
+    with app.app_context():
+        snapshot = load_snapshots([db.session.get(Application, many)])[0]
+        assert len(snapshot['edus']) == 6
+
+def test_pages_issue_the_same_statements_however_many_children(app, graphs):
+    # Templates walk the graph too, so count whole requests, not just the loader
+    from conftest import login
+    client = app.test_client(); login(client)
+    client.get('/admin/')  # warm the session user so both sides start alike
+    # graph (5) + outbox delivery status; graph; get_or_404 + snapshot graph
+    for page, expected in (('/admin/application/{}', 6), ('/application/{}', 5), ('/application/{}/pdf', 6)):
+        counts = []
+        for app_id in graphs:
+            def get():
+                rv = client.get(page.format(app_id)); rv.get_data(); rv.close()
+                assert rv.status_code == 200, page
+            counts.append(count_statements(app, get))
+        assert counts == [expected, expected], (page, counts)
@@ -0,0 +1,36 @@
+from conftest import make_app, login
+
+def test_server_timing_is_off_by_default(app):
+    client = app.test_client()
+    assert 'Server-Timing' not in client.get('/auth/login').headers
+    login(client)
+    assert 'Server-Timing' not in client.get('/admin/').headers
+
+def test_server_timing_is_for_admins_only(tmp_path):
+    app = make_app(tmp_path, SERVER_TIMING=True)
+    client = app.test_client()
+    assert 'Server-Timing' not in client.get('/auth/login').headers
+    client.post('/auth/register', data={'email': 'asha@example.in', 'mobile': '9000000001', 'password': 'pw'})
+    assert 'Server-Timing' not in client.get('/').headers
+    client.get('/auth/logout'); login(client)
+    assert client.get('/admin/').headers['Server-Timing'].startswith('db;dur=')
+
+def test_metrics_need_an_admin_or_the_token(tmp_path):
+    app = make_app(tmp_path, METRICS_TOKEN='s3cret')
+    client = app.test_client()
+    assert client.get('/metrics').status_code == 403
+    body = client.get('/metrics', headers={'Authorization': 'Bearer s3cret'}).get_data(as_text=True)
+    assert 'serc_request_duration_seconds' in body
+
+def test_outbox_worker_publishes_mail_timings_to_the_textfile_directory(tmp_path, smtp):
+    from serc_portal.extensions import db
+    from serc_portal.outbox import OutboxWorker, enqueue
+    app = make_app(tmp_path, SMTP_HOST='smtp.test', METRICS_TEXTFILE_DIR=str(tmp_path / 'textfile'))
+    with app.app_context():
+        enqueue('asha@example.in', 'Hello', 'Body'); db.session.commit()
+        worker = OutboxWorker(app, workers=1)
+        assert worker.run_once() == 1
+        worker.shutdown()
+    text = (tmp_path / 'textfile' / 'serc_outbox.prom').read_text()
+    assert 'serc_section_duration_seconds_count{worker="outbox",section="mail"}' in text
+    assert not (tmp_path / 'textfile' / 'serc_outbox.prom.tmp').exists()
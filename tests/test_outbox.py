@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+import pytest
+from conftest import make_app
+from serc_portal.extensions import db
+from serc_portal.models import EmailOutbox
+from serc_portal.outbox import OutboxWorker, enqueue
+
+@pytest.fixture
+def mail_app(tmp_path):
+    return make_app(tmp_path, SMTP_HOST='smtp.test', OUTBOX_MAX_ATTEMPTS=2, OUTBOX_BACKOFF_SECONDS=30, OUTBOX_LEASE_SECONDS=300)
+
+def make_due(msg_id):
+    EmailOutbox.query.filter_by(id=msg_id).update({'next_attempt_at': datetime.utcnow() - timedelta(seconds=1)}); db.session.commit()
+
+def test_worker_drains_and_backs_off_failures_until_attempts_run_out(mail_app, smtp):
+    smtp.refuse = {'bounce@example.in'}
+    with mail_app.app_context():
+        for to in ('a@example.in', 'bounce@example.in', 'b@example.in'): enqueue(to, 'Hello', 'Body')
+        db.session.commit()
+        worker = OutboxWorker(mail_app, workers=2)
+        assert worker.run_once() == 3 and sorted(smtp.sent) == ['a@example.in', 'b@example.in']
+        bounce = EmailOutbox.query.filter_by(to_email='bounce@example.in').one()
+        assert (bounce.status, bounce.attempts) == ('pending', 1) and 'No such user' in bounce.last_error
+        assert bounce.next_attempt_at > datetime.utcnow() + timedelta(seconds=25)
+        assert {m.status for m in EmailOutbox.query if m.id != bounce.id} == {'sent'}
+        assert worker.run_once() == 0  # not due yet
+        make_due(bounce.id)
+        assert worker.run_once() == 1
+        db.session.refresh(bounce)
+        assert (bounce.status, bounce.attempts) == ('failed', 2)
+        make_due(bounce.id)
+        assert worker.run_once() == 0
+        worker.shutdown()
+        assert len(smtp.sent) == 2
+
+def test_a_claim_left_by_a_dead_worker_is_retaken_after_its_lease(mail_app, smtp):
+    with mail_app.app_context():
+        msg = enqueue('a@example.in', 'Hello', 'Body'); db.session.commit()
+        worker = OutboxWorker(mail_app, workers=1)
+        assert [m.id for m in worker.claim()] == [msg.id]  # claimed, then the worker died
+        assert worker.run_once() == 0 and not smtp.sent
+        make_due(msg.id)
+        assert worker.run_once() == 1 and smtp.sent == ['a@example.in']
+        worker.shutdown()
+        db.session.refresh(msg)
+        assert (msg.status, msg.attempts) == ('sent', 1) and msg.sent_at
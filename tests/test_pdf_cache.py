@@ -0,0 +1,50 @@
+from conftest import add_applications
+from serc_portal.extensions import db
+from serc_portal.models import Application, ApplicantProfile, User
+from serc_portal.pdfs import cache_path
+
+def versions(*ids):
+    db.session.expire_all()
+    return [db.session.get(Application, i).content_version for i in ids]
+
+def test_profile_and_user_changes_bump_every_application_of_that_user(app):
+    with app.app_context():
+        first, other = add_applications(2)
+        second = Application(user_id=first.user_id, post_code='SCT-2'); db.session.add(second); db.session.commit()
+        ids = first.id, second.id, other.id
+        assert versions(*ids) == [1, 1, 1]
+        before = cache_path('cache', db.session.get(Application, first.id))
+
+        profile = ApplicantProfile.query.filter_by(user_id=first.user_id).one()
+        profile.name = 'Renamed'; profile.city = 'Chennai'; db.session.commit()
+        assert versions(*ids) == [2, 2, 1]  # once per flush, and only that user's applications
+        assert cache_path('cache', db.session.get(Application, first.id)) != before
+
+        user = db.session.get(User, first.user_id)
+        user.email = 'renamed@example.in'; db.session.commit()
+        assert versions(*ids) == [3, 3, 1]
+        user.set_password('new'); db.session.commit()  # not on the PDF
+        assert versions(*ids) == [3, 3, 1]
+        profile = ApplicantProfile.query.filter_by(user_id=first.user_id).one()
+        profile.name = 'Renamed'; db.session.commit()  # resubmitting the same value, as the submit form does
+        assert versions(*ids) == [3, 3, 1]
+
+def test_zip_survives_a_cached_pdf_being_replaced_mid_stream(app, tmp_path):
+    import io, os, zipfile
+    from serc_portal.pdfs import iter_pdf_zip
+    cache = str(tmp_path / 'pdfs')
+    with app.app_context():
+        ids = [a.id for a in add_applications(2)]
+        b''.join(iter_pdf_zip(Application.query, cache))  # warm the cache
+        old = cache_path(cache, db.session.get(Application, ids[1]))
+        chunks = iter_pdf_zip(Application.query, cache)
+        data = next(chunks)  # the batch was checked and the first PDF written
+        # Meanwhile another request re-renders the second application for a newer version
+        ApplicantProfile.query.filter_by(user_id=db.session.get(Application, ids[1]).user_id).update({'name': 'Renamed'})
+        db.session.execute(db.text('UPDATE application SET content_version = content_version + 1 WHERE id = :id'), {'id': ids[1]})
+        os.remove(old); db.session.commit()
+        data += b''.join(chunks)
+        archive = zipfile.ZipFile(io.BytesIO(data))
+        assert archive.namelist() == [f'application_{i}.pdf' for i in ids]
+        assert all(archive.read(n).startswith(b'%PDF') for n in archive.namelist())
+        assert os.path.exists(cache_path(cache, db.session.get(Application, ids[1]))) and not os.path.exists(old)
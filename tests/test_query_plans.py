@@ -0,0 +1,6 @@
+from benchmarks import query_plans
+
+def test_hot_queries_use_indexes(tmp_path):
+    # Below a few thousand rows SQLite rightly prefers scanning a small table to 100 index probes
+    failures = query_plans.check(str(tmp_path / 'plans.db'), rows=5000, out=lambda line: None)
+    assert failures == []
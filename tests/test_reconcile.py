@@ -0,0 +1,67 @@
+import csv, io
+from datetime import date
+from conftest import add_applications, login
+from serc_portal.extensions import db
+from serc_portal.models import Application, Payment
+from serc_portal.payment.reconcile import reconcile
+
+CLAIMS = [('SBIN123456789012', 500, False), ('UTR2', 500, True), ('UTR3', 500, False), ('UTR4', 500, False),
+          ('UTRDUP', 500, False), ('utr-dup', 500, False), ('UTR7', 500, False)]
+
+STATEMENT = '''State Bank of India,Account statement
+Period,01/12/2025 - 31/12/2025
+
+Txn Date,Description,Ref No./Cheque No.,Credit,Balance
+02/12/2025,NEFT,sbin-1234 5678 9012,"₹500.00",1000
+01/12/2025,NEFT,UTR2,500,1500
+01/12/2025,NEFT,UTR3,400,1900
+20/12/2025,NEFT,UTR4,500,2400
+01/12/2025,NEFT,UTRDUP,500,2900
+01/12/2025,NEFT,UTR7,500,3400
+01/12/2025,NEFT,UTR7,500,3900
+01/12/2025,NEFT,NOPE123,500,4400
+01/12/2025,NEFT,UTR8,,4400
+,,,Total,4400
+'''
+
+def claims(app):
+    with app.app_context():
+        apps = add_applications(len(CLAIMS))
+        for a, (utr, amount, verified) in zip(apps, CLAIMS):
+            db.session.add(Payment(application_id=a.id, utr=utr, amount=amount, verified=verified, utr_date=date(2025, 12, 1)))
+        db.session.commit()
+        return [a.id for a in apps]
+
+def test_statement_lines_get_one_outcome_each_and_only_matches_are_verified(app):
+    ids = claims(app)
+    with app.app_context():
+        versions = dict(db.session.query(Application.id, Application.content_version))
+        report, counts, verified = reconcile(io.BytesIO(STATEMENT.encode()), 'statement.csv', 'admin@serc.res.in', dry_run=True)
+        assert verified == 0 and not Payment.query.filter_by(utr='SBIN123456789012').one().verified
+        report, counts, verified = reconcile(io.BytesIO(STATEMENT.encode()), 'statement.csv', 'admin@serc.res.in')
+        assert list(report.outcome) == ['matched', 'already_verified', 'amount_mismatch', 'date_mismatch',
+                                        'duplicate_utr', 'duplicate_utr', 'duplicate_utr', 'unmatched', 'invalid']
+        assert list(report.line) == list(range(5, 14))
+        assert counts == {'matched': 1, 'already_verified': 1, 'duplicate_utr': 3, 'amount_mismatch': 1, 'date_mismatch': 1, 'unmatched': 1, 'invalid': 1}
+        assert verified == 1 and report.application_id[0] == ids[0]
+        pay = Payment.query.filter_by(application_id=ids[0]).one()
+        assert pay.verified and pay.verified_by == 'admin@serc.res.in'
+        bumped = {i for i, v in db.session.query(Application.id, Application.content_version) if v != versions[i]}
+        assert bumped == {ids[0]}
+        assert reconcile(io.BytesIO(STATEMENT.encode()), 'statement.csv', 'admin@serc.res.in')[1]['already_verified'] == 2
+
+def test_xlsx_statement_with_utrs_in_the_narration(app):
+    from openpyxl import Workbook
+    ids = claims(app)
+    wb = Workbook(); ws = wb.active
+    for row in (['Statement of account'], [], ['Value Date', 'Narration', 'Deposit Amt'],
+                ['2025-12-01', 'NEFT CR-SBIN123456789012-ASHA KUMAR', '500'], ['2025-12-01', 'IMPS transfer from a friend', '500']):
+        ws.append(row)
+    buf = io.BytesIO(); wb.save(buf); buf.seek(0)
+    client = app.test_client(); login(client)
+    rv = client.post('/payment/reconcile', data={'statement': (buf, 'statement.xlsx'), 'download': 'on'}, content_type='multipart/form-data')
+    rows = list(csv.DictReader(io.StringIO(rv.get_data(as_text=True))))
+    assert [(r['line'], r['utr'], r['outcome'], r['application_id']) for r in rows] == [
+        ('4', 'SBIN123456789012', 'matched', str(ids[0])), ('5', '', 'invalid', '')]
+    with app.app_context():
+        assert Payment.query.filter_by(application_id=ids[0]).one().verified
@@ -0,0 +1,95 @@
+import sqlite3
+import pytest
+from sqlalchemy import event
+from conftest import make_app, add_applications, login
+from serc_portal.extensions import db
+from serc_portal.models import Application
+from serc_portal.replica import use_replica, use_primary
+
+def snapshot(src, dest):
+    a, b = sqlite3.connect(src), sqlite3.connect(dest)
+    a.backup(b); a.close(); b.close()
+
+@pytest.fixture
+def routed_app(tmp_path):
+    """Primary with 4 applications; the replica is a copy taken after the first 3."""
+    replica = tmp_path / 'replica.db'
+    app = make_app(tmp_path, SQLALCHEMY_BINDS={'replica': 'sqlite:///' + str(replica)})
+    with app.app_context():
+        add_applications(3)
+        snapshot(str(tmp_path / 'primary.db'), str(replica))
+        add_applications(1)
+    return app
+
+@pytest.fixture
+def statements(routed_app):
+    """Statements executed per bind key (None is the primary)."""
+    seen = {None: 0, 'replica': 0}
+    with routed_app.app_context():
+        for key, engine in db.engines.items():
+            event.listen(engine, 'before_cursor_execute', lambda *a, key=key: seen.__setitem__(key, seen[key] + 1))
+    return seen
+
+def test_use_replica_reads_the_replica(routed_app):
+    with routed_app.app_context():
+        assert Application.query.count() == 4
+        with use_replica():
+            assert Application.query.count() == 3
+            assert db.session.get(Application, 4) is None
+            with use_primary():
+                assert Application.query.count() == 4
+        assert Application.query.count() == 4
+
+def test_writes_and_flushes_go_to_the_primary(routed_app, statements):
+    with routed_app.app_context():
+        with use_replica():
+            application = db.session.get(Application, 1)
+            application.shortlist_tag = 'A'
+            db.session.flush()
+            before = statements['replica']
+            db.session.commit()
+            assert statements['replica'] == before
+            db.session.execute(Application.__table__.update().where(Application.id == 2).values(shortlist_tag='B'))
+            db.session.commit()
+        tags = dict(db.session.query(Application.id, Application.shortlist_tag))
+        assert tags[1] == 'A' and tags[2] == 'B'
+        with use_replica():
+            assert db.session.query(Application.shortlist_tag).filter(Application.id.in_((1, 2))).all() == [(None,), (None,)]
+
+def test_read_replica_views(routed_app, statements):
+    client = routed_app.test_client(); login(client)
+    primary = statements[None]
+    page = client.get('/admin/').get_data(as_text=True)
+    assert 'SCT-1' in page and statements['replica'] > 0
+    assert statements[None] - primary <= 1  # only the session's user lookup, before the view runs
+    export = client.get('/admin/reports/export?format=csv').get_data(as_text=True)
+    assert len(export.strip().splitlines()) == 1 + 3
+
+def test_undecorated_views_read_the_primary(routed_app, statements):
+    client = routed_app.test_client(); login(client)
+    replica = statements['replica']
+    assert client.get('/admin/application/4').status_code == 200
+    assert statements['replica'] == replica
+
+def test_analytics_rollups_and_status_counts_come_from_one_replica_read(routed_app):
+    client = routed_app.test_client(); login(client)
+    data = client.get('/admin/analytics/data').get_json()
+    assert data['by_post'] == {'SCT-1': 3} and sum(data['by_status'].values()) == 3
+
+def test_without_a_replica_everything_reads_the_primary(tmp_path):
+    app = make_app(tmp_path)
+    with app.app_context():
+        add_applications(2)
+        assert 'replica' not in db.engines
+        with use_replica():
+            assert Application.query.count() == 2
+    client = app.test_client(); login(client)
+    assert client.get('/admin/').status_code == 200
+
+def test_engine_options_reach_both_binds(tmp_path):
+    options = {'pool_size': 3, 'max_overflow': 2, 'pool_pre_ping': True}
+    replica = {'url': 'sqlite:///' + str(tmp_path / 'replica.db'), **options}
+    app = make_app(tmp_path, SQLALCHEMY_ENGINE_OPTIONS=options, SQLALCHEMY_BINDS={'replica': replica})
+    with app.app_context():
+        for engine in db.engines.values():
+            assert engine.pool.size() == 3 and engine.pool._pre_ping
@@ -0,0 +1,24 @@
+import csv, io
+from conftest import add_applications, login
+from serc_portal.extensions import db
+from serc_portal.models import Application, Payment
+from serc_portal.reports.routes import EXPORT_COLUMNS
+
+def test_exports_list_an_application_with_a_retried_payment_once(app):
+    with app.app_context():
+        retried, plain = add_applications(2)
+        db.session.add_all([Payment(application_id=retried.id, utr='UTRFIRST', amount=500),
+                            Payment(application_id=retried.id, utr='UTRRETRY', amount=500, verified=True),
+                            Payment(application_id=plain.id, utr='UTRPLAIN', amount=500)])
+        db.session.commit()
+        ids = retried.id, plain.id
+        assert db.session.get(Application, retried.id).payment.utr == 'UTRRETRY'
+    client = app.test_client(); login(client)
+    rows = list(csv.DictReader(io.StringIO(client.get('/admin/reports/export?format=csv').get_data(as_text=True))))
+    assert [(int(r['ApplicationID']), r['UTR'], r['PaymentVerified']) for r in rows] == [(ids[0], 'UTRRETRY', 'True'), (ids[1], 'UTRPLAIN', 'False')]
+
+    from openpyxl import load_workbook
+    sheet = load_workbook(io.BytesIO(client.get('/admin/reports/export?format=xlsx').get_data())).active
+    values = list(sheet.iter_rows(values_only=True))
+    assert list(values[0][:len(EXPORT_COLUMNS)]) == EXPORT_COLUMNS
+    assert [(r[0], r[EXPORT_COLUMNS.index('UTR')]) for r in values[1:]] == [(ids[0], 'UTRRETRY'), (ids[1], 'UTRPLAIN')]
@@ -0,0 +1,55 @@
+from datetime import date
+import pandas as pd
+from serc_portal.rules import RuleBook, screen
+
+CLOSING = date(2025, 12, 31)
+
+def frames(rows):
+    """(apps, edus) frames for rows of (post_code, category, dob, [(level, discipline), ...])."""
+    apps = pd.DataFrame([{'application_id': i, 'post_code': post, 'category': cat, 'pwbd': 'No', 'exsm': 'No', 'dob': dob}
+                         for i, (post, cat, dob, _) in enumerate(rows, start=1)])
+    edus = pd.DataFrame([{'application_id': i, 'degree_level': level, 'discipline': disc}
+                         for i, (*_, degrees) in enumerate(rows, start=1) for level, disc in degrees],
+                        columns=['application_id', 'degree_level', 'discipline'])
+    return apps, edus
+
+def assert_matches_check(book, rows):
+    apps, edus = frames(rows)
+    result = screen(book, apps, edus, CLOSING)
+    for (post, cat, dob, degrees), eligible, reasons in zip(rows, result.eligible, result.reasons):
+        expected = book.check(post, cat, dob, [{'level': l, 'discipline': d} for l, d in degrees], CLOSING)
+        assert (eligible, reasons) == (not expected, '; '.join(expected)), (post, degrees)
+    return result
+
+def test_screen_matches_check_with_the_shipped_rules():
+    book = RuleBook.load()
+    good = [('Bachelor', 'Civil Engineering'), ('Master', 'Structural Engineering')]
+    assert_matches_check(book, [
+        ('SCT-1', 'GEN', date(1995, 1, 1), good),
+        ('SCT-1', 'OBC', date(1990, 6, 1), good),           # within the OBC relaxation
+        ('SCT-1', 'GEN', date(1980, 1, 1), good[:1]),       # too old and no master's
+        ('SCT-1', 'SC', date(2010, 1, 1), []),              # too young, no degrees
+        ('SCT-1', 'GEN', None, good),
+        ('NOPE', 'GEN', date(1995, 1, 1), good),
+    ])
+
+def test_screen_reports_the_right_reasons_past_64_checks():
+    # Three age/dob checks, one unknown-post check and 70 degree requirements on one post
+    levels = [f'Level {i}' for i in range(70)]
+    book = RuleBook({'defaults': {'max_age': 40}, 'posts': {
+        'BIG': {'degrees': [{'level': l, 'disciplines': [f'subject{i}x']} for i, l in enumerate(levels)]},
+        'SMALL': {'degrees': [{'level': 'Bachelor', 'disciplines': ['civil']}]}}})
+    every = [(l, f'Subject{i}x') for i, l in enumerate(levels)]
+    rows = [
+        ('BIG', 'GEN', date(1990, 1, 1), every),
+        ('BIG', 'GEN', date(1990, 1, 1), every[:65] + every[66:]),   # misses only requirement 65
+        ('BIG', 'GEN', date(1970, 1, 1), every[:-1]),                # over age and misses the last one
+        ('BIG', 'GEN', date(1990, 1, 1), []),
+        ('SMALL', 'GEN', date(1990, 1, 1), [('Bachelor', 'Civil')]),
+        ('SMALL', 'GEN', date(1960, 1, 1), []),
+    ]
+    result = assert_matches_check(book, rows)
+    assert list(result.eligible) == [True, False, False, False, True, False]
+    assert result.reasons[1] == "Requires a Level 65's degree in subject65x"
+    assert result.reasons[2] == "Over the age limit of 40; Requires a Level 69's degree in subject69x"
+    assert result.reasons[3].count('; ') == 69
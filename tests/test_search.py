@@ -0,0 +1,29 @@
+from sqlalchemy import text
+from conftest import add_applications, login
+from serc_portal.extensions import db
+from serc_portal.search import TABLE, reindex, search
+
+def test_matches_beyond_the_rank_window_are_still_returned(app):
+    with app.app_context():
+        conn = db.session.connection()
+        conn.execute(text(f'INSERT INTO {TABLE} (rowid, name, email, education) VALUES (:id, :name, :email, :edu)'),
+                     [{'id': i, 'name': f'Applicant {i}', 'email': f'u{i}@example.in', 'edu': 'Civil IIT Madras'} for i in range(1, 2002)])
+        conn.execute(text(f"UPDATE {TABLE} SET name = 'Iit Topper' WHERE rowid = 1500"))
+        hits = search(conn, 'iit', 3000, window=2000)
+        assert len(hits) == 2001 and sorted(i for i, _ in hits) == list(range(1, 2002))
+        assert hits[0] == (1500, hits[0][1]) and hits[0][1] is not None  # the name match ranks first
+        assert [i for i, rank in hits if rank is None] == [1]               # the 2001st-newest comes last, unranked
+        assert search(conn, 'iit', 50, offset=2000, window=2000) == [(1, None)]
+        assert search(conn, 'iit', 50, offset=2001, window=2000) == []
+
+def test_search_pages_reach_the_oldest_match(app):
+    app.config.update(SEARCH_RANK_WINDOW=2, DASHBOARD_PAGE_SIZE=2)
+    with app.app_context():
+        apps = add_applications(3)
+        reindex(db.session.connection()); db.session.commit()
+        names = [f'Applicant {a.user_id}' for a in apps]
+    client = app.test_client(); login(client)
+    first = client.get('/admin/search?q=applicant').get_data(as_text=True)
+    assert names[2] in first and names[1] in first and names[0] not in first and 'page=2' in first
+    second = client.get('/admin/search?q=applicant&page=2').get_data(as_text=True)
+    assert names[0] in second and names[2] not in second
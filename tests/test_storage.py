@@ -0,0 +1,154 @@
+import io, os
+import pytest
+from serc_portal.storage import S3Storage, LocalStorage, storage_from_config, blob_key, file_sha256, shard, send_blob
+
+KEY = blob_key('ab' + 'cd' + '0' * 60, 'png')
+
+class ClientError(Exception):
+    def __init__(self, code):
+        super().__init__(code); self.response = {'Error': {'Code': code}}
+
+class StubS3:
+    """The subset of a boto3 S3 client that S3Storage uses, over a dict; records every call."""
+    def __init__(self):
+        self.objects = {}; self.calls = []; self.fail_head = None
+
+    def head_object(self, Bucket, Key):
+        self.calls.append(('head', Bucket, Key))
+        if self.fail_head: raise ClientError(self.fail_head)
+        if (Bucket, Key) not in self.objects: raise ClientError('404')
+        return {'ContentLength': len(self.objects[Bucket, Key])}
+
+    def upload_file(self, Filename, Bucket, Key):
+        self.calls.append(('upload', Bucket, Key))
+        with open(Filename, 'rb') as f: self.objects[Bucket, Key] = f.read()
+
+    def download_file(self, Bucket, Key, Filename):
+        self.calls.append(('download', Bucket, Key))
+        with open(Filename, 'wb') as f: f.write(self.objects[Bucket, Key])
+
+    def get_object(self, Bucket, Key):
+        self.calls.append(('get', Bucket, Key))
+        return {'Body': io.BytesIO(self.objects[Bucket, Key])}
+
+    def delete_object(self, Bucket, Key):
+        self.calls.append(('delete', Bucket, Key))
+        self.objects.pop((Bucket, Key), None)
+
+@pytest.fixture
+def s3(tmp_path):
+    return S3Storage('bucket', StubS3(), prefix='uploads/', cache_dir=str(tmp_path / 'cache'))
+
+def source(tmp_path, data=b'\x89PNG\r\n\x1a\nimage'):
+    path = tmp_path / 'src.png'; path.write_bytes(data)
+    return str(path)
+
+def test_objects_are_sharded_under_the_prefix(s3):
+    assert s3.name(KEY) == 'uploads/ab/cd/' + KEY == 'uploads/' + shard(KEY)
+
+def test_put_uploads_once_and_honours_move(s3, tmp_path):
+    assert not s3.exists(KEY)
+    src = source(tmp_path)
+    s3.put(KEY, src)
+    assert s3.exists(KEY) and os.path.exists(src)
+    s3.put(KEY, src, move=True)  # already stored: no second upload, but the source is still consumed
+    assert [c[0] for c in s3.client.calls].count('upload') == 1
+    assert not os.path.exists(src)
+    assert s3.client.objects['bucket', s3.name(KEY)].startswith(b'\x89PNG')
+
+def test_exists_raises_on_errors_other_than_missing(s3):
+    s3.client.fail_head = 'AccessDenied'
+    with pytest.raises(ClientError):
+        s3.exists(KEY)
+
+def test_open_and_local_path_read_through_the_cache(s3, tmp_path):
+    s3.put(KEY, source(tmp_path, b'\x89PNG\r\n\x1a\nbytes'))
+    assert s3.open(KEY).read() == b'\x89PNG\r\n\x1a\nbytes'
+    path = s3.local_path(KEY)
+    assert path == os.path.join(str(tmp_path / 'cache'), *shard(KEY).split('/'))
+    assert open(path, 'rb').read() == b'\x89PNG\r\n\x1a\nbytes'
+    assert s3.local_path(KEY) == path
+    assert [c[0] for c in s3.client.calls].count('download') == 1
+
+def test_delete_removes_the_object_and_the_cached_copy(s3, tmp_path):
+    s3.put(KEY, source(tmp_path))
+    path = s3.local_path(KEY)
+    s3.delete(KEY)
+    assert not s3.exists(KEY) and not os.path.exists(path)
+    s3.delete(KEY)  # deleting twice is harmless
+
+def test_storage_from_config(tmp_path):
+    cfg = {'STORAGE_BACKEND': 's3', 'S3_BUCKET': 'b', 'S3_PREFIX': 'p/', 'STORAGE_CACHE_FOLDER': str(tmp_path),
+           'S3_ENDPOINT_URL': '', 'STORAGE_ROOT': '', 'UPLOAD_FOLDER': str(tmp_path)}
+    storage = storage_from_config(cfg, client=StubS3())
+    assert isinstance(storage, S3Storage) and storage.bucket == 'b' and storage.prefix == 'p/'
+    assert isinstance(storage_from_config({**cfg, 'STORAGE_BACKEND': 'local'}), LocalStorage)
+
+def test_send_blob_serves_s3_blobs_from_the_cache(app, s3, tmp_path):
+    s3.put(KEY, source(tmp_path, b'\x89PNG\r\n\x1a\nserved'))
+    app.extensions['storage'] = s3
+    with app.test_request_context('/'):
+        rv = send_blob(KEY, 'photo.png', 'image/png')
+        rv.direct_passthrough = False
+        assert rv.status_code == 200 and rv.get_data() == b'\x89PNG\r\n\x1a\nserved'
+        assert rv.get_etag()[0] == KEY.split('.')[0]
+        assert 'X-Accel-Redirect' not in rv.headers
+
+def test_local_blobs_are_sharded_and_stored_once(tmp_path):
+    local = LocalStorage(str(tmp_path / 'blobs'))
+    src = source(tmp_path)
+    local.put(KEY, src)
+    assert local.path(KEY) == str(tmp_path / 'blobs' / 'ab' / 'cd' / KEY) and os.path.exists(src)
+    mtime = os.stat(local.path(KEY)).st_mtime_ns
+    local.put(KEY, src, move=True)  # already stored: left alone, but the source is still consumed
+    assert os.stat(local.path(KEY)).st_mtime_ns == mtime and not os.path.exists(src)
+    assert not [f for f in os.listdir(tmp_path / 'blobs' / 'ab' / 'cd') if f.endswith('.part')]
+    local.delete(KEY); local.delete(KEY)
+    assert not local.exists(KEY)
+
+def stored(app, tmp_path, *payloads):
+    keys = []
+    for i, data in enumerate(payloads):
+        path = tmp_path / f'in{i}.png'; path.write_bytes(b'\x89PNG\r\n\x1a\n' + data)
+        key = blob_key(file_sha256(str(path)), 'png'); app.extensions['storage'].put(key, str(path)); keys.append(key)
+    return keys
+
+def test_refcounts_follow_the_rows_and_gc_removes_only_unreferenced_blobs(app, tmp_path):
+    from conftest import add_applications
+    from serc_portal.extensions import db
+    from serc_portal.models import ApplicantProfile, Document, StoredBlob
+    storage = app.extensions['storage']
+    with app.app_context():
+        photo, doc = stored(app, tmp_path, b'photo', b'doc')
+        application = add_applications(1)[0]
+        profile = ApplicantProfile.query.filter_by(user_id=application.user_id).one()
+        profile.photo_path = profile.sign_path = photo
+        db.session.add(Document(application_id=application.id, doc_type='noc', storage_path=doc)); db.session.commit()
+        refs = lambda: {b.key: b.refs for b in StoredBlob.query}
+        assert refs() == {photo: 2, doc: 1}
+        profile.sign_path = doc; db.session.commit()
+        assert refs() == {photo: 1, doc: 2}
+        db.session.delete(Document.query.one()); profile.photo_path = None; db.session.commit()
+        assert refs() == {photo: 0, doc: 1}
+    result = app.test_cli_runner().invoke(args=['storage-gc'])
+    assert 'Removed 1 unreferenced blob(s)' in result.output, result.output
+    with app.app_context():
+        assert not storage.exists(photo) and storage.exists(doc)
+        assert {b.key for b in StoredBlob.query} == {doc}
+
+def test_import_uploads_moves_plain_paths_into_storage(app, tmp_path):
+    from conftest import add_applications
+    from serc_portal.extensions import db
+    from serc_portal.models import ApplicantProfile, StoredBlob
+    legacy = tmp_path / 'legacy.png'; legacy.write_bytes(b'\x89PNG\r\n\x1a\nlegacy')
+    with app.app_context():
+        user_id = add_applications(1)[0].user_id
+        ApplicantProfile.query.filter_by(user_id=user_id).update({'photo_path': str(legacy), 'sign_path': str(tmp_path / 'missing.png')})
+        db.session.commit()
+    result = app.test_cli_runner().invoke(args=['import-uploads'])
+    assert 'Imported 1 file(s)' in result.output, result.output
+    with app.app_context():
+        profile = ApplicantProfile.query.filter_by(user_id=user_id).one()
+        assert profile.photo_path == blob_key(file_sha256(str(legacy)), 'png') and profile.sign_path == str(tmp_path / 'missing.png')
+        assert app.extensions['storage'].exists(profile.photo_path) and legacy.exists()
+        assert db.session.get(StoredBlob, profile.photo_path).refs == 1
@@ -0,0 +1,38 @@
+import pytest
+from conftest import add_applications, login
+from serc_portal.extensions import db
+from serc_portal.models import Application, EmailOutbox, StatusChange
+from serc_portal.transitions import bulk_transition
+
+def audit():
+    return [(c.application_id, c.from_status, c.to_status, c.shortlist_tag, c.reviewer_notes, c.changed_by, c.bulk)
+            for c in StatusChange.query.order_by(StatusChange.application_id, StatusChange.id)]
+
+def test_bulk_transition_writes_one_audit_row_per_application(app):
+    with app.app_context():
+        a, b, c = add_applications(3); other = add_applications(1, post_code='SCT-2')[0]
+        a.status = 'Shortlisted'; a.shortlist_tag = 'A'; db.session.commit()
+        versions = {x.id: x.content_version for x in (a, b, c, other)}
+        assert bulk_transition('Shortlisted', filter_post_code='SCT-1', shortlist_tag='B', changed_by='admin@serc.res.in') == 3
+        assert audit() == [(x.id, st, 'Shortlisted', 'B', None, 'admin@serc.res.in', True)
+                           for x, st in ((a, 'Shortlisted'), (b, 'Submitted'), (c, 'Submitted'))]
+        # the notes are kept when blank; only applications whose status moved are notified
+        assert bulk_transition('Rejected', app_ids=[b.id], reviewer_notes='', changed_by='r@serc.res.in') == 1
+        assert audit()[2] == (b.id, 'Shortlisted', 'Rejected', None, None, 'r@serc.res.in', True)
+        assert sorted(m.application_id for m in EmailOutbox.query) == [b.id, b.id, c.id]
+        rows = {x.id: x for x in Application.query}
+        assert {i: r.content_version - versions[i] for i, r in rows.items()} == {a.id: 1, b.id: 2, c.id: 1, other.id: 0}
+        assert (rows[a.id].shortlist_tag, rows[b.id].status, rows[other.id].status) == ('B', 'Rejected', 'Submitted')
+        assert StatusChange.query.filter_by(application_id=other.id).count() == 0
+
+def test_refused_bulk_transitions_change_nothing(app):
+    with app.app_context():
+        ids = [a.id for a in add_applications(2)]
+        for args in ({'new_status': 'Hired', 'app_ids': ids}, {'new_status': 'Rejected'}):
+            with pytest.raises(ValueError): bulk_transition(**args)
+        assert bulk_transition('Rejected', app_ids=[999]) == 0
+        assert not audit() and {a.status for a in Application.query} == {'Submitted'}
+    client = app.test_client(); login(client)
+    page = client.post('/admin/bulk-status', data={'status': 'Hired', 'app_ids': str(ids[0])}, follow_redirects=True).get_data(as_text=True)
+    assert 'Bulk update not applied: Unknown status: Hired' in page
+    with app.app_context(): assert not audit()
@@ -0,0 +1,25 @@
+import pytest
+from conftest import submit_form
+from serc_portal.models import Application, BLOB_COLUMNS
+from serc_portal.storage import LocalStorage
+
+def referenced_keys():
+    return [k for model, cols in BLOB_COLUMNS.items() for row in model.query for k in (getattr(row, c) for c in cols) if k]
+
+def test_a_failed_promotion_commits_nothing(app, monkeypatch):
+    put = LocalStorage.put; calls = []
+    def flaky(self, key, src, move=False):
+        calls.append(key)
+        if len(calls) == 2: raise OSError('disk full')
+        return put(self, key, src, move)
+    monkeypatch.setattr(LocalStorage, 'put', flaky)
+    client = app.test_client()
+    client.post('/auth/register', data={'email': 'asha@example.in', 'mobile': '9000000001', 'password': 'pw'})
+    with pytest.raises(OSError): client.post('/submit', data=submit_form(), content_type='multipart/form-data')
+    with app.app_context():
+        assert Application.query.count() == 0 and not referenced_keys()
+    monkeypatch.setattr(LocalStorage, 'put', put)  # the blob left by the first attempt is simply reused
+    assert '/application/' in client.post('/submit', data=submit_form(), content_type='multipart/form-data').location
+    with app.app_context():
+        storage = app.extensions['storage']
+        assert Application.query.count() == 1 and all(storage.exists(k) for k in referenced_keys())
@@ -0,0 +1,41 @@
+from conftest import login
+from serc_portal import usercache
+from serc_portal.extensions import db
+from serc_portal.models import User
+from serc_portal.usercache import UserCache
+
+class Loader:
+    def __init__(self): self.calls = []
+    def __call__(self, user_id):
+        self.calls.append(user_id); return None if user_id < 0 else f'user{user_id}'
+
+def test_least_recently_used_entries_are_evicted_first():
+    cache, load = UserCache(ttl=60, maxsize=2), Loader()
+    cache.get(1, load); cache.get(2, load)
+    cache.get(1, load)  # 1 is now the most recent
+    cache.get(3, load)  # evicts 2
+    assert [cache.get(i, load) for i in (1, 3, 2)] == ['user1', 'user3', 'user2']
+    assert load.calls == [1, 2, 3, 2]
+    cache.get(-1, load); cache.get(-1, load)  # misses are not cached
+    assert load.calls[-2:] == [-1, -1]
+
+def test_entries_expire_after_ttl_and_ttl_zero_disables(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(usercache.time, 'monotonic', lambda: now[0])
+    cache, load = UserCache(ttl=30), Loader()
+    cache.get(1, load); now[0] += 29; cache.get(1, load)
+    assert load.calls == [1]
+    now[0] += 2; cache.get(1, load)
+    assert load.calls == [1, 1]
+    off = UserCache(ttl=0); off.get(1, load); off.get(1, load)
+    assert load.calls == [1, 1, 1, 1]
+
+def test_committed_role_changes_evict_the_session_user(app):
+    client = app.test_client(); login(client)
+    assert client.get('/admin/').status_code == 200  # admin snapshot now cached
+    with app.app_context():
+        db.session.get(User, 1).role = 'applicant'; db.session.rollback()  # never committed
+    assert client.get('/admin/').status_code == 200
+    with app.app_context():
+        db.session.get(User, 1).role = 'applicant'; db.session.commit()
+    assert client.get('/admin/').status_code == 302
@@ -0,0 +1,40 @@
+import io
+import pytest
+from PIL import Image
+from serc_portal.imaging import thumbnail
+from serc_portal.reports import xlsx
+from serc_portal.reports.xlsx import write_xlsx
+
+COLUMNS = ['ApplicationID', 'Name', 'PhotoFile']
+
+@pytest.fixture
+def photos(tmp_path):
+    """Rows of (id, name, photo, precomputed thumbnail): thumbnail on disk, photo only, nothing, missing file."""
+    def image(name, size):
+        path = str(tmp_path / name); Image.new('RGB', size, 'blue').save(path); return path
+    return [(1, 'Asha', image('1.jpg', (600, 800)), image('1.thumb.jpg', (90, 120))),
+            (2, 'Ravi', image('2.jpg', (600, 800)), None),
+            (3, 'Mina', None, None),
+            (4, 'Arun', str(tmp_path / 'gone.jpg'), None)]
+
+def read(buf):
+    from openpyxl import load_workbook
+    ws = load_workbook(io.BytesIO(buf.getvalue())).active
+    return list(ws.iter_rows(values_only=True)), sorted(img.anchor._from.row + 1 for img in ws._images)
+
+def test_plain_export_writes_only_the_named_columns(photos):
+    buf = io.BytesIO(); write_xlsx(photos, COLUMNS, buf)
+    rows, images = read(buf)
+    assert rows[0] == tuple(COLUMNS) and [r[:2] for r in rows[1:]] == [(1, 'Asha'), (2, 'Ravi'), (3, 'Mina'), (4, 'Arun')]
+    assert images == []
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_photos_embed_precomputed_thumbnails_and_make_the_rest(photos, workers, monkeypatch):
+    made = []
+    if workers == 1:  # pool workers cannot report back, so only the in-process path is counted
+        monkeypatch.setattr(xlsx, 'thumbnail', lambda src, dest: made.append(src) or thumbnail(src, dest))
+    buf = io.BytesIO(); write_xlsx(photos, COLUMNS, buf, photo_index=2, thumb_index=3, workers=workers, window=1)
+    rows, images = read(buf)
+    assert rows[0] == tuple(COLUMNS) + ('Photo',)
+    assert images == [2, 3]  # header is row 1; rows without a readable photo get no image
+    if workers == 1: assert made == [photos[1][2]]